@@ -0,0 +1,121 @@
+"""
+Process-wide cache of decoded images, shared by every sprite that is drawn on the screen
+
+Every variant of an image (a size, a rotation) is made from the source image once, and then looked up, so turning or
+resizing a sprite never transforms an image that was already transformed.
+"""
+
+import os.path
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+import pygame
+
+import constants
+
+Size = Tuple[int, int]
+ImageKey = Tuple[str, str, bool, Optional[Size], int]  # (directory, file, pixel format with alpha, size, angle)
+ORIENTATIONS = (constants.DOWN, constants.LEFT, constants.UP, constants.RIGHT)
+
+
+class ImageCache:
+    """
+    Bounded LRU cache of decoded and converted surfaces
+
+    Surfaces in the cache are shared between all clients, so clients must never draw onto them.
+    Transformations (scale, rotate) return new surfaces and are therefore safe.
+    """
+
+    max_size: int
+    hits: int
+    misses: int
+
+    _surfaces: 'OrderedDict[ImageKey, pygame.Surface]'
+
+    def __init__(self, max_size: int = constants.IMAGE_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._surfaces = OrderedDict()
+
+    def load(self, directory: str, image_name: str, alpha: bool = True, size: Size = None,
+             angle: int = 0) -> pygame.Surface:
+        """
+        Return the image from the given directory, converted to the display's pixel format
+
+        :param directory: Directory in which the image is stored
+        :param image_name: File name of the image
+        :param alpha: Whether the image needs per-pixel alpha. Opaque images are converted without alpha,
+                      which makes blitting them considerably faster.
+        :param size: Optional (width, height) to scale the image to
+        :param angle: Degrees to rotate the image counterclockwise, after scaling it
+        """
+
+        angle %= 360
+        key = (directory, image_name, alpha, size, angle)
+        try:
+            surface = self._surfaces[key]
+        except KeyError:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._surfaces.move_to_end(key)
+            return surface
+
+        if angle:
+            surface = pygame.transform.rotate(self.load(directory, image_name, alpha, size), angle)
+        elif size is None:
+            surface = self._decode(directory, image_name, alpha)
+        else:
+            surface = pygame.transform.scale(self.load(directory, image_name, alpha), size)
+        self._surfaces[key] = surface
+        while len(self._surfaces) > self.max_size:
+            self._surfaces.popitem(last=False)
+        return surface
+
+    def load_orientations(self, directory: str, image_name: str, alpha: bool = True, sizes: Iterable[Size] = (None,),
+                          source_direction: int = constants.DOWN):
+        """
+        Load the image turned towards each of the four directions, at each of the given sizes
+
+        :param source_direction: Direction in which the source image is oriented
+        """
+
+        for size in sizes:
+            for direction in ORIENTATIONS:
+                self.load(directory, image_name, alpha, size, direction - source_direction)
+
+    def clear(self):
+        self._surfaces.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {'size': len(self._surfaces), 'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0}
+
+    @staticmethod
+    def _decode(directory: str, image_name: str, alpha: bool) -> pygame.Surface:
+        filepath = os.path.join(directory, image_name)
+        try:
+            surface = pygame.image.load(filepath)
+        except Exception as e:
+            s = f'Couldn\'t open {filepath}: {e}'
+            raise ValueError(s) from e
+        return surface.convert_alpha() if alpha else surface.convert()
+
+    def __len__(self):
+        return len(self._surfaces)
+
+
+images = ImageCache()
+
+
+def load_image(directory: str, image_name: str, alpha: bool = True, size: Size = None,
+               angle: int = 0) -> pygame.Surface:
+    """
+    Load an image through the process-wide image cache
+    """
+
+    return images.load(directory, image_name, alpha, size, angle)
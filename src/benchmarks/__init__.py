@@ -0,0 +1,35 @@
+"""
+Headless benchmarks of the hot paths of the game, with a history of results to catch performance regressions
+
+Every run times all benchmarks (or the ones matching --filter) and appends the results to a JSON history file. With
+--compare, the results are compared to the previous run in the history, and the run fails when the median time of any
+benchmark got slower by more than the threshold, so changes can be gated on performance.
+
+Usage, from the src directory:
+    python -m benchmarks
+    python -m benchmarks --filter synthetic --repeat 3
+    python -m benchmarks --compare --threshold 15
+"""
+
+import contextlib
+import os
+import shutil
+import tempfile
+
+# The game modules read these when they are imported, so the benchmarks only import them after this
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+
+@contextlib.contextmanager
+def temporary_save_dir():
+    """
+    Let the game save into a temporary directory, so the benchmarks never touch data/current
+    """
+
+    save_dir = tempfile.mkdtemp(prefix='sacred-stones-benchmarks-')
+    os.environ['SACRED_STONES_SAVE_DIR'] = save_dir
+    try:
+        yield save_dir
+    finally:
+        shutil.rmtree(save_dir, ignore_errors=True)
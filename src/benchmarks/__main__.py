@@ -0,0 +1,79 @@
+import argparse
+import sys
+
+import benchmarks
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=benchmarks.__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filter', default='', help='Only run the benchmarks whose name contains this text')
+    parser.add_argument('--repeat', type=int, default=None, help='Number of times to time each benchmark')
+    parser.add_argument('--history', default=None, help='JSON file with the results of previous runs')
+    parser.add_argument('--compare', action='store_true',
+                        help='Fail if a benchmark got slower than in the previous run')
+    parser.add_argument('--threshold', type=float, default=None,
+                        help='Percentage by which a benchmark may get slower before --compare fails')
+    parser.add_argument('--no-save', action='store_true', help='Do not add the results to the history')
+    parser.add_argument('--list', action='store_true', help='Only list the names of the benchmarks')
+    args = parser.parse_args()
+
+    with benchmarks.temporary_save_dir():
+        exit_code = run(args)
+    sys.exit(exit_code)
+
+
+def run(args: argparse.Namespace) -> int:
+    from benchmarks import runner
+    from benchmarks.cases import BENCHMARKS
+
+    names = [name for name in BENCHMARKS if args.filter in name]
+    if args.list:
+        print('\n'.join(names))
+        return 0
+    if not names:
+        print(f'No benchmarks match {args.filter}')
+        return 1
+
+    history_path = args.history or runner.HISTORY_FILE
+    history = runner.read_history(history_path)
+    current = runner.run_benchmarks(names, args.repeat or runner.DEFAULT_REPEAT)
+    exit_code = 0
+    if args.compare:
+        exit_code = report_comparison(history, current, runner.DEFAULT_THRESHOLD if args.threshold is None
+                                      else args.threshold)
+    # A run with regressions does not become the run that the next run is compared with
+    if not args.no_save and exit_code == 0:
+        runner.write_history([*history, current], history_path)
+        print(f'Added the results to {history_path}')
+    return exit_code
+
+
+def report_comparison(history, current, threshold: float) -> int:
+    """
+    Print how the benchmarks changed since the previous run, and return 1 if any of them regressed
+    """
+
+    from benchmarks import runner
+
+    if not history:
+        print('There is no previous run to compare with')
+        return 0
+    previous = history[-1]
+    print(f'\nCompared with the run of {previous["timestamp"]} (commit {previous["commit"]}):')
+    regressions = []
+    for comparison in runner.compare(previous, current):
+        regressed = comparison['change'] > threshold
+        print(f'{comparison["name"]:50} {runner.format_duration(comparison["before"]):>10} -> '
+              f'{runner.format_duration(comparison["after"]):>10} {comparison["change"]:+7.1f}%'
+              f'{"  REGRESSION" if regressed else ""}')
+        if regressed:
+            regressions.append(comparison['name'])
+    if regressions:
+        print(f'{len(regressions)} benchmarks got more than {threshold}% slower: {", ".join(regressions)}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    main()
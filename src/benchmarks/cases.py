@@ -0,0 +1,283 @@
+"""
+The benchmarks: for each name, a setup function that prepares everything and returns the operation to time
+
+Benchmarks on the hand-made zones use a game in a temporary save directory. Synthetic benchmarks run the same code on
+generated zones from the size of one screen up to 1000x1000 tiles with 10k monsters.
+"""
+
+import itertools
+import os.path
+from functools import partial
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import combat
+import constants
+import savecodec
+import zonecompiler
+from camera import Camera
+from fight import Fight
+from game import Game
+from monster.monster import Monster
+from player import Player
+from renderer import ZoneRenderer
+from saveservice import SAVE_MODES, SaveService, saves
+from savestore import GAME_KEY, SaveStore, get_zone_key
+from scenes import scenes
+from text import display_text, get_font
+from zone import Zone
+from zonemap import ZoneMap
+
+from benchmarks import synthetic
+
+Operation = Callable[[], Any]
+Setup = Callable[[], Operation]
+
+ZONE = 'arkadia_01'  # Hand-made zone to benchmark
+SYNTHETIC_ZONES = [(20, 16, 10), (100, 100, 500), (1000, 1000, 10000)]  # Width, height and number of monsters
+CODEC_ZONES = SYNTHETIC_ZONES[1:]  # Zones whose state is encoded and decoded with every save format
+SAVED_ZONES = 20  # Number of zones that are saved at once with every save mode
+
+BENCHMARKS: Dict[str, Setup] = {}
+SIZES: Dict[str, int] = {}  # Size in bytes of the result of a benchmark, for benchmarks that produce files
+
+_game: Optional[Game] = None
+
+
+def benchmark(name: str) -> Callable[[Setup], Setup]:
+    def register(setup: Setup) -> Setup:
+        BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+def get_game() -> Game:
+    """
+    Return the game that is shared by all benchmarks on the hand-made zones
+    """
+
+    global _game
+    if _game is None:
+        _game = Game.load()
+    return _game
+
+
+def get_monster(game: Game) -> Monster:
+    return next(monster for monster in game.zone.monsters if not monster.is_dead())
+
+
+# Hand-made zones
+
+@benchmark('zonemap.load')
+def zonemap_load() -> Operation:
+    return partial(ZoneMap.load, ZONE)
+
+
+@benchmark('zone.load.fresh')
+def zone_load_fresh() -> Operation:
+    return lambda: Zone.from_source(zonecompiler.load(ZONE), None)
+
+
+@benchmark('zone.load.state')
+def zone_load_state() -> Operation:
+    state = Zone.load(ZONE).as_json()
+    return lambda: Zone.from_source(zonecompiler.load(ZONE), state)
+
+
+@benchmark('game.save')
+def game_save() -> Operation:
+    game = get_game()
+
+    def save():
+        game.mark_dirty()
+        game.zone.mark_dirty()
+        game.save()
+        saves.flush()
+
+    return save
+
+
+@benchmark('game.save.clean')
+def game_save_clean() -> Operation:
+    game = get_game()
+    game.save()
+    return game.save
+
+
+@benchmark('player.move')
+def player_move() -> Operation:
+    game = get_game()
+    player = Player.from_json(game.player.as_json())
+    directions = itertools.cycle([constants.RIGHT, constants.LEFT])
+    return lambda: player.move(next(directions), game.zone.map)
+
+
+@benchmark('game.draw.full')
+def game_draw_full() -> Operation:
+    game = get_game()
+
+    def draw():
+        game.invalidate()
+        game.draw()
+
+    return draw
+
+
+@benchmark('game.draw.idle')
+def game_draw_idle() -> Operation:
+    game = get_game()
+    game.draw()
+    return game.draw
+
+
+@benchmark('text.display_text')
+def text_display_text() -> Operation:
+    font = get_font(30)
+    return partial(display_text, scenes.screen, text='XP: 1234', font=font, width_offset=0, height_offset=0,
+                   line_width=60, color=constants.YELLOW, shadow_color=constants.BLACK)
+
+
+@benchmark('fight.init')
+def fight_init() -> Operation:
+    game = get_game()
+    monster = get_monster(game)
+    return lambda: Fight(game.player, monster)
+
+
+@benchmark('combat.fight_round')
+def combat_fight_round() -> Operation:
+    game = get_game()
+    # Fight with copies, so the fighters of the game stay alive
+    player = Player.from_json(game.player.as_json())
+    monster = Monster.from_json(get_monster(game).as_json())
+
+    def fight_round():
+        player.hit_points = player.max_hit_points
+        monster.hit_points = monster.max_hit_points
+        combat.fight_round(player, monster)
+
+    return fight_round
+
+
+# Synthetic zones
+
+def synthetic_zonemap_load(size: Tuple[int, int, int]) -> Operation:
+    artifact, compiled_zone = synthetic.compile_zone(*size)
+    camera = Camera()
+
+    def load():
+        zone_map = ZoneMap.from_compiled(zonecompiler.from_bytes(compiled_zone.identifier, artifact))
+        zone_map.stream(camera.x, camera.y, camera.width, camera.height)
+
+    return load
+
+
+def synthetic_zone_load_fresh(size: Tuple[int, int, int]) -> Operation:
+    _, compiled_zone = synthetic.compile_zone(*size)
+    return lambda: Zone.from_source(compiled_zone, None)
+
+
+def synthetic_zone_load_state(size: Tuple[int, int, int]) -> Operation:
+    _, compiled_zone = synthetic.compile_zone(*size)
+    state = Zone.from_source(compiled_zone, None).as_json()
+    return lambda: Zone.from_source(compiled_zone, state)
+
+
+def synthetic_move_monsters(size: Tuple[int, int, int]) -> Operation:
+    _, compiled_zone = synthetic.compile_zone(*size)
+    zone = Zone.from_source(compiled_zone, None)
+    # Alternate between free tiles in the middle of the zone, so the monsters keep chasing a target that moves
+    center_x, center_y = zone.map.width // 2, zone.map.height // 2
+    targets = itertools.cycle([(x, y) for x, y, _ in zone.map.iter_tiles(center_x - 2, center_y - 2, 5, 5)
+                               if zone.tile_is_walkable_and_free(x, y)])
+    return lambda: zone.move_monsters_towards(*next(targets))
+
+
+def synthetic_tick_monsters(size: Tuple[int, int, int]) -> Operation:
+    """
+    Rules that apply to all monsters of a zone every frame: regeneration, and finding the monsters near the player
+    """
+
+    _, compiled_zone = synthetic.compile_zone(*size)
+    zone = Zone.from_source(compiled_zone, None)
+    center_x, center_y = zone.map.width // 2, zone.map.height // 2
+
+    def tick():
+        zone.regenerate_monsters(1)
+        zone.monsters_alive_within(center_x, center_y, constants.MONSTER_CHASE_RADIUS)
+
+    return tick
+
+
+def synthetic_draw(size: Tuple[int, int, int]) -> Operation:
+    _, compiled_zone = synthetic.compile_zone(*size)
+    zone = Zone.from_source(compiled_zone, None)
+    camera = Camera()
+    camera.set_zone_size(zone.map.width, zone.map.height)
+    camera.follow(zone.map.width // 2, zone.map.height // 2)
+    renderer = ZoneRenderer(scenes.screen, zone.map, zone.monsters, camera)
+
+    def draw():
+        renderer.invalidate()
+        renderer.draw()
+
+    return draw
+
+
+def codec_encode(size: Tuple[int, int, int], save_format: str, name: str) -> Operation:
+    _, compiled_zone = synthetic.compile_zone(*size)
+    state = Zone.from_source(compiled_zone, None).as_json()
+    SIZES[name] = len(savecodec.dumps(state, save_format))
+    return partial(savecodec.dumps, state, save_format)
+
+
+def codec_decode(size: Tuple[int, int, int], save_format: str, name: str) -> Operation:
+    _, compiled_zone = synthetic.compile_zone(*size)
+    content = savecodec.dumps(Zone.from_source(compiled_zone, None).as_json(), save_format)
+    SIZES[name] = len(content)
+    return partial(savecodec.loads, content)
+
+
+def save_zones(mode: str) -> Operation:
+    """
+    Save the game and a number of changed zones at once, like leaving a zone does, and wait until they are written
+    """
+
+    _, compiled_zone = synthetic.compile_zone(*SYNTHETIC_ZONES[1])
+    state = Zone.from_source(compiled_zone, None).as_json()
+    directory = os.path.join(constants.CURRENT_DIR, f'benchmark-{mode}')
+    store = SaveStore(os.path.join(directory, 'saves.sqlite3')) if mode == 'sqlite' else None
+    service = SaveService(coalesce_delay=0, mode=mode, store=store, directory=directory)
+    game_state = get_game().as_json()
+    counter = itertools.count()
+
+    def save():
+        # Every save changes one monster per zone, so the journal has something to append
+        turn = next(counter)
+        for number in range(SAVED_ZONES):
+            monsters = list(state['monsters'])
+            monsters[number] = {**monsters[number], 'hit_points': turn}
+            service.submit(get_zone_key(f'zone_{number}'), {**state, 'monsters': monsters})
+        service.submit(GAME_KEY, game_state)
+        service.flush()
+
+    return save
+
+
+for _mode in SAVE_MODES:
+    BENCHMARKS[f'saveservice.{_mode}.{SAVED_ZONES}zones'] = partial(save_zones, _mode)
+
+for _size in SYNTHETIC_ZONES:
+    _prefix = 'synthetic.{}x{}.{}'.format(*_size)
+    BENCHMARKS[f'{_prefix}.zonemap.load'] = partial(synthetic_zonemap_load, _size)
+    BENCHMARKS[f'{_prefix}.zone.load.fresh'] = partial(synthetic_zone_load_fresh, _size)
+    BENCHMARKS[f'{_prefix}.zone.load.state'] = partial(synthetic_zone_load_state, _size)
+    BENCHMARKS[f'{_prefix}.zone.move_monsters'] = partial(synthetic_move_monsters, _size)
+    BENCHMARKS[f'{_prefix}.zone.tick_monsters'] = partial(synthetic_tick_monsters, _size)
+    BENCHMARKS[f'{_prefix}.draw.full'] = partial(synthetic_draw, _size)
+
+for _size in CODEC_ZONES:
+    for _save_format in savecodec.CODECS:
+        _prefix = 'savecodec.{}x{}.{}.'.format(*_size) + _save_format
+        BENCHMARKS[f'{_prefix}.encode'] = partial(codec_encode, _size, _save_format, f'{_prefix}.encode')
+        BENCHMARKS[f'{_prefix}.decode'] = partial(codec_decode, _size, _save_format, f'{_prefix}.decode')
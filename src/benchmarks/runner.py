@@ -0,0 +1,123 @@
+"""
+Timing of the benchmarks, and the history of results to compare them with
+"""
+
+import json
+import os.path
+import platform
+import statistics
+import subprocess
+import time
+from typing import Dict, List, Optional, TypedDict
+
+import constants
+from benchmarks.cases import BENCHMARKS, SIZES, Operation
+from scenes import scenes
+
+HISTORY_FILE = os.path.join(constants.DATA_DIR, 'benchmark_history.json')
+MIN_DURATION = 0.05  # Seconds that each repeat of a benchmark takes at least, by calling the operation several times
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 10  # Percentage by which the median time of a benchmark may grow before it is a regression
+
+
+class Measurement(TypedDict, total=False):
+    median: float  # Seconds per call, median over the repeats
+    min: float  # Seconds per call in the fastest repeat
+    calls: int  # Number of calls per repeat
+    repeat: int
+    bytes: int  # Size of the result, only for benchmarks that produce files
+
+
+class Run(TypedDict):
+    timestamp: str
+    commit: Optional[str]
+    python: str
+    machine: str
+    results: Dict[str, Measurement]
+
+
+class Comparison(TypedDict):
+    name: str
+    before: float
+    after: float
+    change: float  # Percentage, positive when the benchmark got slower
+
+
+def measure(operation: Operation, repeat: int = DEFAULT_REPEAT) -> Measurement:
+    """
+    Time the operation, calling it often enough per repeat that the resolution of the clock does not matter
+    """
+
+    # The first call warms up caches and lazy imports, and tells how often to call the operation per repeat
+    start = time.perf_counter()
+    operation()
+    calls = max(1, int(MIN_DURATION / max(time.perf_counter() - start, 1e-9)))
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(calls):
+            operation()
+        durations.append((time.perf_counter() - start) / calls)
+    return {'median': statistics.median(durations), 'min': min(durations), 'calls': calls, 'repeat': repeat}
+
+
+def run_benchmarks(names: List[str], repeat: int = DEFAULT_REPEAT) -> Run:
+    # Images are converted to the pixel format of the display, so the display has to exist before anything is loaded
+    scenes.screen
+    results = {}
+    for name in names:
+        results[name] = measurement = measure(BENCHMARKS[name](), repeat)
+        size = ''
+        if name in SIZES:
+            measurement['bytes'] = SIZES[name]
+            size = f', {SIZES[name]} bytes'
+        print(f'{name:50} {format_duration(measurement["median"]):>10} median, '
+              f'{format_duration(measurement["min"]):>10} min ({measurement["calls"]} calls x {repeat}){size}')
+    return {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'commit': _get_commit(),
+            'python': platform.python_version(), 'machine': platform.node(), 'results': results}
+
+
+def compare(before: Run, after: Run) -> List[Comparison]:
+    """
+    Compare the median times of the benchmarks that are in both runs
+    """
+
+    comparisons = []
+    for name, measurement in after['results'].items():
+        if name in before['results']:
+            old, new = before['results'][name]['median'], measurement['median']
+            comparisons.append({'name': name, 'before': old, 'after': new, 'change': 100 * (new - old) / old})
+    return comparisons
+
+
+def read_history(path: str = HISTORY_FILE) -> List[Run]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+
+def write_history(history: List[Run], path: str = HISTORY_FILE):
+    with open(path, 'w') as f:
+        json.dump(history, f, indent=2)
+        f.write('\n')
+
+
+def format_duration(seconds: float) -> str:
+    if seconds >= 1:
+        return f'{seconds:.2f} s'
+    if seconds >= 1e-3:
+        return f'{seconds * 1e3:.2f} ms'
+    return f'{seconds * 1e6:.1f} us'
+
+
+# Helper methods
+
+def _get_commit() -> Optional[str]:
+    try:
+        output = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=constants.ROOT_DIR, capture_output=True,
+                                text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.strip()
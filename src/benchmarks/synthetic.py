@@ -0,0 +1,58 @@
+"""
+Synthetic zones of any size, to see how the game scales beyond the hand-made zones
+"""
+
+import random
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+import zonecompiler
+from zonecompiler import CompiledZone
+
+OBSTACLE_DENSITY = 0.1  # Fraction of the tiles inside the border that are obstacles
+
+MAP_LEGEND = {
+    '*': {'tile': 'obstacle'},
+    '.': {'tile': 'walkable'},
+    'M': {'tile': 'walkable', 'monster': {'identifier': 'giant_bat'}},
+    'G': {'tile': 'walkable', 'monster': {'identifier': 'goblin'}},
+}
+
+
+def get_identifier(width: int, height: int, nr_monsters: int) -> str:
+    return f'synthetic_{width}x{height}_{nr_monsters}'
+
+
+def generate_map(width: int, height: int, nr_monsters: int, seed: int = 0) -> List[str]:
+    """
+    Return the rows of a map with an obstacle border, scattered obstacles and monsters on random walkable tiles
+    """
+
+    rng = random.Random(seed)
+    rows = [['*'] * width]
+    for _ in range(height - 2):
+        inner = ['*' if rng.random() < OBSTACLE_DENSITY else '.' for _ in range(width - 2)]
+        rows.append(['*', *inner, '*'])
+    rows.append(['*'] * width)
+
+    walkable = [(x, y) for y, row in enumerate(rows) for x, cell in enumerate(row) if cell == '.']
+    if nr_monsters > len(walkable):
+        raise ValueError(f'A map of {width}x{height} has room for {len(walkable)} monsters, not {nr_monsters}')
+    for x, y in rng.sample(walkable, nr_monsters):
+        rows[y][x] = rng.choice('MG')
+    return [''.join(row) for row in rows]
+
+
+@lru_cache(maxsize=None)
+def compile_zone(width: int, height: int, nr_monsters: int, seed: int = 0) -> Tuple[bytes, CompiledZone]:
+    """
+    Return the compiled artifact of a synthetic zone, and the zone parsed from it
+
+    Compiling the largest zones takes seconds, so every zone is only compiled once per process.
+    """
+
+    identifier = get_identifier(width, height, nr_monsters)
+    info: Dict = {'name': f'Synthetic {width}x{height} with {nr_monsters} monsters', 'neighbor_zones': {}}
+    world_map = generate_map(width, height, nr_monsters, seed)
+    artifact = zonecompiler.compile_sources(identifier, world_map, MAP_LEGEND, info)
+    return artifact, zonecompiler.from_bytes(identifier, artifact)
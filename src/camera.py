@@ -0,0 +1,77 @@
+"""
+Viewport on a zone that follows the player
+"""
+
+from typing import Tuple
+
+import pygame
+
+import constants
+
+
+class Camera:
+    """
+    The area of tiles of a zone that is shown on the screen
+
+    Sprites keep their position on the zone map in their rect; the camera translates it to a position on the screen.
+    The camera is centered on the tile it follows, but never shows anything outside of the zone, so zones of one screen
+    do not scroll at all.
+    """
+
+    x: int  # Left-most visible tile
+    y: int  # Top-most visible tile
+    width: int  # Number of visible tiles
+    height: int  # Number of visible tiles
+
+    _zone_width: int
+    _zone_height: int
+
+    def __init__(self, width: int = constants.NR_BLOCKS_WIDE, height: int = constants.NR_BLOCKS_HIGH):
+        self.x = 0
+        self.y = 0
+        self.width = width
+        self.height = height
+        self._zone_width = width
+        self._zone_height = height
+
+    @property
+    def offset(self) -> Tuple[int, int]:
+        """
+        Position in pixels on the zone map of the top left corner of the screen
+        """
+
+        return self.x * constants.TILESIZE, self.y * constants.TILESIZE
+
+    @property
+    def rect(self) -> pygame.Rect:
+        """
+        Area in pixels on the zone map that is shown on the screen
+        """
+
+        return pygame.Rect(self.offset, (self.width * constants.TILESIZE, self.height * constants.TILESIZE))
+
+    def set_zone_size(self, width: int, height: int):
+        self._zone_width = width
+        self._zone_height = height
+        self.x = min(self.x, max(width - self.width, 0))
+        self.y = min(self.y, max(height - self.height, 0))
+
+    def follow(self, x: int, y: int) -> bool:
+        """
+        Center the camera on the given tile, and return whether the camera moved
+        """
+
+        position = (self.x, self.y)
+        self.x = max(min(x - self.width // 2, self._zone_width - self.width), 0)
+        self.y = max(min(y - self.height // 2, self._zone_height - self.height), 0)
+        return (self.x, self.y) != position
+
+    def to_screen(self, rect: pygame.Rect) -> pygame.Rect:
+        """
+        Translate a rect on the zone map to the screen
+        """
+
+        return rect.move(-self.x * constants.TILESIZE, -self.y * constants.TILESIZE)
+
+    def __str__(self):
+        return f'Camera at ({self.x}, {self.y}) showing {self.width}x{self.height} tiles'
@@ -0,0 +1,42 @@
+"""
+The rules of combat, independent of the fight screen
+
+The rules only use the `Creature` methods `rolls_hit`, `calculate_damage` and `is_dead`, which also work on columns of
+stats. The batched simulator in `combatsim` therefore applies exactly the same rules as the fight screen.
+"""
+
+import random
+
+from creature import Creature
+
+FLEE_PENALTY = 20  # Hit points lost when fleeing from a fight
+DICE_SIDES = 100  # A roll of the dice is a number from 0 up to and including DICE_SIDES - 1
+
+
+def roll_dice() -> int:
+    return random.randint(0, DICE_SIDES - 1)
+
+
+def attack(attacker: Creature, defender: Creature) -> int:
+    """
+    Let the attacker attack the defender once, and return the damage dealt
+    """
+
+    if not attacker.rolls_hit(roll_dice()):
+        return 0
+    damage = attacker.calculate_damage(defender)
+    defender.hit_points -= damage
+    return damage
+
+
+def fight_round(player: Creature, monster: Creature):
+    """
+    Let the player attack the monster, after which the monster strikes back, even with its dying breath
+    """
+
+    attack(player, monster)
+    attack(monster, player)
+
+
+def flee(player: Creature):
+    player.hit_points -= FLEE_PENALTY
@@ -0,0 +1,179 @@
+"""
+Headless Monte Carlo simulation of fights, for balancing the game
+
+Fights are simulated in batches with NumPy: every row is one fight, and every round the dice for all fights that are
+still going on are rolled at once. The rules are the same as on the fight screen, see `combat`.
+
+Run this module to simulate the player of a new game against all monsters: `python combatsim.py`
+"""
+
+import json
+import warnings
+from typing import Dict, Mapping, Sequence
+
+import numpy as np
+
+import constants
+from combat import DICE_SIDES
+from creature import Creature
+from monster.monster import Monster
+
+StatBlock = Mapping[str, int]  # Needs armor, max_damage, chance_to_hit and hit_points or max_hit_points
+
+
+class CreatureBatch:
+    """
+    Stats of a batch of creatures, one array element per fight
+
+    The rules of `Creature` are arithmetic on its stats, so they apply to a batch as a whole.
+    """
+
+    armor: np.ndarray
+    max_damage: np.ndarray
+    chance_to_hit: np.ndarray
+    hit_points: np.ndarray
+
+    rolls_hit = Creature.rolls_hit
+    calculate_damage = Creature.calculate_damage
+    is_dead = Creature.is_dead
+
+    def __init__(self, stat_blocks: Sequence[StatBlock], repeat: int):
+        """
+        :param stat_blocks: Stats of each creature
+        :param repeat: Number of fights per creature
+        """
+
+        def _column(_getter) -> np.ndarray:
+            return np.repeat(np.array([_getter(stats) for stats in stat_blocks], dtype=np.int32), repeat)
+
+        self.armor = _column(lambda stats: stats['armor'])
+        self.max_damage = _column(lambda stats: stats['max_damage'])
+        self.chance_to_hit = _column(lambda stats: stats['chance_to_hit'])
+        self.hit_points = _column(lambda stats: stats.get('hit_points', stats['max_hit_points']))
+
+
+class SimulationResult:
+    """
+    Outcome of the simulated fights, per stat block of the player
+    """
+
+    wins: np.ndarray  # Boolean array of shape (number of stat blocks, fights per stat block)
+    losses: np.ndarray  # Idem
+    rounds: np.ndarray  # Number of rounds each fight took
+    hit_points: np.ndarray  # Hit points the player had left after each fight
+
+    def __init__(self, wins: np.ndarray, losses: np.ndarray, rounds: np.ndarray, hit_points: np.ndarray):
+        self.wins = wins
+        self.losses = losses
+        self.rounds = rounds
+        self.hit_points = hit_points
+
+    @property
+    def win_rate(self) -> np.ndarray:
+        return self.wins.mean(axis=1)
+
+    @property
+    def loss_rate(self) -> np.ndarray:
+        return self.losses.mean(axis=1)
+
+    @property
+    def undecided_rate(self) -> np.ndarray:
+        """
+        Fraction of fights that did not end within the maximum number of rounds, e.g. because nobody deals damage
+        """
+
+        return 1 - self.win_rate - self.loss_rate
+
+    @property
+    def expected_rounds(self) -> np.ndarray:
+        return self.rounds.mean(axis=1)
+
+    def hit_point_percentiles(self, percentiles: Sequence[float] = (10, 50, 90), won_only: bool = True) -> np.ndarray:
+        """
+        Return the given percentiles of the hit points left, per stat block, shape (number of stat blocks, percentiles)
+
+        :param won_only: Only consider the fights the player won. Stat blocks without any win get NaN.
+        """
+
+        hit_points = np.where(self.wins, self.hit_points, np.nan) if won_only else self.hit_points.astype(float)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)  # Stat blocks without any win
+            return np.nanpercentile(hit_points, percentiles, axis=1).T
+
+
+def simulate(players: Sequence[StatBlock], monster: StatBlock, nr_fights: int = 1000,
+             max_rounds: int = constants.SIMULATION_MAX_ROUNDS, seed: int = None) -> SimulationResult:
+    """
+    Let each player fight the monster nr_fights times, until one of them dies or max_rounds have been fought
+    """
+
+    rng = np.random.default_rng(seed)
+    player = CreatureBatch(players, nr_fights)
+    opponent = CreatureBatch([monster], len(players) * nr_fights)
+    size = len(players) * nr_fights
+
+    active = np.ones(size, dtype=bool)
+    rounds = np.zeros(size, dtype=np.int32)
+    # Damage does not change during a fight, so it is calculated once
+    player_damage = player.calculate_damage(opponent)
+    monster_damage = opponent.calculate_damage(player)
+    for _ in range(max_rounds):
+        if not active.any():
+            break
+        rounds += active
+
+        hits = active & player.rolls_hit(rng.integers(0, DICE_SIDES, size))
+        opponent.hit_points -= np.where(hits, player_damage, 0)
+        monster_died = active & opponent.is_dead()
+
+        # Like in `combat.fight_round`, the monster strikes back in the round it dies
+        hits = active & opponent.rolls_hit(rng.integers(0, DICE_SIDES, size))
+        player.hit_points -= np.where(hits, monster_damage, 0)
+        player_died = active & player.is_dead()
+
+        active &= ~(monster_died | player_died)
+
+    shape = (len(players), nr_fights)
+    wins = opponent.is_dead() & ~player.is_dead()
+    return SimulationResult(wins=wins.reshape(shape), losses=player.is_dead().reshape(shape),
+                            rounds=rounds.reshape(shape), hit_points=player.hit_points.reshape(shape))
+
+
+def get_monster_stats() -> Dict[str, StatBlock]:
+    """
+    Return the stats of every registered monster type, by identifier
+    """
+
+    return {
+        identifier: {'armor': klass.armor, 'max_damage': klass.max_damage, 'chance_to_hit': klass.chance_to_hit,
+                     'max_hit_points': klass.max_hit_points}
+        for identifier, klass in Monster.registered_types().items()
+    }
+
+
+def simulate_all_monsters(players: Sequence[StatBlock], nr_fights: int = 1000,
+                          max_rounds: int = constants.SIMULATION_MAX_ROUNDS,
+                          seed: int = None) -> Dict[str, SimulationResult]:
+    """
+    Let each player fight every registered monster type nr_fights times
+    """
+
+    rng = np.random.default_rng(seed)
+    return {
+        identifier: simulate(players, stats, nr_fights, max_rounds, seed=rng.integers(2 ** 32))
+        for identifier, stats in get_monster_stats().items()
+    }
+
+
+def _print_summary(results: Dict[str, SimulationResult], player_index: int = 0):
+    for identifier, result in sorted(results.items()):
+        p10, p50, p90 = result.hit_point_percentiles()[player_index]
+        print(f'{identifier:20} win rate {result.win_rate[player_index]:6.1%}, '
+              f'{result.expected_rounds[player_index]:5.2f} rounds, hit points left p10/p50/p90: '
+              f'{p10:.0f}/{p50:.0f}/{p90:.0f}')
+
+
+if __name__ == '__main__':
+    with open(constants.ORIGINAL_GAME_FILE, 'r') as f:
+        new_player = json.load(f)['player']
+    _print_summary(simulate_all_monsters([new_player], nr_fights=100000))
@@ -8,6 +8,22 @@ NR_BLOCKS_HIGH = 16
 SCREEN_WIDTH = TILESIZE * NR_BLOCKS_WIDE
 SCREEN_HEIGHT = TILESIZE * NR_BLOCKS_HIGH
 FRAME_RATE = 20
+IDLE_TIMEOUT = 500  # Milliseconds to wait for input before drawing a frame anyway
+CHUNK_SIZE = 32  # Zones are stored and streamed in square chunks of this many tiles
+STREAM_MARGIN = 16  # Number of tiles around the screen for which the chunks of a zone are kept loaded
+PATHFINDING_RADIUS = 16  # Distance fields towards the player cover this many tiles around the player
+MONSTER_CHASE_RADIUS = 5  # Living monsters within this many tiles of the player walk towards the player
+IMAGE_CACHE_SIZE = 256  # Maximum number of decoded images kept in memory
+TEXT_CACHE_SIZE = 128  # Maximum number of rendered texts kept in memory
+PREFETCH_POOL_SIZE = 4  # Maximum number of prefetched zones kept ready for a transition
+MAX_RESIDENT_ZONES = 8  # Maximum number of visited zones kept in memory
+PROFILER_FRAMES = 240  # Number of recent frame times shown in the profiler overlay
+PROFILER_MAX_EVENTS = 100000  # Number of recent phases kept by the profiler for the trace export
+CPROFILE_FRAMES = 120  # Number of frames captured with cProfile when the hotkey is pressed
+ZONE_MMAP_THRESHOLD = 1024 * 1024  # Compiled zones of at least this many bytes are memory-mapped instead of read
+ZONE_MEMORY_BUDGET = 64 * 1024 * 1024  # Maximum estimated memory use in bytes of the zones kept in memory
+SPRITE_MEMORY_ESTIMATE = 1024  # Estimated memory use in bytes of one sprite, excluding its (shared) image
+SAVE_COALESCE_DELAY = 0.25  # Seconds to wait for more saves before writing them to disk
 
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
@@ -42,5 +58,21 @@ DATA_DIR = os.path.join(ROOT_DIR, 'data')
 
 GAME_DATA_FILE = 'game.json'
 ORIGINAL_GAME_FILE = os.path.join(DATA_DIR, 'original', GAME_DATA_FILE)
-CURRENT_GAME_FILE = os.path.join(DATA_DIR, 'current', GAME_DATA_FILE)
+# Directory of the game in progress, which can be moved elsewhere, e.g. to run several games at once
+CURRENT_DIR = os.environ.get('SACRED_STONES_SAVE_DIR', os.path.join(DATA_DIR, 'current'))
+CURRENT_GAME_FILE = os.path.join(CURRENT_DIR, GAME_DATA_FILE)
+JOURNAL_FILE = os.path.join(CURRENT_DIR, 'journal.log')
+SAVE_DATABASE = os.path.join(CURRENT_DIR, 'saves.sqlite3')
+# Profiling, see profiler.py
+PROFILE_DIR = os.environ.get('SACRED_STONES_PROFILE_DIR', os.path.join(DATA_DIR, 'profiles'))
+PROFILE = bool(os.environ.get('SACRED_STONES_PROFILE'))
+TRACE_FILE = os.environ.get('SACRED_STONES_TRACE')
+CPROFILE_STARTUP_FRAMES = int(os.environ.get('SACRED_STONES_CPROFILE', 0))
+# 'snapshot' rewrites whole save files, 'journal' appends changes to JOURNAL_FILE, 'sqlite' writes every save in one
+# transaction to SAVE_DATABASE
+SAVE_MODE = 'sqlite'
+SAVE_SLOT = 'current'  # Slot in SAVE_DATABASE of the game in progress
+SAVE_FORMAT = 'json-compact'  # Format of new save files: 'json', 'json-compact', 'marshal' or 'marshal-zlib'
+JOURNAL_COMPACT_SIZE = 256 * 1024  # Size in bytes of JOURNAL_FILE above which it is compacted into save files
 
+SIMULATION_MAX_ROUNDS = 1000  # Simulated fights that last longer than this are undecided
@@ -1,5 +1,5 @@
 from abc import ABC
-from typing import TypedDict
+from typing import List, TypedDict
 
 from saveable import Saveable
 from tile import Tile
@@ -38,6 +38,9 @@ class Creature(Tile, Saveable, ABC):
         self.hit_points = hit_points if hit_points is not None else self.max_hit_points
         super().__init__(**kwargs)
 
+    def rolls_hit(self, roll_of_dice: int) -> bool:
+        return roll_of_dice <= self.chance_to_hit
+
     def calculate_damage(self, enemy: 'Creature') -> int:
         # TODO: More sophisticated way to calculate damage
         return self.max_damage - enemy.armor
@@ -45,6 +48,10 @@ class Creature(Tile, Saveable, ABC):
     def is_dead(self):
         return self.hit_points <= 0
 
+    @classmethod
+    def _get_image_names(cls) -> List[str]:
+        return [cls.IMAGE, cls.IMAGE_DEAD] if cls.IMAGE_DEAD else [cls.IMAGE]
+
     @property
     def image_name(self) -> str:
         if self.is_dead():
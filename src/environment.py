@@ -3,7 +3,9 @@ from tile import Tile
 
 class Obstacle(Tile):
     IMAGE = 'trees.png'
+    IMAGE_HAS_ALPHA = False
 
 
 class Walkable(Tile):
     IMAGE = 'grass.gif'
+    IMAGE_HAS_ALPHA = False
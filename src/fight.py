@@ -1,74 +1,102 @@
 import os.path
 import random
-from typing import List
+from typing import List, Optional
 
 import pygame
 
+import combat
 import constants
-import utils
+from assets import load_image
 from monster.monster import Monster
 from player import Player
+from scenes import Scene, scenes
+from text import display_text, get_font, render_text
 
 
-class Fight:
+class Fight(Scene):
     """
     Take the player and a monster and let them fight
+
+    The fight screen is drawn in layers: the background with the static text is composed once, the panel with the stats
+    of both fighters is only drawn again when they changed, and the fighters are drawn on top. The screen is only
+    updated when something changed. Backgrounds and the enlarged images of the fighters come from the image cache, and
+    can be loaded before the first fight with `preload`.
     """
 
     BACKROUND_IMAGE_DIR = os.path.join(constants.DATA_DIR, 'images', 'background', 'fight')
-    FLEE_PENALTY = 20
-
-    def __init__(self, player: Player, monster: Monster):
-        self._screen = utils.init_pygame()
+    FLEE_PENALTY = combat.FLEE_PENALTY
+    MULTIPLIER = 4  # Make the images 4 times bigger as on the zone map
+    TILESIZE = constants.TILESIZE * MULTIPLIER
 
-        background_image_filepath = os.path.join(self.BACKROUND_IMAGE_DIR, self._get_random_background_image())
+    _background_images: Optional[List[str]] = None  # File names of the possible backgrounds, read once
 
-        self._background_image = pygame.image.load(background_image_filepath)
+    def __init__(self, player: Player, monster: Monster):
+        self._screen = scenes.screen
         self._player = player
         self._monster = monster
-        self._all_sprites = pygame.sprite.Group(self._player, self._monster)
         self._keep_looping = True
 
-        self._font = pygame.font.Font(None, 35)
-        self._clock = pygame.time.Clock()
+        self._font = get_font(35)
+
+        self._player_rect = pygame.Rect(0, 0, self.TILESIZE, self.TILESIZE)
+        monster_left = (constants.NR_BLOCKS_WIDE // self.MULTIPLIER - 1) * self.TILESIZE
+        self._monster_rect = pygame.Rect(monster_left, 0, self.TILESIZE, self.TILESIZE)
 
-        multiplier = 4  # Make the image 4 times bigger as on the zone map
-        self._player.place_on_screen(constants.TILESIZE * multiplier, 0, 0)
-        self._monster.place_on_screen(constants.TILESIZE * multiplier, constants.NR_BLOCKS_WIDE // multiplier - 1, 0)
+        self._background = self._compose_background(self._get_random_background_image())
+        self._frame = self._background.copy()
+        self._shown_stats = None
+        self._shown_images = None
 
-    def _get_background_images(self) -> List[str]:
+    @classmethod
+    def preload(cls):
+        """
+        Load the backgrounds into the image cache, so that entering a fight does not have to decode any image
+
+        The enlarged images of the fighters can be preloaded with `Tile.preload` and `Fight.TILESIZE`.
+        """
+
+        for background_image in cls._get_background_images():
+            load_image(cls.BACKROUND_IMAGE_DIR, background_image, alpha=False)
+
+    @classmethod
+    def _get_background_images(cls) -> List[str]:
         """
         Filenames of possible background images
         """
 
-        return list(os.scandir(self.BACKROUND_IMAGE_DIR))
+        if cls._background_images is None:
+            cls._background_images = sorted(entry.name for entry in os.scandir(cls.BACKROUND_IMAGE_DIR))
+        return cls._background_images
 
     def _get_random_background_image(self) -> str:
         bg_images = self._get_background_images()
         return random.choice(bg_images)
 
-    def _handle_events(self):
-        for event in pygame.event.get():
+    @property
+    def finished(self) -> bool:
+        return not self._keep_looping
+
+    def handle_events(self, events: List[pygame.event.Event]):
+        for event in events:
+            if not self._keep_looping:
+                break  # The fight is over, ignore the remaining key presses
             if event.type == pygame.QUIT:
                 self._keep_looping = False
             elif event.type == pygame.KEYDOWN:
                 if event.key in (pygame.K_ESCAPE, pygame.K_x):
                     self._player_flees()
                 elif event.key == pygame.K_h:
-                    self._player_attacks_monster()
-                    self._monster_attacks_player()
+                    self._fight_round()
                 else:
                     pass
 
     def _player_flees(self):
         print(f'{self._player} flees from {self._monster}')
-        self._player.hit_points -= self.FLEE_PENALTY
+        combat.flee(self._player)
         self._keep_looping = False
 
-    def _player_attacks_monster(self):
-        roll_of_dice = random.randint(0, 99)
-        if roll_of_dice <= self._player.chance_to_hit:
-            self._monster.hit_points -= self._player.calculate_damage(self._monster)
+    def _fight_round(self):
+        combat.fight_round(self._player, self._monster)
         if self._monster.is_dead():
             gold_earned = self._monster.gold_when_killed
             experience_earned = self._monster.experience_when_killed
@@ -76,42 +104,61 @@ class Fight:
             self._player.experience += experience_earned
             print(f'{self._player} killed {self._monster}, gaining {gold_earned} gold and {experience_earned} XP')
             self._keep_looping = False
-
-    def _monster_attacks_player(self):
-        roll_of_dice = random.randint(0, 99)
-        if roll_of_dice <= self._monster.chance_to_hit:
-            self._player.hit_points -= self._monster.calculate_damage(self._player)
         if self._player.is_dead():
             print(f'{self._player} is killed by {self._monster}')
             self._keep_looping = False
 
-    def _draw(self):
-        self._screen.blit(self._background_image, (0, 0))
-
-        monster_list = [f'{str(self._monster).title()}:', f'Hit Points: {self._monster.hit_points}',
-                        f'Armor: {self._monster.armor}', f'Max damage: {self._monster.max_damage}',
-                        f'Chance to hit: {self._monster.chance_to_hit}']
-        utils.display_text(self._screen, monster_list, self._font, width_offset=475,
-                           height_offset=250, line_width=60, color=constants.YELLOW, shadow_color=constants.BLACK)
-
-        player_list = [f'{self._player}:', f'Hit Points: {self._player.hit_points}', f'Armor: {self._player.armor}',
-                       f'Max damage: {self._player.max_damage}', f'Chance to hit: {self._player.chance_to_hit}']
-        player_height = utils.display_text(self._screen, player_list, self._font, width_offset=20,
-                                              height_offset=250, line_width=60,
-                                              color=constants.YELLOW, shadow_color=constants.BLACK)
+    def _compose_background(self, background_image: str) -> pygame.Surface:
+        """
+        Return the background with the text that does not change during the fight
+        """
 
+        background = load_image(self.BACKROUND_IMAGE_DIR, background_image, alpha=False).copy()
+        # The stats of the player always take the same number of lines, so their height is known in advance
+        _, player_height = render_text(self._get_player_stats(), self._font, 60, constants.YELLOW, constants.BLACK)
         action_list = ['What would you like to do?', 'H = Hit',
                        f'X = Flee (Fleeing will cost {self.FLEE_PENALTY} hitpoints)']
-        utils.display_text(self._screen, action_list, self._font, width_offset=20,
-                           height_offset=250 + player_height + 40, line_width=60,
-                           color=constants.YELLOW, shadow_color=constants.BLACK)
+        display_text(background, action_list, self._font, width_offset=20,
+                     height_offset=250 + player_height + 40, line_width=60,
+                     color=constants.YELLOW, shadow_color=constants.BLACK)
+        return background
+
+    def _get_player_stats(self) -> List[str]:
+        return [f'{self._player}:', f'Hit Points: {self._player.hit_points}', f'Armor: {self._player.armor}',
+                f'Max damage: {self._player.max_damage}', f'Chance to hit: {self._player.chance_to_hit}']
+
+    def _get_monster_stats(self) -> List[str]:
+        return [f'{str(self._monster).title()}:', f'Hit Points: {self._monster.hit_points}',
+                f'Armor: {self._monster.armor}', f'Max damage: {self._monster.max_damage}',
+                f'Chance to hit: {self._monster.chance_to_hit}']
+
+    def draw(self) -> List[pygame.Rect]:
+        """
+        Draw the layers of the fight screen that changed, and return the screen areas that need to be updated
+        """
 
-        self._all_sprites.update()
-        self._all_sprites.draw(self._screen)
-        pygame.display.flip()
+        stats = (self._player.hit_points, self._monster.hit_points)
+        images = (self._player.get_image(self.TILESIZE), self._monster.get_image(self.TILESIZE))
+        if stats == self._shown_stats and images == self._shown_images:
+            return []
+
+        if stats != self._shown_stats:
+            self._frame.blit(self._background, (0, 0))
+            display_text(self._frame, self._get_monster_stats(), self._font, width_offset=475,
+                         height_offset=250, line_width=60, color=constants.YELLOW, shadow_color=constants.BLACK)
+            display_text(self._frame, self._get_player_stats(), self._font, width_offset=20,
+                         height_offset=250, line_width=60, color=constants.YELLOW, shadow_color=constants.BLACK)
+            self._shown_stats = stats
+
+        self._screen.blit(self._frame, (0, 0))
+        self._screen.blit(images[0], self._player_rect)
+        self._screen.blit(images[1], self._monster_rect)
+        self._shown_images = images
+        return [self._screen.get_rect()]
+
+    def invalidate(self):
+        self._shown_stats = None
+        self._shown_images = None
 
     def main(self):
-        self._clock.tick(constants.FRAME_RATE)
-        while self._keep_looping:
-            self._handle_events()
-            self._draw()
+        scenes.run(self)
@@ -1,21 +1,23 @@
-import json
-import os.path
-import shutil
 import sys
-from shutil import copyfile
-from typing import Optional, List, TypedDict, Dict
+from typing import Optional, List, TypedDict, Dict, Tuple, Iterable
 
 import pygame
 
 import constants
-from constants import DATA_DIR
+import journal
+from camera import Camera
 from fight import Fight
 from text_dialog import TextDialog
 from player import Player, PlayerDict
+from profiler import profiled
+from renderer import ZoneRenderer
 from saveable import Saveable
-from environment import Obstacle, Walkable
-from utils import init_pygame, display_text
+from saveservice import saves
+from savestore import GAME_KEY
+from scenes import Scene, scenes
+from text import display_text, get_font
 from zone import Zone
+from zonemanager import ZoneManager
 
 
 class GameDict(TypedDict):
@@ -23,30 +25,55 @@ class GameDict(TypedDict):
     player: PlayerDict
 
 
-class Game(Saveable):
+class Game(Saveable, Scene):
+    TRACKED_FIELDS = ('_active_zone',)
+
     _keep_looping: bool
     _active_zone: str
     _player: Player
     _zone: Zone
-    _obstacles: List[Obstacle]
-    _walkables: List[Walkable]
-    _all_sprites: Optional[pygame.sprite.Group]
+    _zones: ZoneManager
+    _camera: Camera
+    _renderer: Optional[ZoneRenderer]
+    _hud_text: Optional[Tuple[str, str]]
+    _hud_rect: pygame.Rect
+
+    HUD_LEFT = constants.SCREEN_WIDTH - 120
+    HUD_TOP = 20
 
     def __init__(self):
-        init_pygame()
-        self._all_sprites = None
+        self._player = None
+        self._zone = None
+        self._renderer = None
         self._keep_looping = True
-        self._screen = pygame.display.set_mode((constants.SCREEN_WIDTH, constants.SCREEN_HEIGHT))
+        self._screen = scenes.screen
         self._screen.fill(constants.UGLY_PINK)
-        self._font = pygame.font.Font(None, 30)
+        self._font = get_font(30)
+        # Images can only be converted once the display exists, so this is the earliest moment to load them
+        Player.preload([constants.TILESIZE, Fight.TILESIZE])
+        Fight.preload()
+        self._hud_text = None
+        self._hud_rect = pygame.Rect(self.HUD_LEFT, self.HUD_TOP, constants.SCREEN_WIDTH - self.HUD_LEFT, 0)
+        self._zones = ZoneManager()
+        self._camera = Camera()
 
         self._resume()
 
     @property
-    def all_sprites(self) -> pygame.sprite.Group:
-        if not self._all_sprites:
-            self._all_sprites = pygame.sprite.Group(*self._zone.all_sprites, self._player)
-        return self._all_sprites
+    def renderer(self) -> ZoneRenderer:
+        if not self._renderer:
+            objects = [obj for obj in self._zone.objects if obj.is_on_map()]
+            sprites = [*self._zone.monsters, *objects, self._player]
+            self._renderer = ZoneRenderer(self._screen, self._zone.map, sprites, self._camera)
+        return self._renderer
+
+    @property
+    def player(self) -> Player:
+        return self._player
+
+    @property
+    def zone(self) -> Zone:
+        return self._zone
 
     # Saveable methods
 
@@ -60,19 +87,35 @@ class Game(Saveable):
         return {'active_zone': self._active_zone, 'player': self._player.as_json()}
 
     @classmethod
+    @profiled('Game.load')
     def load(cls):
         data = cls._get_saved_data()
         return cls.from_json(data)
 
+    @profiled('Game.save')
     def save(self):
-        with open(constants.CURRENT_GAME_FILE, 'w') as f:
-            json.dump(self.as_json(), f, indent=2)
-        self._zone.save()
+        """
+        Save the game and all zones that changed in the background, see `SaveService`
+        """
+
+        if self.dirty:
+            saves.submit(GAME_KEY, self.as_json())
+            self.mark_clean()
+        else:
+            saves.skip(GAME_KEY)
+        self._zones.save_dirty()
+
+    def mark_clean(self):
+        super().mark_clean()
+        if self._player:
+            self._player.mark_clean()
 
     # Public methods
 
-    def handle_events(self):
-        for event in pygame.event.get():
+    def handle_events(self, events: Iterable[pygame.event.Event] = None):
+        if events is None:
+            events = pygame.event.get()
+        for event in events:
             if event.type == pygame.QUIT:
                 self._quit()
                 return True
@@ -83,11 +126,11 @@ class Game(Saveable):
                 if event.key == pygame.K_r:
                     # TODO: This should not be so easy, but good for debugging
                     print('Restart')
-                    os.remove(constants.CURRENT_GAME_FILE)
-                    shutil.rmtree(os.path.join(DATA_DIR, 'current', 'zones'))
-                    os.mkdir(os.path.join(DATA_DIR, 'current', 'zones'))
+                    saves.reset()
+                    self._zones.clear()
                     self._resume()
                 zone_to_move_to = None
+                player_position = (self._player.x, self._player.y)
                 if event.key == pygame.K_LEFT:
                     zone_to_move_to = self._player.move(direction=constants.LEFT, zone_map=self._zone.map)
                 elif event.key == pygame.K_RIGHT:
@@ -109,21 +152,58 @@ class Game(Saveable):
                     if self._player.is_dead():
                         self._player_died()
                 if zone_to_move_to:
-                    self._active_zone = zone_to_move_to
-                    self._zone = Zone.load(zone_to_move_to)
-                    self.save()
-                    self._resume()
+                    self._enter_zone(zone_to_move_to)
+                else:
+                    self._zone.occupancy.update(self._player)
+                    self._follow_player()
+                    # Monsters only chase the player when the player moved
+                    if (self._player.x, self._player.y) != player_position:
+                        self._zone.move_monsters_towards(self._player.x, self._player.y)
                 self.save()
 
-    def draw(self):
-        self.all_sprites.update()
-        self.all_sprites.draw(self._screen)
-        height = display_text(self._screen, text=f'XP: {self._player.experience}', font=self._font,
-                              width_offset=constants.SCREEN_WIDTH - 120, height_offset=20, line_width=60,
+    @property
+    def finished(self) -> bool:
+        return not self._keep_looping
+
+    def invalidate(self):
+        self._hud_text = None
+        if self._renderer:
+            self._renderer.invalidate()
+
+    def draw(self) -> List[pygame.Rect]:
+        """
+        Draw everything that changed since the previous frame, and return the screen areas that need to be updated
+        """
+
+        hud_text = (f'XP: {self._player.experience}', f'Gold: {self._player.gold}')
+        if hud_text != self._hud_text:
+            self.renderer.invalidate(self._hud_rect)
+        dirty_rects = self.renderer.draw()
+        if self._hud_rect.collidelist(dirty_rects) != -1 or hud_text != self._hud_text:
+            self._draw_hud(hud_text)
+            dirty_rects.append(self._hud_rect)
+        return dirty_rects
+
+    def close(self):
+        """
+        Save all changes and stop the background work of the game
+        """
+
+        print(f'Zone manager: {self._zones}')
+        self._zones.shutdown()
+        saves.flush()
+
+    def _draw_hud(self, hud_text: Tuple[str, str]):
+        xp_text, gold_text = hud_text
+        height = display_text(self._screen, text=xp_text, font=self._font,
+                              width_offset=self.HUD_LEFT, height_offset=self.HUD_TOP, line_width=60,
                               color=constants.YELLOW, shadow_color=constants.BLACK)
-        display_text(self._screen, text=f'Gold: {self._player.gold}', font=self._font,
-                     width_offset=constants.SCREEN_WIDTH - 120, height_offset=20 + height, line_width=60,
-                     color=constants.YELLOW, shadow_color=constants.BLACK)
+        height += display_text(self._screen, text=gold_text, font=self._font,
+                               width_offset=self.HUD_LEFT, height_offset=self.HUD_TOP + height, line_width=60,
+                               color=constants.YELLOW, shadow_color=constants.BLACK)
+        # Text is drawn 10 pixels below the offset, plus 1 pixel for the shadow
+        self._hud_rect.height = max(self._hud_rect.height, height + 11)
+        self._hud_text = hud_text
 
     @staticmethod
     def _get_saved_data() -> GameDict:
@@ -131,40 +211,88 @@ class Game(Saveable):
         Get the data saved in `current`, or from original if there is no current Game info
         """
 
-        if not os.path.isfile(constants.CURRENT_GAME_FILE):
-            copyfile(constants.ORIGINAL_GAME_FILE, constants.CURRENT_GAME_FILE)
-        with open(constants.CURRENT_GAME_FILE, 'r') as f:
-            return json.load(f)
+        if (data := saves.read(GAME_KEY)) is not None:
+            return data
+        data = journal.read_file(constants.ORIGINAL_GAME_FILE)
+        saves.submit(GAME_KEY, data)
+        return data
 
     def _set_data(self, data: GameDict) -> None:
         """
         Set the given data in this Game instance
         """
 
+        self._leave_zone()
         self._active_zone = data['active_zone']
         self._player = Player.from_json(data['player'])
-        self._zone = Zone.load(data['active_zone'])
+        self._player.set_container(self)
+        # The data is the saved state; the zone knows itself whether it was ever saved
+        self.mark_clean()
+        self._zone = self._zones.get(data['active_zone'])
+        self._zone.occupancy.update(self._player)
+        self._follow_player()
+        self._preload_fight_images()
+        self._renderer = None
+
+    @profiled('Game.enter_zone')
+    def _enter_zone(self, identifier: str):
+        """
+        Make the given zone the active zone
+        """
+
+        self._leave_zone()
+        self._active_zone = identifier
+        self._zone = self._zones.get(identifier)
+        self._player.enter_zone(self._zone.map)
+        self._zone.occupancy.update(self._player)
+        self._follow_player()
+        self._preload_fight_images()
+        self._renderer = None
+        pygame.display.set_caption(f'{constants.TITLE} - {self._zone.name}')
+
+    def _follow_player(self):
+        """
+        Center the camera on the player, and only keep the chunks of the zone map around the camera loaded
+        """
+
+        self._camera.set_zone_size(self._zone.map.width, self._zone.map.height)
+        self._camera.follow(self._player.x, self._player.y)
+        self._zone.map.stream(self._camera.x, self._camera.y, self._camera.width, self._camera.height)
+
+    def _preload_fight_images(self):
+        """
+        Load the enlarged images of the monsters in the active zone, so that a fight starts without loading images
+        """
+
+        for monster_class in {type(monster) for monster in self._zone.monsters}:
+            monster_class.preload([Fight.TILESIZE])
+
+    def _leave_zone(self):
+        if self._zone and self._player:
+            self._zone.occupancy.discard(self._player)
 
     def _quit(self):
+        self.close()
         pygame.quit()
         sys.exit()
 
     def _dialog_have_a_fight(self, monster):
-        fight_dialog = Fight(self._player, monster)
-        fight_dialog.main()
+        scenes.run(Fight(self._player, monster))
+        # The fight was drawn over the zone. The scene stack lets the game redraw itself when it is on the stack, but
+        # the game may also be driven without it (e.g. by the soak test).
+        self.invalidate()
         self.save()
-        self._resume()
 
     def _resume(self):
-        init_pygame()
-        self._all_sprites = None
+        self._renderer = None
         self._keep_looping = True
         data = self._get_saved_data()
         self._set_data(data)
         pygame.display.set_caption(f'{constants.TITLE} - {self._zone.name}')
 
     def _player_died(self):
+        saves.flush()
         TextDialog.show('You are dead! Game over.')
-        self._keep_looping = False
-        init_pygame()
+        # The game scene keeps running, so the player can still restart with R or quit
+        self.invalidate()
         # TODO: Restart game from latest savegame when _player dies
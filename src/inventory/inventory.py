@@ -1,10 +1,12 @@
 import os.path
-from importlib import import_module
-from typing import Type, Dict, TypedDict
+from typing import Type, TypedDict, Optional
 
 import pygame
 
 import constants
+from assets import load_image
+from registry import Registry
+from saveable import Saveable
 
 
 class InventoryDict(TypedDict):
@@ -15,21 +17,30 @@ class InventoryDict(TypedDict):
     identifier: str
     name: str
     value: int
+    x: Optional[int]  # Position on the map, None if the object is not on the map
+    y: Optional[int]
 
 
-class InventoryObject:
+class InventoryObject(Saveable):
     IMAGE_DIR: str = os.path.join(constants.DATA_DIR, 'images', 'inventory')
+    JSON_SCHEMA = InventoryDict
 
     # To be defined by concrete implementations
     IMAGE: str
     IDENTIFIER: str
 
-    _identifier_to_klass: Dict[str, Type['InventoryObject']] = {}
+    registry: Registry = Registry('inventory', base_module='inventory.inventory')
 
-    def __init__(self, name: str, value: int, **kwargs):
+    def __init__(self, name: str, value: int, x: int = None, y: int = None, **kwargs):
         self.name: str = name
         self.value: int = value
+        self.x: Optional[int] = x
+        self.y: Optional[int] = y
         self.image: pygame.Surface = self._load_image(self.IMAGE)
+        # Objects on the map are drawn like the other sprites on the map
+        self.rect: Optional[pygame.Rect] = None
+        if self.is_on_map():
+            self.rect = self.image.get_rect().move(x * constants.TILESIZE, y * constants.TILESIZE)
 
     @classmethod
     def register(cls, identifier: str, klass: Type['InventoryObject']):
@@ -37,40 +48,28 @@ class InventoryObject:
         Class method to be called in the modules where the concrete inventory objects are implemented
         """
 
-        cls._identifier_to_klass[identifier] = klass
+        cls.registry.register(identifier, klass)
+
+    @classmethod
+    def get_type(cls, identifier: str) -> Type['InventoryObject']:
+        return cls.registry.get(identifier)
 
     @classmethod
     def from_json(cls, data: InventoryDict, **kwargs) -> 'InventoryObject':
-        identifier = data['identifier']
-        try:
-            klass = cls._identifier_to_klass[identifier]
-            return klass(**data, **kwargs)
-        except KeyError:
-            raise AssertionError(f'Inventory object {identifier} is not registered')
-
-    def as_json(self) -> InventoryDict:
-        # noinspection PyUnresolvedReferences
-        return {
-            field: getattr(self, field)
-            for field in InventoryDict.__required_keys__
-        }
+        return cls.get_type(data['identifier'])(**data, **kwargs)
+
+    @property
+    def identifier(self) -> str:
+        return self.IDENTIFIER
+
+    def update(self, *args, **kwargs):
+        pass
+
+    def is_on_map(self) -> bool:
+        return self.x is not None and self.y is not None
 
     def _load_image(self, image_name: str) -> pygame.Surface:
-        filepath = os.path.join(self.IMAGE_DIR, image_name)
-        try:
-            return pygame.image.load(filepath).convert_alpha()
-        except Exception as e:
-            s = f'Couldn\'t open {filepath}: {e}'
-            raise ValueError(s) from e
+        return load_image(self.IMAGE_DIR, image_name, size=(constants.TILESIZE, constants.TILESIZE))
 
     def __str__(self):
         return self.name
-
-
-dirname = os.path.dirname(__file__)
-modules = os.scandir(dirname)
-for module in modules:
-    if module.name.startswith('__') or module.name == 'monster.py':
-        continue
-    module_name = os.path.splitext(module.name)[0]
-    import_module(f'monster.{module_name}')
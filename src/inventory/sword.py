@@ -6,8 +6,8 @@ class Sword(Weapon):
     IMAGE = 'sword.png'
     IDENTIFIER = 'sword'
 
-    def __init__(self, **kwargs):
-        super().__init__(name='Sword', value=200)
+    def __init__(self, name: str = 'Sword', value: int = 200, **kwargs):
+        super().__init__(name=name, value=value, **kwargs)
 
 
 InventoryObject.register(Sword.IDENTIFIER, Sword)
@@ -0,0 +1,256 @@
+"""
+Append-only journal of changes to saved state
+
+Instead of rewriting a whole save file when only a few values changed, the journal appends one line per save with
+the changed values. A save file is read by loading its last full snapshot and replaying the journal on top of it.
+When the journal grows beyond a threshold, it is compacted: full snapshots of all journaled files are written, and
+the journal is emptied.
+
+Each line of the journal is a JSON object: {"file": <path relative to the journal>, "changes": [[<path>, <value>]]},
+where <path> is the list of keys and indices that lead to the changed value. An empty path replaces the whole state.
+Changes can only be replayed on the snapshot they were made against: a change of a list length or of the keys of a
+dict replaces the whole value, after which older paths into that value may no longer exist.
+
+Compaction therefore happens in two phases. The new snapshots are first written next to the current ones, with the
+suffix COMPACTED_SUFFIX. Renaming the journal to COMPACTING_SUFFIX then commits the compaction, after which the new
+snapshots replace the current ones and the renamed journal is removed. After a crash before the rename, the new
+snapshots are discarded and the journal is replayed on the current snapshots; after a crash later on, the remaining
+new snapshots are put in place, and the journal is not replayed.
+
+The journal itself is always JSON, snapshots are written in the save format of the journal, see `savecodec`.
+"""
+
+import json
+import os.path
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import constants
+import savecodec
+
+COMPACTED_SUFFIX = '.compacted'  # Suffix of the snapshots written by a compaction that is not committed yet
+COMPACTING_SUFFIX = '.compacting'  # Suffix of the journal of a committed compaction that is not finished yet
+
+Path = List  # Keys and indices leading to a value in a JSON structure
+Change = Tuple[Path, Any]
+
+
+class Journal:
+    compact_size: int  # Size of the journal in bytes above which it is compacted
+    save_format: str  # Format in which snapshots are written, see `savecodec`
+
+    _states: Dict[str, Dict]  # Latest known state per file
+    _journaled: Dict[str, List[Change]]  # Changes in the journal that are not in the snapshot yet, per file
+
+    def __init__(self, filepath: str = constants.JOURNAL_FILE, compact_size: int = constants.JOURNAL_COMPACT_SIZE,
+                 save_format: str = constants.SAVE_FORMAT):
+        savecodec.get_codec(save_format)  # Fail early on an unknown format
+        self.filepath = filepath
+        self.compact_size = compact_size
+        self.save_format = save_format
+        self._dir = os.path.dirname(filepath)
+        self._states = {}
+        self._journaled = None
+        self._lock = threading.RLock()
+
+    def read(self, filepath: str) -> Optional[Dict]:
+        """
+        Return the state of the given file with all journaled changes applied, or None if the file was never saved
+        """
+
+        with self._lock:
+            if (state := self._states.get(filepath)) is not None:
+                return state
+            # Reading the journal first finishes an interrupted compaction, which can replace the snapshot
+            journaled = self._get_journaled()
+            state = None
+            if os.path.isfile(filepath):
+                state = read_file(filepath)
+            for path, value in journaled.get(self._relative(filepath), []):
+                state = apply_change(state, path, value)
+            if state is not None:
+                self._states[filepath] = state
+            return state
+
+    def write(self, filepath: str, data: Dict):
+        """
+        Append the changes between the latest known state of the file and the given state to the journal
+        """
+
+        with self._lock:
+            changes = diff(self.read(filepath), data)
+            self._states[filepath] = data
+            if not changes:
+                return
+            relative_path = self._relative(filepath)
+            self._get_journaled().setdefault(relative_path, []).extend(changes)
+            with open(self.filepath, 'a') as f:
+                f.write(json.dumps({'file': relative_path, 'changes': changes}, separators=(',', ':')) + '\n')
+                size = f.tell()
+            if size > self.compact_size:
+                self.compact()
+
+    def write_snapshot(self, filepath: str, data: Dict):
+        """
+        Write the full state of the file, instead of appending the changes to the journal
+        """
+
+        with self._lock:
+            if self.has_changes():
+                # Otherwise the journal would be replayed on top of the new snapshot
+                self.compact()
+            write_file(filepath, data, self.save_format)
+            self._states[filepath] = data
+
+    def compact(self):
+        """
+        Write full snapshots of all files with journaled changes, and empty the journal
+        """
+
+        with self._lock:
+            for relative_path in self._get_journaled():
+                filepath = os.path.join(self._dir, relative_path)
+                if (state := self.read(filepath)) is not None:
+                    write_file(filepath + COMPACTED_SUFFIX, state, self.save_format)
+            # Only when all new snapshots are written, the compaction is committed
+            if os.path.isfile(self.filepath):
+                os.replace(self.filepath, self.filepath + COMPACTING_SUFFIX)
+            self._finish_compaction()
+            self._journaled = {}
+
+    def has_changes(self) -> bool:
+        with self._lock:
+            return bool(self._get_journaled())
+
+    def get_journaled_files(self) -> List[str]:
+        """
+        Return the paths of all files with changes in the journal, including files that have no snapshot yet
+        """
+
+        with self._lock:
+            return [os.path.join(self._dir, relative_path) for relative_path in self._get_journaled()]
+
+    def clear(self):
+        """
+        Forget all state and remove the journal, e.g. because the saved game was removed
+        """
+
+        with self._lock:
+            for path in (self.filepath, self.filepath + COMPACTING_SUFFIX):
+                if os.path.isfile(path):
+                    os.remove(path)
+            self._states = {}
+            self._journaled = {}
+
+    # Helper methods
+
+    def _get_journaled(self) -> Dict[str, List[Change]]:
+        if self._journaled is None:
+            if os.path.isfile(self.filepath + COMPACTING_SUFFIX):
+                self._finish_compaction()
+            self._journaled = self._read_records(self.filepath)
+            # New snapshots of a compaction that was not committed, which may not even be complete
+            for relative_path in self._journaled:
+                filepath = os.path.join(self._dir, relative_path) + COMPACTED_SUFFIX
+                if os.path.isfile(filepath):
+                    os.remove(filepath)
+        return self._journaled
+
+    def _finish_compaction(self):
+        """
+        Put the new snapshots of a committed compaction in place, and remove its journal
+        """
+
+        compacting_path = self.filepath + COMPACTING_SUFFIX
+        if not os.path.isfile(compacting_path):
+            return
+        for relative_path in self._read_records(compacting_path):
+            filepath = os.path.join(self._dir, relative_path)
+            if os.path.isfile(filepath + COMPACTED_SUFFIX):
+                os.replace(filepath + COMPACTED_SUFFIX, filepath)
+        os.remove(compacting_path)
+
+    @staticmethod
+    def _read_records(filepath: str) -> Dict[str, List[Change]]:
+        journaled = {}
+        if os.path.isfile(filepath):
+            with open(filepath, 'r') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A crash while appending can leave the last line incomplete
+                        print(f'Skipping incomplete line in {filepath}')
+                        continue
+                    journaled.setdefault(record['file'], []).extend(record['changes'])
+        return journaled
+
+    def _relative(self, filepath: str) -> str:
+        return os.path.relpath(filepath, self._dir)
+
+
+def diff(old: Any, new: Any, path: Path = None) -> List[Change]:
+    """
+    Return the changes that turn the old JSON structure into the new one
+
+    >>> diff({'x': 1, 'y': [{'a': 1}, {'a': 2}]}, {'x': 1, 'y': [{'a': 1}, {'a': 3}]})
+    [(['y', 1, 'a'], 3)]
+    >>> diff({'x': [1]}, {'x': [1, 2]})
+    [(['x'], [1, 2])]
+    >>> diff(None, {'x': 1})
+    [([], {'x': 1})]
+    """
+
+    path = path or []
+    if isinstance(old, dict) and isinstance(new, dict) and old.keys() == new.keys():
+        return [change for key in new for change in diff(old[key], new[key], path + [key])]
+    if isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        return [change for index, (o, n) in enumerate(zip(old, new)) for change in diff(o, n, path + [index])]
+    if old != new:
+        return [(path, new)]
+    return []
+
+
+def apply_change(state: Any, path: Path, value: Any) -> Any:
+    """
+    Set the value at the given path in the state, and return the resulting state
+
+    >>> apply_change({'y': [{'a': 1}]}, ['y', 0, 'a'], 3)
+    {'y': [{'a': 3}]}
+    >>> apply_change({'y': 1}, [], {'x': 2})
+    {'x': 2}
+    """
+
+    if not path:
+        return value
+    parent = state
+    for key in path[:-1]:
+        parent = parent[key]
+    parent[path[-1]] = value
+    return state
+
+
+def read_file(filepath: str) -> Dict:
+    """
+    Read a save file of any format
+    """
+
+    with open(filepath, 'rb') as f:
+        return savecodec.loads(f.read())
+
+
+def write_file(filepath: str, data: Dict, save_format: str = constants.SAVE_FORMAT):
+    """
+    Write the data in the given format to a temporary file next to the given file, and then rename it to the given file
+    """
+
+    content = savecodec.dumps(data, save_format)
+    fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(filepath))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
@@ -1,18 +1,22 @@
 # https://www.youtube.com/watch?v=MfoqWsTv1Wg&t=0s
 # https://github.com/poly451/Tutorials/tree/master/Python:%20Create%20a%20Grid/Create%20a%20Grid%2004
 
-import pygame
-
 from game import Game
+from assets import images
+from profiler import profiler
+from scenes import scenes
+from text import texts
 
 
 def run():
-    game = Game.load()
-
-    while True:
-        game.handle_events()
-        game.draw()
-        pygame.display.update()
+    try:
+        scenes.run(Game.load())
+    finally:
+        print(f'Main loop: {scenes.scheduler}')
+        print(f'Image cache: {images.stats()}')
+        print(f'Text cache: {texts.stats()}')
+        print(f'Profiler: {profiler}')
+        profiler.close()
 
 
 if __name__ == '__main__':
@@ -7,15 +7,11 @@ class GiantBat(Monster):
     NAMES = ['Nether', 'Countie']
 
     identifier = 'giant_bat'
-
-    def __init__(self, **kwargs):
-        self.hit_points = 10
-        self.kind = 'Giant Bat'
-        self.armor = 0
-        self.max_damage = 3
-        self.chance_to_hit = 80
-        self.max_hit_points = 10
-        super().__init__(**kwargs)
+    kind = 'Giant Bat'
+    armor = 0
+    max_damage = 3
+    chance_to_hit = 80
+    max_hit_points = 10
 
     @property
     def experience_when_killed(self) -> int:
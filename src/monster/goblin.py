@@ -9,15 +9,11 @@ class Goblin(Monster):
     NAMES = ['Groblin', 'Gobblin', 'Grumlin', 'Skarlin', 'Snaglin', 'Griblin', 'Gibblin', 'Grotlin', 'Grulkin', 'Grell']
 
     identifier = 'goblin'
-
-    def __init__(self, **kwargs):
-        self.kind = 'Goblin'
-        self.armor = 0
-        self.max_damage = 4
-        self.chance_to_hit = 75
-        self.max_hit_points = 14
-        self.hit_points = 14
-        super().__init__(**kwargs)
+    kind = 'Goblin'
+    armor = 0
+    max_damage = 4
+    chance_to_hit = 75
+    max_hit_points = 14
 
     @property
     def gold_when_killed(self) -> int:
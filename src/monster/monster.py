@@ -1,10 +1,11 @@
 import os.path
 import random
-from importlib import import_module
-from typing import Type, Dict, Union
+from typing import Any, Type, Dict, Optional, Tuple, Union
 
 import constants
 from creature import Creature, CreatureDict
+from monstertable import Column, MonsterTable, COLUMN_TYPES
+from registry import Registry
 from zonemap import MonsterAssignment
 
 
@@ -17,38 +18,105 @@ class MonsterDict(CreatureDict):
 
 
 class Monster(Creature):
+    """
+    Monster on a zone map
+
+    The state of the monsters of a zone is stored in the monster table of the zone, and a monster is a view on its row
+    of the table, see `MonsterTable`. Concrete monsters declare their stats as class attributes, which become the
+    defaults of the columns.
+    """
+
     IMAGE_DIR: str = os.path.join(constants.DATA_DIR, 'images', 'monster')
+    JSON_SCHEMA = MonsterDict
     NAMES = ['Monster']
 
-    _identifier_to_klass: Dict[str, Type['Monster']] = {}
+    registry: Registry = Registry('monster', base_module='monster.monster')
+
+    name = Column()
+    kind = Column()
+    x = Column()
+    y = Column()
+    armor = Column()
+    max_damage = Column()
+    chance_to_hit = Column()
+    max_hit_points = Column()
+    hit_points = Column()
+    identifier = Column()
+
+    table: Optional[MonsterTable] = None  # Table with the state of this monster, None while it is not in a zone
+    row: int = 0  # Row of this monster in the table
+
+    _defaults: Dict[str, Any] = {}
+
+    # The columns track changes themselves, so every other attribute can be written without the overhead of
+    # `Saveable.__setattr__`, which matters when a zone with thousands of monsters is loaded
+    __setattr__ = object.__setattr__
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._defaults = {**cls._defaults}
+        for field in COLUMN_TYPES:
+            value = cls.__dict__.get(field)
+            if value is not None and not isinstance(value, Column):
+                cls._defaults[field] = value
+                delattr(cls, field)
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.name = self._get_name()
 
+    @classmethod
+    def get_default(cls, field: str) -> Any:
+        try:
+            return cls._defaults[field]
+        except KeyError:
+            raise AttributeError(f'{cls.__name__} has no {field}') from None
+
+    def get_column_values(self) -> Tuple:
+        """
+        Return the values of the columns of this monster, in the order of COLUMN_TYPES
+        """
+
+        if self.table is not None:
+            return tuple(column[self.row] for column in self.table.columns.values())
+        # Read directly from the instance, which is much faster than going through the columns one by one
+        state, defaults = self.__dict__, self._defaults
+        return tuple(state[field] if field in state else defaults[field] for field in COLUMN_TYPES)
+
+    def attach(self, table: MonsterTable, row: int):
+        """
+        Make this monster a view on the given row of the table, which must already hold its state
+        """
+
+        state = self.__dict__
+        for field in state.keys() & COLUMN_TYPES.keys():
+            del state[field]
+        self.table = table
+        self.row = row
+
     @classmethod
     def register(cls, identifier: str, klass: Type['Monster']):
         """
         Class method to be called in the modules where the concrete monsters are implemented
         """
 
-        cls._identifier_to_klass[identifier] = klass
+        cls.registry.register(identifier, klass)
 
     @classmethod
-    def from_json(cls, data: Union[MonsterDict, MonsterAssignment], **kwargs) -> 'Monster':
-        identifier = data['identifier']
-        try:
-            klass = cls._identifier_to_klass[identifier]
-            return klass(**data, **kwargs)
-        except KeyError:
-            raise AssertionError(f'Monster {identifier} is not registered')
+    def registered_types(cls) -> Dict[str, Type['Monster']]:
+        """
+        Return all types of monsters, which imports the modules of all monsters
+        """
 
-    def as_json(self) -> MonsterDict:
-        # noinspection PyUnresolvedReferences
-        return {
-            field: getattr(self, field)
-            for field in MonsterDict.__required_keys__
-        }
+        return cls.registry.load_all()
+
+    @classmethod
+    def get_type(cls, identifier: str) -> Type['Monster']:
+        return cls.registry.get(identifier)
+
+    @classmethod
+    def from_json(cls, data: Union[MonsterDict, MonsterAssignment], **kwargs) -> 'Monster':
+        return cls.get_type(data['identifier'])(**data, **kwargs)
 
     @property
     def gold_when_killed(self) -> int:
@@ -63,12 +131,3 @@ class Monster(Creature):
 
     def __str__(self):
         return f'{self.kind} {self.name}'
-
-
-dirname = os.path.dirname(__file__)
-modules = os.scandir(dirname)
-for module in modules:
-    if module.name.startswith('__') or module.name == 'monster.py':
-        continue
-    module_name = os.path.splitext(module.name)[0]
-    import_module(f'monster.{module_name}')
@@ -0,0 +1,113 @@
+"""
+Index of the entities (monsters, objects, the player) on each tile of a zone
+"""
+
+from typing import Dict, Iterator, List, Optional, Tuple
+
+Entity = object  # Anything with an x and y position on the map
+
+
+class OccupancyGrid:
+    """
+    One cell per occupied tile, holding the entities on that tile
+
+    The grid must be told when an entity moves (see `update`), after which lookups by position take O(1), and lookups
+    by rectangle take O(min(area, occupied tiles)) instead of a scan over all entities.
+
+    The cells are a dict keyed by position rather than an array of entity ids with one element per tile: zones have
+    up to a million tiles but at most thousands of entities, and the entities are Python objects, which a dense array
+    could only refer to through another lookup table. Only occupied tiles take memory, so the grid stays small on very
+    large maps.
+    """
+
+    width: int
+    height: int
+
+    _cells: Dict[Tuple[int, int], List[Entity]]  # Entities per occupied tile
+    _positions: Dict[Entity, Tuple[int, int]]  # Position in the grid of each entity
+
+    def __init__(self, width: int, height: int, entities: List[Entity] = ()):
+        self.width = width
+        self.height = height
+        self._cells = {}
+        self._positions = {}
+        for entity in entities:
+            self.add(entity)
+
+    def add(self, entity: Entity):
+        position = (entity.x, entity.y)
+        self._positions[entity] = position
+        self._cell(*position).append(entity)
+
+    def remove(self, entity: Entity):
+        position = self._positions.pop(entity)
+        cell = self._cells[position]
+        cell.remove(entity)
+        if not cell:
+            del self._cells[position]
+
+    def discard(self, entity: Entity):
+        """
+        Remove the entity from the grid if it is in the grid
+        """
+
+        if entity in self._positions:
+            self.remove(entity)
+
+    def update(self, entity: Entity):
+        """
+        Move the entity in the grid to its current position, if it changed
+        """
+
+        if self._positions.get(entity) != (entity.x, entity.y):
+            if entity in self._positions:
+                self.remove(entity)
+            self.add(entity)
+
+    def at(self, x: int, y: int) -> List[Entity]:
+        """
+        Return the entities on the given tile
+        """
+
+        return list(self._cells.get((x, y), ()))
+
+    def first(self, x: int, y: int, kind: type) -> Optional[Entity]:
+        """
+        Return the first entity of the given type on the given tile, or None if there is none
+        """
+
+        return next((entity for entity in self.at(x, y) if isinstance(entity, kind)), None)
+
+    def is_free(self, x: int, y: int) -> bool:
+        """
+        Return whether there is no living creature on the given tile
+        """
+
+        return all(entity.is_dead() for entity in self.at(x, y) if hasattr(entity, 'is_dead'))
+
+    def in_rect(self, x: int, y: int, width: int, height: int) -> Iterator[Entity]:
+        """
+        Iterate over the entities on the tiles in the given rectangle
+        """
+
+        if width * height > len(self._cells):
+            for (cell_x, cell_y), cell in list(self._cells.items()):
+                if x <= cell_x < x + width and y <= cell_y < y + height:
+                    yield from cell
+            return
+        for row in range(max(y, 0), min(y + height, self.height)):
+            for column in range(max(x, 0), min(x + width, self.width)):
+                yield from self._cells.get((column, row), ())
+
+    def __contains__(self, entity: Entity) -> bool:
+        return entity in self._positions
+
+    def __len__(self):
+        return len(self._positions)
+
+    # Helper methods
+
+    def _cell(self, x: int, y: int) -> List[Entity]:
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            raise ValueError(f'Position ({x}, {y}) is outside of the grid of {self.width}x{self.height}')
+        return self._cells.setdefault((x, y), [])
@@ -0,0 +1,172 @@
+"""
+Pathfinding for creatures on a zone map
+
+Monsters that chase the player all walk to the same tile, so instead of searching a path for every monster, one
+distance field towards the player is computed per move of the player: a breadth-first expansion from the player
+over the walkable tiles around it, done for all tiles of the wavefront at once with NumPy. Every monster then finds
+its next step with a single lookup.
+"""
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+import constants
+from zonemap import ZoneMap
+
+Position = Tuple[int, int]
+
+UNREACHABLE = -1  # Distance of tiles from which the target cannot be reached
+NO_STEP = -1  # Direction of tiles from which there is no step that brings you closer to the target
+STEPS: Tuple[Position, ...] = ((0, -1), (1, 0), (0, 1), (-1, 0))  # (dx, dy) per direction in a distance field
+
+
+class DistanceField:
+    """
+    Number of steps from each tile in a window of the zone map to the target, and the direction of the first step
+    """
+
+    target: Position
+    x: int  # Left-most tile of the window
+    y: int  # Top-most tile of the window
+    distances: np.ndarray  # Steps to the target per tile in the window, indexed [y, x]
+    directions: np.ndarray  # Index in STEPS of the step towards the target per tile in the window, indexed [y, x]
+
+    def __init__(self, target: Position, x: int, y: int, walkable: np.ndarray):
+        self.target = target
+        self.x = x
+        self.y = y
+        self.distances = self._expand(target[0] - x, target[1] - y, walkable)
+        self.directions = self._descend(self.distances)
+
+    def distance(self, x: int, y: int) -> int:
+        if not self._contains(x, y):
+            return UNREACHABLE
+        return int(self.distances[y - self.y, x - self.x])
+
+    def next_step(self, x: int, y: int) -> Optional[Position]:
+        """
+        Return the tile to step to from the given tile to get closer to the target, or None if there is none
+        """
+
+        if not self._contains(x, y):
+            return None
+        direction = self.directions[y - self.y, x - self.x]
+        if direction == NO_STEP:
+            return None
+        dx, dy = STEPS[direction]
+        return x + dx, y + dy
+
+    # Helper methods
+
+    def _contains(self, x: int, y: int) -> bool:
+        height, width = self.distances.shape
+        return 0 <= x - self.x < width and 0 <= y - self.y < height
+
+    @staticmethod
+    def _expand(target_x: int, target_y: int, walkable: np.ndarray) -> np.ndarray:
+        """
+        Breadth-first expansion from the target over the walkable tiles, one wavefront per step
+        """
+
+        distances = np.full(walkable.shape, UNREACHABLE, dtype=np.int32)
+        distances[target_y, target_x] = 0
+        frontier = np.zeros(walkable.shape, dtype=bool)
+        frontier[target_y, target_x] = True
+        step = 0
+        while frontier.any():
+            step += 1
+            grown = np.zeros_like(frontier)
+            grown[1:, :] |= frontier[:-1, :]
+            grown[:-1, :] |= frontier[1:, :]
+            grown[:, 1:] |= frontier[:, :-1]
+            grown[:, :-1] |= frontier[:, 1:]
+            grown &= walkable & (distances == UNREACHABLE)
+            distances[grown] = step
+            frontier = grown
+        return distances
+
+    @staticmethod
+    def _descend(distances: np.ndarray) -> np.ndarray:
+        """
+        Return the direction to the neighbor with the lowest distance for each tile, if that is lower than its own
+        """
+
+        far = np.iinfo(np.int32).max
+        own = np.where(distances == UNREACHABLE, far, distances)
+        padded = np.pad(own, 1, constant_values=far)
+        # Neighbors in the order of STEPS: north, east, south, west
+        neighbors = np.stack([padded[:-2, 1:-1], padded[1:-1, 2:], padded[2:, 1:-1], padded[1:-1, :-2]])
+        best = neighbors.argmin(axis=0)
+        lowest = np.take_along_axis(neighbors, best[np.newaxis], axis=0)[0]
+        return np.where(lowest < own, best, NO_STEP).astype(np.int8)
+
+
+class Pathfinder:
+    """
+    Distance fields on a zone map, cached until the target moves or the terrain changes
+    """
+
+    zone_map: ZoneMap
+    radius: int  # Distance fields cover this many tiles around the target
+
+    _walkable_ids: np.ndarray  # Walkability per tile type id
+    _field: Optional[DistanceField]
+    _fields_computed: int
+
+    def __init__(self, zone_map: ZoneMap, radius: int = constants.PATHFINDING_RADIUS):
+        self.zone_map = zone_map
+        self.radius = radius
+        self._walkable_ids = np.array([tile_type.walkable for tile_type in zone_map.tile_types], dtype=bool)
+        self._field = None
+        self._fields_computed = 0
+
+    def distance_field(self, target: Position) -> DistanceField:
+        """
+        Return the distance field towards the given target, which is only computed when the target moved
+        """
+
+        if self._field is None or self._field.target != target:
+            x = max(target[0] - self.radius, 0)
+            y = max(target[1] - self.radius, 0)
+            width = min(target[0] + self.radius + 1, self.zone_map.width) - x
+            height = min(target[1] + self.radius + 1, self.zone_map.height) - y
+            self._field = DistanceField(target, x, y, self.walkable(x, y, width, height))
+            self._fields_computed += 1
+        return self._field
+
+    def next_step(self, x: int, y: int, target: Position) -> Optional[Position]:
+        """
+        Return the tile to step to from the given tile to get closer to the target, or None if there is none
+        """
+
+        return self.distance_field(target).next_step(x, y)
+
+    def invalidate(self):
+        """
+        Forget the distance field, e.g. when the terrain changed
+        """
+
+        self._field = None
+
+    def walkable(self, x: int, y: int, width: int, height: int) -> np.ndarray:
+        """
+        Return whether each tile in the given area can be walked on, indexed [y, x]
+        """
+
+        size = self.zone_map.chunk_size
+        walkable = np.zeros((height, width), dtype=bool)
+        for chunk_y in range(y // size, (y + height - 1) // size + 1):
+            for chunk_x in range(x // size, (x + width - 1) // size + 1):
+                tile_type_ids = np.frombuffer(self.zone_map.chunk(chunk_x, chunk_y), dtype=np.uint8)
+                chunk = self._walkable_ids[tile_type_ids].reshape(size, size)
+                # Overlap of the chunk and the area, in tiles on the map
+                left, top = max(chunk_x * size, x), max(chunk_y * size, y)
+                right, bottom = min((chunk_x + 1) * size, x + width), min((chunk_y + 1) * size, y + height)
+                chunk_left, chunk_top = left - chunk_x * size, top - chunk_y * size
+                walkable[top - y:bottom - y, left - x:right - x] = chunk[chunk_top:chunk_top + bottom - top,
+                                                                         chunk_left:chunk_left + right - left]
+        return walkable
+
+    def stats(self) -> Dict[str, int]:
+        return {'fields_computed': self._fields_computed}
@@ -1,4 +1,5 @@
 import os.path
+from typing import Optional
 
 import constants
 from creature import Creature, CreatureDict
@@ -19,6 +20,7 @@ class PlayerDict(CreatureDict):
 
 class Player(OrientedTile, Creature):
     IMAGE_DIR: str = os.path.join(constants.DATA_DIR, 'images', 'player')
+    JSON_SCHEMA = PlayerDict
     IMAGE = constants.PLAYER_IMG
     IMAGE_DEAD = constants.PLAYER_IMG_DEAD
 
@@ -34,7 +36,13 @@ class Player(OrientedTile, Creature):
         self.gold = gold
         self.experience = experience
 
-    def move(self, direction: Direction, zone_map: ZoneMap):
+    def move(self, direction: Direction, zone_map: ZoneMap) -> Optional[str]:
+        """
+        Move one tile in the given direction, and return the neighboring zone if the player walks off the zone map
+
+        When a zone is returned, the player is not moved yet; see `enter_zone`.
+        """
+
         if self.is_dead():
             print('You cannot move when you are dead')
             return
@@ -43,40 +51,33 @@ class Player(OrientedTile, Creature):
         self.orient_towards(direction)
         dx, dy = convert_direction_to_dx_dy(direction)
         if self.x + dx < 0:
-            zone_to_move_to = zone_map.neighbor_zones[WEST]
-            self.x = constants.NR_BLOCKS_WIDE - 1
-            self.rect = self.rect.move((constants.NR_BLOCKS_WIDE - 1) * constants.TILESIZE, 0)
-            print(f'Move WEST to {self.x}, {self.y} on {zone_to_move_to}')
-            return zone_to_move_to
-        if self.x + dx >= constants.NR_BLOCKS_WIDE:
-            zone_to_move_to = zone_map.neighbor_zones[EAST]
-            self.x = 0
-            self.rect = self.rect.move(-(constants.NR_BLOCKS_HIGH - 1) * constants.TILESIZE, 0)
-            print(f'Move EAST to {self.x}, {self.y} on {zone_to_move_to}')
-            return zone_to_move_to
+            return zone_map.neighbor_zones[WEST]
+        if self.x + dx >= zone_map.width:
+            return zone_map.neighbor_zones[EAST]
         if self.y + dy < 0:
-            zone_to_move_to = zone_map.neighbor_zones[NORTH]
-            self.y = constants.NR_BLOCKS_HIGH - 1
-            self.rect = self.rect.move(0, (constants.NR_BLOCKS_HIGH - 1) * constants.TILESIZE)
-            print(f'Move NORTH to {self.x}, {self.y} on {zone_to_move_to}')
-            return zone_to_move_to
-        if self.y + dy >= constants.NR_BLOCKS_HIGH:
-            zone_to_move_to = zone_map.neighbor_zones[SOUTH]
-            self.y = 0
-            self.rect = self.rect.move(0, -(constants.NR_BLOCKS_HIGH - 1) * constants.TILESIZE)
-            print(f'Move SOUTH to {self.x}, {self.y} on {zone_to_move_to}')
-            return zone_to_move_to
+            return zone_map.neighbor_zones[NORTH]
+        if self.y + dy >= zone_map.height:
+            return zone_map.neighbor_zones[SOUTH]
         elif zone_map.tile_is_walkable(self.x + dx, self.y + dy):
             self.x += dx
             self.y += dy
             self.rect = self.rect.move(dx * constants.TILESIZE, dy * constants.TILESIZE)
 
-    def as_json(self) -> PlayerDict:
-        # noinspection PyUnresolvedReferences
-        return {
-            field: getattr(self, field)
-            for field in PlayerDict.__required_keys__
-        }
+    def enter_zone(self, zone_map: ZoneMap):
+        """
+        Place the player on the edge of the zone map where it walks in, coming from the previous zone
+        """
+
+        dx, dy = convert_direction_to_dx_dy(self.direction)
+        if dx:
+            self.x = 0 if dx > 0 else zone_map.width - 1
+        if dy:
+            self.y = 0 if dy > 0 else zone_map.height - 1
+        # Neighboring zones do not need to have the same size
+        self.x = min(self.x, zone_map.width - 1)
+        self.y = min(self.y, zone_map.height - 1)
+        self.rect.topleft = (self.x * constants.TILESIZE, self.y * constants.TILESIZE)
+        print(f'Enter {zone_map.name} at {self.x}, {self.y}')
 
     def __str__(self):
         return self.name
@@ -0,0 +1,117 @@
+"""
+Background prefetching of the zones next to the active zone
+"""
+
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import constants
+from profiler import profiled
+from zone import Zone, ZoneDict
+from zonecompiler import CompiledZone
+
+ZoneSource = Tuple[CompiledZone, Optional[ZoneDict]]
+
+
+def _close_source(future: Future):
+    if not future.cancelled() and future.exception() is None:
+        compiled_zone, _ = future.result()
+        compiled_zone.close()
+
+
+class ZonePrefetcher:
+    """
+    Read the neighbor zones of the active zone on a worker thread, so that moving to another zone does not wait for disk
+
+    The worker thread only does the disk I/O and parsing (see `Zone.read`). Sprites are created on the display thread
+    when the zone is taken, which is cheap because their images are shared through the image cache.
+    """
+
+    max_size: int
+    hits: int  # Number of transitions to a zone that was already prefetched
+    misses: int  # Number of transitions to a zone that had to be read synchronously
+    transition_times: List[float]  # Seconds it took to hand over a zone, per transition
+
+    _pool: 'OrderedDict[str, Future]'
+
+    def __init__(self, max_size: int = constants.PREFETCH_POOL_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.transition_times = []
+        self._pool = OrderedDict()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='zone-prefetch')
+
+    def prefetch(self, identifier: str):
+        """
+        Start reading the given zone in the background, unless it is already in the pool
+        """
+
+        if identifier in self._pool:
+            self._pool.move_to_end(identifier)
+            return
+        self._pool[identifier] = self._executor.submit(Zone.read, identifier)
+        while len(self._pool) > self.max_size:
+            _, future = self._pool.popitem(last=False)
+            self._drop(future)
+
+    @profiled('ZonePrefetcher.take')
+    def take(self, identifier: str) -> Zone:
+        """
+        Return the given zone, from the pool if it was prefetched, or read from disk otherwise
+        """
+
+        start = time.perf_counter()
+        future = self._pool.pop(identifier, None)
+        source = None
+        if future is not None and not future.cancelled():
+            try:
+                source = future.result()
+            except Exception as e:
+                print(f'Prefetching zone {identifier} failed, reading it again: {e}')
+        if source is None:
+            self.misses += 1
+            source = Zone.read(identifier)
+        else:
+            self.hits += 1
+        zone = Zone.from_source(*source)
+        self.transition_times.append(time.perf_counter() - start)
+        return zone
+
+    def clear(self):
+        """
+        Remove all zones from the pool, e.g. because the saved game was removed
+        """
+
+        for future in self._pool.values():
+            self._drop(future)
+        self._pool.clear()
+
+    def shutdown(self):
+        self.clear()
+        self._executor.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, float]:
+        transitions = self.hits + self.misses
+        times = self.transition_times
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / transitions if transitions else 0.0,
+                'mean_transition_ms': 1000 * sum(times) / len(times) if times else 0.0,
+                'max_transition_ms': 1000 * max(times) if times else 0.0}
+
+    # Helper methods
+
+    @staticmethod
+    def _drop(future: Future):
+        """
+        Cancel reading a zone, or close the compiled zone once it is read
+        """
+
+        if not future.cancel():
+            future.add_done_callback(_close_source)
+
+    def __str__(self):
+        stats = self.stats()
+        return (f'{stats["hit_rate"]:.0%} hit rate over {self.hits + self.misses} transitions, '
+                f'{stats["mean_transition_ms"]:.1f} ms mean and {stats["max_transition_ms"]:.1f} ms max latency')
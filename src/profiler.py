@@ -0,0 +1,269 @@
+"""
+Instrumentation of the game loops: time spent per phase of every frame, an on-screen overlay, and trace export
+
+Phases are timed with `profiler.phase(name)` or the `profiled(name)` decorator. While the profiler is disabled, a phase
+costs one attribute lookup, so the instrumentation can stay in the code. The timings can be exported as a Chrome
+trace (open it in chrome://tracing or https://ui.perfetto.dev), and a number of frames can be captured with cProfile.
+
+Hotkeys, in every scene:
+    F3  Show or hide the overlay with the frame times, which also switches the profiler on or off
+    F4  Capture the next frames with cProfile
+    F5  Export the timings so far as a Chrome trace
+
+Environment variables:
+    SACRED_STONES_PROFILE=1        Switch the profiler on at the start
+    SACRED_STONES_TRACE=<file>     Switch the profiler on, and export the Chrome trace to the file when the game exits
+    SACRED_STONES_CPROFILE=<n>     Capture the first n frames with cProfile
+    SACRED_STONES_PROFILE_DIR=<dir>  Directory for the captures and traces of the hotkeys, default data/profiles
+"""
+
+import cProfile
+import json
+import os.path
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from functools import wraps
+from typing import Callable, ContextManager, Deque, List, Optional, Tuple
+
+import numpy as np
+import pygame
+
+import constants
+
+TraceEvent = Tuple[str, int, int, int]  # Name, start and end in nanoseconds, thread id
+
+KEY_OVERLAY = pygame.K_F3
+KEY_CPROFILE = pygame.K_F4
+KEY_TRACE = pygame.K_F5
+PROFILER_KEYS = (KEY_OVERLAY, KEY_CPROFILE, KEY_TRACE)
+
+OVERLAY_WIDTH = 260
+OVERLAY_HEIGHT = 110
+OVERLAY_GRAPH_HEIGHT = 60
+OVERLAY_BG_COLOR = (20, 20, 20)
+
+_DISABLED_PHASE = nullcontext()
+
+
+class Phase:
+    """
+    Timer of one phase, which adds a trace event when it ends
+    """
+
+    __slots__ = ('_profiler', '_name', '_start')
+
+    def __init__(self, profiler: 'FrameProfiler', name: str):
+        self._profiler = profiler
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter_ns()
+
+    def __exit__(self, *exc_info):
+        self._profiler.events.append((self._name, self._start, time.perf_counter_ns(), threading.get_ident()))
+
+
+class FrameProfiler:
+    """
+    Timings of the phases of the frames of the game loops, and of the work that happens in between
+
+    A frame runs from the moment the loop wakes up with new events until it starts waiting for the next ones, so the
+    frame times show the work done per frame and not the frame rate. A scene that runs its own loop from within a
+    frame of the scene below (e.g. a fight started by a key press) interrupts that frame; interrupted frames are traced,
+    but left out of the frame times.
+    """
+
+    enabled: bool
+    overlay: bool  # Whether the overlay is drawn
+    events: Deque[TraceEvent]  # Most recent phases, oldest first
+    frame_times: Deque[float]  # Seconds per frame of the most recent frames that were not interrupted
+
+    _always_enabled: bool  # Whether the profiler was switched on at the start, and stays on without the overlay
+    _frames: List[List]  # Start in nanoseconds and whether it was interrupted, per frame that is running
+    _capture: Optional[cProfile.Profile]
+    _capture_frames_left: int
+    _font: Optional[pygame.font.Font]
+
+    def __init__(self, enabled: bool = False, max_events: int = constants.PROFILER_MAX_EVENTS,
+                 max_frames: int = constants.PROFILER_FRAMES):
+        self.enabled = enabled
+        self.overlay = False
+        self._always_enabled = enabled
+        self.events = deque(maxlen=max_events)
+        self.frame_times = deque(maxlen=max_frames)
+        self._frames = []
+        self._capture = None
+        self._capture_frames_left = 0
+        self._font = None
+
+    def phase(self, name: str) -> ContextManager:
+        """
+        Return a context manager that times the code in its block as a phase with the given name
+        """
+
+        return Phase(self, name) if self.enabled else _DISABLED_PHASE
+
+    def begin_frame(self):
+        if self._frames:
+            self._frames[-1][1] = True
+        self._frames.append([time.perf_counter_ns(), False])
+
+    def end_frame(self):
+        if not self._frames:
+            return
+        start, interrupted = self._frames.pop()
+        if self.enabled:
+            end = time.perf_counter_ns()
+            self.events.append(('frame', start, end, threading.get_ident()))
+            if not interrupted:
+                self.frame_times.append((end - start) / 1e9)
+        if self._capture and not interrupted:
+            self._capture_frames_left -= 1
+            if self._capture_frames_left <= 0:
+                self.stop_capture()
+
+    def toggle_overlay(self):
+        """
+        Show or hide the overlay, and switch the profiler on or off with it, unless it was switched on at the start
+        """
+
+        self.overlay = not self.overlay
+        self.enabled = self.overlay or self._always_enabled
+        if self.overlay:
+            self.frame_times.clear()
+
+    def handle_key(self, key: int):
+        if key == KEY_OVERLAY:
+            self.toggle_overlay()
+        elif key == KEY_CPROFILE:
+            self.start_capture(constants.CPROFILE_FRAMES)
+        elif key == KEY_TRACE:
+            self.export_trace(os.path.join(constants.PROFILE_DIR, f'trace-{time.strftime("%Y%m%d-%H%M%S")}.json'))
+
+    def percentiles(self) -> Tuple[float, float, float]:
+        """
+        Return the 50th, 95th and 99th percentile of the frame times in seconds
+        """
+
+        if not self.frame_times:
+            return 0.0, 0.0, 0.0
+        return tuple(np.percentile(self.frame_times, [50, 95, 99]))
+
+    def draw_overlay(self, screen: pygame.Surface) -> List[pygame.Rect]:
+        """
+        Draw the graph of the frame times and their percentiles, and return the area it covers, if it is shown
+        """
+
+        if not self.overlay:
+            return []
+        rect = pygame.Rect(0, 0, OVERLAY_WIDTH, OVERLAY_HEIGHT)
+        screen.fill(OVERLAY_BG_COLOR, rect)
+        # The graph is scaled such that a frame that takes the whole frame budget reaches halfway
+        budget = 1 / constants.FRAME_RATE
+        bar_width = OVERLAY_WIDTH / self.frame_times.maxlen
+        graph_bottom = rect.top + OVERLAY_GRAPH_HEIGHT
+        for i, frame_time in enumerate(self.frame_times):
+            height = min(int(OVERLAY_GRAPH_HEIGHT / 2 * frame_time / budget), OVERLAY_GRAPH_HEIGHT)
+            color = constants.GREEN if frame_time <= budget else constants.RED
+            pygame.draw.rect(screen, color, (int(i * bar_width), graph_bottom - height, max(int(bar_width), 1), height))
+        pygame.draw.line(screen, constants.GREY, (0, graph_bottom - OVERLAY_GRAPH_HEIGHT // 2),
+                         (OVERLAY_WIDTH, graph_bottom - OVERLAY_GRAPH_HEIGHT // 2))
+
+        # Text that changes every frame would only push other texts out of the text cache, so it is rendered directly
+        p50, p95, p99 = self.percentiles()
+        lines = [f'frame p50 {p50 * 1e3:.1f}  p95 {p95 * 1e3:.1f}  p99 {p99 * 1e3:.1f} ms',
+                 f'{len(self.frame_times)} frames, {len(self.events)} events'
+                 f'{", capturing" if self._capture else ""}']
+        font = self._get_font()
+        for count, line in enumerate(lines):
+            screen.blit(font.render(line, True, constants.WHITE), (4, graph_bottom + 4 + count * font.get_linesize()))
+        return [rect]
+
+    def start_capture(self, frames: int):
+        """
+        Profile the next frames with cProfile
+        """
+
+        if self._capture:
+            return
+        self._capture = cProfile.Profile()
+        self._capture_frames_left = frames
+        self._capture.enable()
+        print(f'Capturing {frames} frames with cProfile')
+
+    def stop_capture(self):
+        """
+        Stop the cProfile capture, write the statistics to a file and print the most expensive functions
+        """
+
+        capture, self._capture = self._capture, None
+        capture.disable()
+        os.makedirs(constants.PROFILE_DIR, exist_ok=True)
+        path = os.path.join(constants.PROFILE_DIR, f'cprofile-{time.strftime("%Y%m%d-%H%M%S")}.prof')
+        capture.dump_stats(path)
+        print(f'Wrote the cProfile capture to {path}')
+        pstats.Stats(capture).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(20)
+
+    def export_trace(self, path: str):
+        """
+        Write the traced phases as a Chrome trace-event JSON file
+        """
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        pid = os.getpid()
+        trace_events = [{'name': name, 'ph': 'X', 'ts': start / 1e3, 'dur': (end - start) / 1e3, 'pid': pid,
+                         'tid': thread_id}
+                        for name, start, end, thread_id in list(self.events)]
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms'}, f)
+        print(f'Wrote {len(trace_events)} trace events to {path}')
+
+    def close(self):
+        """
+        Finish the capture, and export the trace if that was asked for with SACRED_STONES_TRACE
+        """
+
+        if self._capture:
+            self.stop_capture()
+        if constants.TRACE_FILE:
+            self.export_trace(constants.TRACE_FILE)
+
+    # Helper methods
+
+    def _get_font(self) -> pygame.font.Font:
+        if self._font is None:
+            # Imported here, because the text module is itself profiled
+            from text import get_font
+            self._font = get_font(18)
+        return self._font
+
+    def __str__(self):
+        p50, p95, p99 = self.percentiles()
+        return (f'{len(self.frame_times)} frames profiled, p50 {p50 * 1e3:.1f} ms, p95 {p95 * 1e3:.1f} ms, '
+                f'p99 {p99 * 1e3:.1f} ms, {len(self.events)} events')
+
+
+profiler = FrameProfiler(enabled=constants.PROFILE or bool(constants.TRACE_FILE))
+if constants.CPROFILE_STARTUP_FRAMES:
+    profiler.start_capture(constants.CPROFILE_STARTUP_FRAMES)
+
+
+def profiled(name: str) -> Callable[[Callable], Callable]:
+    """
+    Decorator that times every call of the function as a phase with the given name
+    """
+
+    def decorate(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return func(*args, **kwargs)
+            with Phase(profiler, name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
@@ -0,0 +1,168 @@
+"""
+Registries of content classes (monsters, inventory objects), which import a class the first time it is needed
+
+Every content package has a manifest.json that maps the identifier of each class to the module that implements it.
+Looking up an identifier imports only that module, which registers its class, so the time to start the game does not
+grow with the number of monsters and objects.
+
+The manifests are generated by importing every module of the packages. Run this module to regenerate them after adding,
+renaming or removing a content module, or with --check to verify that they are up to date (e.g. before a commit):
+
+    python registry.py
+    python registry.py --check
+"""
+
+import argparse
+import json
+import os.path
+import sys
+from importlib import import_module
+from typing import Dict, List, Type
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+MANIFEST_FILE = 'manifest.json'
+
+
+class Registry:
+    """
+    Content classes by identifier, imported lazily from the modules listed in the manifest of a package
+    """
+
+    package: str  # Name of the package that contains the content modules
+    base_module: str  # Module of the base class, which is not scanned for content
+
+    _classes: Dict[str, Type]
+    _manifest: Dict[str, str]  # Module per identifier, read when it is first needed
+
+    def __init__(self, package: str, base_module: str):
+        self.package = package
+        self.base_module = base_module
+        self._classes = {}
+        self._manifest = None
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(SRC_DIR, self.package, MANIFEST_FILE)
+
+    def register(self, identifier: str, klass: Type):
+        """
+        To be called in the modules where the concrete classes are implemented
+        """
+
+        self._classes[identifier] = klass
+
+    def get(self, identifier: str) -> Type:
+        """
+        Return the class with the given identifier, importing its module if that was not done yet
+        """
+
+        if identifier not in self._classes:
+            try:
+                module = self.manifest[identifier]
+            except KeyError:
+                raise AssertionError(f'{self.package.title()} {identifier} is not registered in {self.manifest_path}')
+            import_module(module)
+            if identifier not in self._classes:
+                raise AssertionError(f'Module {module} does not register {self.package} {identifier}, '
+                                     f'regenerate the manifest with registry.py')
+        return self._classes[identifier]
+
+    def load_all(self) -> Dict[str, Type]:
+        """
+        Import all classes in the manifest, and return them by identifier
+        """
+
+        return {identifier: self.get(identifier) for identifier in self.manifest}
+
+    @property
+    def manifest(self) -> Dict[str, str]:
+        if self._manifest is None:
+            with open(self.manifest_path) as f:
+                self._manifest = json.load(f)
+        return self._manifest
+
+    def generate_manifest(self) -> Dict[str, str]:
+        """
+        Import every module of the package, and return which identifiers each module registers
+        """
+
+        manifest = {}
+        for module_name in sorted(self._get_module_names()):
+            registered = set(self._classes)
+            import_module(module_name)
+            for identifier in sorted(set(self._classes) - registered):
+                manifest[identifier] = module_name
+        return manifest
+
+    def write_manifest(self):
+        manifest = self.generate_manifest()
+        with open(self.manifest_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+            f.write('\n')
+        self._manifest = manifest
+
+    def check_manifest(self) -> List[str]:
+        """
+        Return the differences between the manifest on disk and a freshly generated one
+        """
+
+        try:
+            with open(self.manifest_path) as f:
+                on_disk = json.load(f)
+        except FileNotFoundError:
+            return [f'{self.manifest_path} does not exist']
+        generated = self.generate_manifest()
+        problems = []
+        for identifier in sorted(set(on_disk) | set(generated)):
+            if identifier not in generated:
+                problems.append(f'{identifier} is in the manifest, but no module registers it')
+            elif identifier not in on_disk:
+                problems.append(f'{identifier} is registered by {generated[identifier]}, but not in the manifest')
+            elif on_disk[identifier] != generated[identifier]:
+                problems.append(f'{identifier} is registered by {generated[identifier]}, '
+                                f'but the manifest says {on_disk[identifier]}')
+        return problems
+
+    # Helper methods
+
+    def _get_module_names(self) -> List[str]:
+        module_names = []
+        for entry in os.scandir(os.path.join(SRC_DIR, self.package)):
+            name, extension = os.path.splitext(entry.name)
+            if extension == '.py' and not name.startswith('__') and f'{self.package}.{name}' != self.base_module:
+                module_names.append(f'{self.package}.{name}')
+        return module_names
+
+    def __str__(self):
+        return f'Registry of {self.package} with {len(self._classes)} of {len(self.manifest)} classes imported'
+
+
+def get_registries() -> List[Registry]:
+    from inventory.inventory import InventoryObject
+    from monster.monster import Monster
+
+    return [Monster.registry, InventoryObject.registry]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Regenerate or check the manifests of the content packages')
+    parser.add_argument('--check', action='store_true', help='Only check that the manifests are up to date')
+    args = parser.parse_args()
+
+    nr_problems = 0
+    for registry in get_registries():
+        if args.check:
+            problems = registry.check_manifest()
+            for problem in problems:
+                print(f'{registry.manifest_path}: {problem}')
+            nr_problems += len(problems)
+        else:
+            registry.write_manifest()
+            print(f'Wrote {registry.manifest_path} with {len(registry.manifest)} entries')
+    if nr_problems:
+        print('Regenerate the manifests with: python registry.py')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
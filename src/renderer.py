@@ -0,0 +1,136 @@
+"""
+Dirty-rectangle rendering of a zone onto the screen
+"""
+
+from typing import Dict, List, Sequence, Tuple, Optional
+
+import pygame
+
+import constants
+from assets import load_image
+from camera import Camera
+from zonemap import ZoneMap
+
+
+class ZoneRenderer:
+    """
+    Draw a zone and the sprites on it, only redrawing the parts of the screen that changed
+
+    The static terrain that is visible through the camera is baked into a single background surface. Each frame, only
+    the rectangles of sprites that moved or changed their image are restored from the background and redrawn. When the
+    camera moved, the background is baked again and the whole screen is redrawn. Sprites outside of the camera are
+    skipped. Clients can mark additional areas (e.g. HUD text) as changed with `invalidate`.
+    """
+
+    _screen: pygame.Surface
+    _zone_map: ZoneMap
+    _camera: Camera
+    _background: Optional[pygame.Surface]
+    _baked_position: Optional[Tuple[int, int]]  # Position of the camera when the background was baked
+    _sprites: List[pygame.sprite.Sprite]
+    _sprite_states: Dict[pygame.sprite.Sprite, Tuple[pygame.Surface, pygame.Rect]]
+    _invalidated: List[pygame.Rect]
+    _full_redraw: bool
+
+    def __init__(self, screen: pygame.Surface, zone_map: ZoneMap, sprites: Sequence[pygame.sprite.Sprite],
+                 camera: Camera = None):
+        self._screen = screen
+        self._zone_map = zone_map
+        self._camera = camera or Camera()
+        self._background = None
+        self._baked_position = None
+        self._sprites = list(sprites)
+        self._sprite_states = {}
+        self._invalidated = []
+        self._full_redraw = True
+
+    def invalidate(self, rect: pygame.Rect = None):
+        """
+        Mark the given area as changed, or the whole screen if no area is given
+        """
+
+        if rect is None:
+            self._full_redraw = True
+        else:
+            self._invalidated.append(pygame.Rect(rect))
+
+    def draw(self) -> List[pygame.Rect]:
+        """
+        Redraw all changed areas, and return the list of rectangles that need to be pushed to the display
+        """
+
+        if (self._camera.x, self._camera.y) != self._baked_position:
+            self._background = self._bake(self._screen, self._zone_map, self._camera)
+            self._baked_position = (self._camera.x, self._camera.y)
+            self._full_redraw = True
+        screen_rects = self._get_screen_rects()
+        # Sprites outside the camera keep their image until they come into view, so large zones stay cheap to draw
+        for sprite in screen_rects:
+            sprite.update()
+
+        if self._full_redraw:
+            dirty_rects = [self._screen.get_rect()]
+            self._full_redraw = False
+        else:
+            dirty_rects = self._get_dirty_rects(screen_rects)
+        self._invalidated = []
+        if not dirty_rects:
+            return dirty_rects
+
+        for rect in dirty_rects:
+            # Clip to the dirty rectangle, so that unchanged sprites are never blended over themselves
+            self._screen.set_clip(rect)
+            self._screen.blit(self._background, rect, rect)
+            for sprite, screen_rect in screen_rects.items():
+                if screen_rect.colliderect(rect):
+                    self._screen.blit(sprite.image, screen_rect)
+        self._screen.set_clip(None)
+        self._sprite_states = {sprite: (sprite.image, screen_rect) for sprite, screen_rect in screen_rects.items()}
+        return dirty_rects
+
+    # Helper methods
+
+    def _get_screen_rects(self) -> Dict[pygame.sprite.Sprite, pygame.Rect]:
+        """
+        Return the position on the screen of each sprite that is visible through the camera
+        """
+
+        visible = self._camera.rect
+        return {sprite: self._camera.to_screen(sprite.rect)
+                for sprite in self._sprites if sprite.rect.colliderect(visible)}
+
+    def _get_dirty_rects(self, screen_rects: Dict[pygame.sprite.Sprite, pygame.Rect]) -> List[pygame.Rect]:
+        """
+        Return the areas covered by sprites that moved or changed their image, before and after the change
+        """
+
+        dirty_rects = self._invalidated
+        for sprite, screen_rect in screen_rects.items():
+            try:
+                image, rect = self._sprite_states[sprite]
+            except KeyError:
+                dirty_rects.append(screen_rect)
+                continue
+            if sprite.image is not image or screen_rect != rect:
+                dirty_rects.append(rect)
+                dirty_rects.append(screen_rect)
+        # Sprites that left the camera leave their old area behind
+        dirty_rects.extend(rect for sprite, (image, rect) in self._sprite_states.items() if sprite not in screen_rects)
+        return dirty_rects
+
+    @staticmethod
+    def _bake(screen: pygame.Surface, zone_map: ZoneMap, camera: Camera) -> pygame.Surface:
+        """
+        Draw the static terrain of the zone map that is visible through the camera onto a single surface
+        """
+
+        background = pygame.Surface(screen.get_size()).convert(screen)
+        background.fill(constants.UGLY_PINK)
+        size = (constants.TILESIZE, constants.TILESIZE)
+        images = {tile_type: load_image(tile_type.tile_class.IMAGE_DIR, tile_type.tile_class.IMAGE,
+                                        alpha=tile_type.tile_class.IMAGE_HAS_ALPHA, size=size)
+                  for tile_type in zone_map.tile_types}
+        for x, y, tile_type in zone_map.iter_tiles(camera.x, camera.y, camera.width, camera.height):
+            position = ((x - camera.x) * constants.TILESIZE, (y - camera.y) * constants.TILESIZE)
+            background.blit(images[tile_type], position)
+        return background
@@ -1,8 +1,78 @@
 from abc import ABC
-from typing import Dict
+from operator import attrgetter
+from typing import Callable, Dict, FrozenSet, Optional, Tuple, Type
+
+Schema = Tuple[Tuple[str, ...], Callable]  # Fields of the JSON representation, and a getter of their values
+
+_UNSET = object()
 
 
 class Saveable(ABC):
+    """
+    Object whose state can be saved and loaded
+
+    Saveable objects track whether they changed since they were last saved or loaded, so saving an object that did
+    not change can be skipped. Writing a tracked attribute (the fields of JSON_SCHEMA and TRACKED_FIELDS) with a new
+    value marks the object dirty, and with it the saveable object that contains it, e.g. the zone of a monster. State
+    that is not kept in tracked attributes has to be marked dirty with `mark_dirty`. New objects are dirty, because
+    they were never saved.
+
+    Only assignment is tracked. Changing the list or dict in a tracked attribute in place, e.g. adding or removing an
+    object with `zone.objects.append` or `zone.objects.remove`, does not mark anything dirty: call `mark_dirty`
+    afterwards, or assign a new list or dict, or the change is not saved.
+    """
+
+    # TypedDict of the JSON representation, for classes whose state consists of attributes with the same names
+    JSON_SCHEMA: Optional[Type[Dict]] = None
+    # Other attributes whose changes make the object dirty
+    TRACKED_FIELDS: Tuple[str, ...] = ()
+
+    _tracked_fields: FrozenSet[str] = frozenset()
+    _dirty: bool = True
+    _container: Optional['Saveable'] = None  # Saveable object whose saved state includes the state of this object
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        schema_fields = cls.JSON_SCHEMA.__annotations__ if cls.JSON_SCHEMA else ()
+        cls._tracked_fields = frozenset((*schema_fields, *cls.TRACKED_FIELDS))
+
+    def __setattr__(self, name: str, value):
+        # The container of a dirty object is dirty as well, so there is nothing to mark then
+        if name in self._tracked_fields and not self._dirty and getattr(self, name, _UNSET) != value:
+            self.mark_dirty()
+        super().__setattr__(name, value)
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+    def mark_dirty(self):
+        """
+        Mark the object and the objects that contain it as changed since they were last saved
+        """
+
+        self._dirty = True
+        if self._container is not None:
+            self._container.mark_dirty()
+
+    def mark_clean(self):
+        """
+        Mark the object as saved, e.g. because it was just saved or loaded
+
+        Classes whose saved state includes other saveable objects must mark those objects clean as well.
+        """
+
+        self._dirty = False
+
+    def set_container(self, container: Optional['Saveable']):
+        """
+        Set the saveable object whose saved state includes the state of this object
+        """
+
+        self._container = container
+        if self._dirty and container is not None:
+            container.mark_dirty()
+
     @classmethod
     def from_json(cls, data: Dict) -> 'Saveable':
         """
@@ -18,9 +88,36 @@ class Saveable(ABC):
     def as_json(self) -> Dict:
         """
         Return the object's state information
+
+        The default implementation returns the attributes in JSON_SCHEMA. If a Saveable class has no schema, that class
+        should provide its own implementation.
         """
 
-        raise NotImplementedError()
+        fields, getter = self.get_schema()
+        return dict(zip(fields, getter(self)))
+
+    @classmethod
+    def get_schema(cls) -> Schema:
+        """
+        Return the fields of JSON_SCHEMA and a getter of their values, which are computed only once per class
+        """
+
+        schema = cls.__dict__.get('_schema')
+        if schema is None:
+            if cls.JSON_SCHEMA is None:
+                raise NotImplementedError(f'{cls.__name__} has no JSON_SCHEMA')
+            # Keep the order in which the fields are declared, so saved files do not change between runs
+            fields = tuple(field for field in cls.JSON_SCHEMA.__annotations__
+                           if field in cls.JSON_SCHEMA.__required_keys__)
+            getter = attrgetter(*fields)
+            if len(fields) == 1:
+                # attrgetter returns a single value instead of a tuple for one field
+                single_getter = getter
+
+                def getter(obj):
+                    return (single_getter(obj),)
+            schema = cls._schema = (fields, getter)
+        return schema
 
     @classmethod
     def load(cls, *args, **kwargs):
@@ -0,0 +1,179 @@
+"""
+Formats of save files
+
+A save file starts with a header line that names the codec that encoded it and the version of that codec, e.g.
+`SSSV 1 json-compact 1`, followed by the encoded state. Files are always read with the codec in their header, so the
+format in which new files are written (constants.SAVE_FORMAT) can be changed at any time. Files without a header are
+plain JSON, like the original game data.
+
+Codecs:
+    json          Indented JSON, for debugging
+    json-compact  JSON without any whitespace
+    marshal       Python's marshal format, with lists of records stored as tables (see `MarshalCodec`)
+    marshal-zlib  The marshal format, compressed with zlib
+"""
+
+import json
+import marshal
+import zlib
+from abc import ABC, abstractmethod
+from itertools import chain
+from typing import Any, Dict, Optional, Tuple
+
+import constants
+
+MAGIC = b'SSSV'
+HEADER_VERSION = 1
+
+_CONTAINERS = {dict, list, tuple}
+
+
+class Codec(ABC):
+    """
+    Encoding of the JSON-compatible state of saveable objects into bytes, and back
+    """
+
+    name: str
+    version: int  # Increased when the encoding changes, so files of older versions can still be recognized
+
+    @abstractmethod
+    def encode(self, data: Any) -> bytes:
+        pass
+
+    @abstractmethod
+    def decode(self, payload: bytes, version: int) -> Any:
+        pass
+
+    def __str__(self):
+        return f'{self.name} codec version {self.version}'
+
+
+class JsonCodec(Codec):
+    version = 1
+
+    def __init__(self, name: str, indent: Optional[int] = None, separators: Tuple[str, str] = None):
+        self.name = name
+        self._indent = indent
+        self._separators = separators
+
+    def encode(self, data: Any) -> bytes:
+        return json.dumps(data, indent=self._indent, separators=self._separators).encode('utf-8')
+
+    def decode(self, payload: bytes, version: int) -> Any:
+        return json.loads(payload)
+
+
+class MarshalCodec(Codec):
+    """
+    Python's marshal format, which is the fastest way to encode and decode primitive types in Python
+
+    Saved state consists mostly of lists of records with the same fields, e.g. the monsters of a zone. Such lists are
+    stored as a table: a tuple with the field names once, followed by a tuple of values per record. JSON-compatible
+    state never contains tuples, so a tuple in the payload always is a table.
+    """
+
+    version = 1
+
+    def __init__(self, name: str, compression_level: Optional[int] = None):
+        """
+        :param compression_level: zlib compression level, or None to store the payload uncompressed
+        """
+
+        self.name = name
+        self._compression_level = compression_level
+
+    def encode(self, data: Any) -> bytes:
+        payload = marshal.dumps(self._to_tables(data))
+        if self._compression_level is not None:
+            payload = zlib.compress(payload, self._compression_level)
+        return payload
+
+    def decode(self, payload: bytes, version: int) -> Any:
+        if self._compression_level is not None:
+            payload = zlib.decompress(payload)
+        return self._from_tables(marshal.loads(payload))
+
+    # Helper methods
+
+    @classmethod
+    def _to_tables(cls, data: Any) -> Any:
+        if isinstance(data, dict):
+            return {key: cls._to_tables(value) for key, value in data.items()}
+        if isinstance(data, (list, tuple)):
+            if data and set(map(type, data)) == {dict}:
+                fields = tuple(data[0])
+                if all(map(fields.__eq__, map(tuple, data))):
+                    rows = list(map(tuple, map(dict.values, data)))
+                    if _CONTAINERS & set(map(type, chain.from_iterable(rows))):
+                        rows = [tuple(map(cls._to_tables, row)) for row in rows]
+                    return (fields, *rows)
+            return list(map(cls._to_tables, data))
+        return data
+
+    @classmethod
+    def _from_tables(cls, data: Any) -> Any:
+        if isinstance(data, tuple):
+            fields, *rows = data
+            if _CONTAINERS & set(map(type, chain.from_iterable(rows))):
+                rows = [tuple(map(cls._from_tables, row)) for row in rows]
+            return [dict(zip(fields, row)) for row in rows]
+        if isinstance(data, dict):
+            return {key: cls._from_tables(value) for key, value in data.items()}
+        if isinstance(data, list):
+            return list(map(cls._from_tables, data))
+        return data
+
+
+CODECS: Dict[str, Codec] = {codec.name: codec for codec in [
+    JsonCodec('json', indent=2),
+    JsonCodec('json-compact', separators=(',', ':')),
+    MarshalCodec('marshal'),
+    MarshalCodec('marshal-zlib', compression_level=1),
+]}
+
+
+def get_codec(name: str) -> Codec:
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise ValueError(f'Unknown save format {name}, expected one of {", ".join(CODECS)}') from None
+
+
+def dumps(data: Any, save_format: str = constants.SAVE_FORMAT) -> bytes:
+    """
+    Return the contents of a save file with the given state, in the given format
+    """
+
+    codec = get_codec(save_format)
+    return b'%s %d %s %d\n' % (MAGIC, HEADER_VERSION, codec.name.encode('ascii'), codec.version) + codec.encode(data)
+
+
+def loads(content: bytes) -> Any:
+    """
+    Return the state in the contents of a save file of any format
+    """
+
+    if not content.startswith(MAGIC):
+        return json.loads(content)
+    header, _, payload = content.partition(b'\n')
+    codec, version = parse_header(header)
+    return codec.decode(payload, version)
+
+
+def parse_header(header: bytes) -> Tuple[Codec, int]:
+    """
+    Return the codec and the version of the codec in the given header line
+    """
+
+    try:
+        magic, header_version, name, version = header.decode('ascii').split()
+        header_version, version = int(header_version), int(version)
+    except ValueError:
+        raise ValueError(f'Invalid header of save file: {header[:80]!r}') from None
+    if header_version > HEADER_VERSION:
+        raise ValueError(f'Save file has header version {header_version}, only up to {HEADER_VERSION} is supported')
+    codec = get_codec(name)
+    if version > codec.version:
+        raise ValueError(f'Save file was written by {name} codec version {version}, only up to {codec.version} is '
+                         f'supported')
+    return codec, version
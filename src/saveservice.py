@@ -0,0 +1,266 @@
+"""
+Write-behind saving of game state on a background thread
+"""
+
+import atexit
+import glob
+import os.path
+import shutil
+import threading
+import time
+from typing import Dict, Optional
+
+import constants
+from journal import Journal
+from profiler import profiled
+from savestore import SaveStore, GAME_KEY, ZONE_KEY_PREFIX
+
+SAVE_MODES = ('snapshot', 'journal', 'sqlite')
+
+
+class SaveService:
+    """
+    Write snapshots of saved state on a background thread
+
+    Clients submit the state returned by `as_json()` under a save key: GAME_KEY, or the key of a zone (see
+    `savestore.get_zone_key`). The state is a fresh structure of primitive types and therefore a snapshot by itself.
+    Snapshots that are submitted for the same key within `coalesce_delay` seconds are written only once, with the
+    latest state. Saved state should always be read through `read`, which also returns state that is not written yet.
+
+    Modes:
+    - `snapshot`: every key is a file in `directory`, which is written to a temporary file first and then renamed, so a
+      crash never leaves a half-written save behind
+    - `journal`: only the changes since the previous save of a key are appended to the journal, see `Journal`
+    - `sqlite`: all snapshots that are written together go into the save slot in one transaction, see `SaveStore`
+
+    When the save slot does not exist yet in sqlite mode, the save files of the other modes in `directory` are imported
+    into it once, and then removed, so a game that was saved before the switch to sqlite is continued.
+    """
+
+    coalesce_delay: float
+    mode: str  # One of SAVE_MODES
+    slot: str  # Save slot in sqlite mode
+    directory: str  # Directory of the save files in snapshot and journal mode, and of legacy saves in sqlite mode
+    journal: Optional[Journal]  # Only in snapshot and journal mode
+    store: Optional[SaveStore]  # Only in sqlite mode
+    submitted: int  # Number of snapshots submitted
+    coalesced: int  # Number of snapshots that replaced an unwritten snapshot with the same key
+    skipped: int  # Number of saves that were skipped, because the state did not change since it was saved
+    written: int  # Number of snapshots written
+
+    _pending: Dict[str, Dict]  # Snapshots that still have to be written, per key
+    _writing: Dict[str, Dict]  # Snapshots that are being written right now, per key
+    _imported: bool  # Whether legacy save files were checked for import into the save slot
+
+    def __init__(self, coalesce_delay: float = constants.SAVE_COALESCE_DELAY, mode: str = constants.SAVE_MODE,
+                 journal: Journal = None, store: SaveStore = None, directory: str = constants.CURRENT_DIR,
+                 slot: str = constants.SAVE_SLOT):
+        if mode not in SAVE_MODES:
+            raise ValueError(f'Unknown save mode {mode}')
+        self.coalesce_delay = coalesce_delay
+        self.mode = mode
+        self.slot = slot
+        self.directory = directory
+        self.journal = None
+        if mode != 'sqlite':
+            # The journal refers to the save files by their path relative to its own directory
+            self.journal = journal or Journal(os.path.join(directory, os.path.basename(constants.JOURNAL_FILE)))
+        self.store = store or SaveStore() if mode == 'sqlite' else None
+        self.submitted = 0
+        self.coalesced = 0
+        self.skipped = 0
+        self.written = 0
+        self._pending = {}
+        self._writing = {}
+        self._imported = mode != 'sqlite'
+        self._import_lock = threading.Lock()
+        self._condition = threading.Condition()
+        self._flushes_waiting = 0
+        self._stopping = False
+        self._error: Optional[Exception] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, key: str, data: Dict):
+        """
+        Schedule the given state to be written under the given key
+        """
+
+        with self._condition:
+            self._start()
+            if key in self._pending:
+                self.coalesced += 1
+            self._pending[key] = data
+            self.submitted += 1
+            self._condition.notify_all()
+
+    def skip(self, key: str):
+        """
+        Count a save of the given key that was skipped, because the state did not change since it was saved
+        """
+
+        with self._condition:
+            self.skipped += 1
+
+    def pending(self, key: str) -> Optional[Dict]:
+        """
+        Return the latest state submitted for the given key that is not written yet, or None if there is none
+        """
+
+        with self._condition:
+            if key in self._pending:
+                return self._pending[key]
+            return self._writing.get(key)
+
+    def read(self, key: str) -> Optional[Dict]:
+        """
+        Return the latest state saved under the given key, or None if it was never saved
+        """
+
+        if (state := self.pending(key)) is not None:
+            return state
+        if self.store:
+            self._import_legacy_saves()
+            return self.store.read(self.slot, key)
+        return self.journal.read(self.get_filepath(key))
+
+    def get_filepath(self, key: str) -> str:
+        """
+        Return the save file of the given key in snapshot and journal mode, or of a legacy save in sqlite mode
+        """
+
+        return os.path.join(self.directory, f'{key}.json')
+
+    @profiled('SaveService.flush')
+    def flush(self):
+        """
+        Block until all submitted state is written to disk
+
+        Raises the error of a failed write, if any.
+        """
+
+        with self._condition:
+            self._flushes_waiting += 1
+            self._condition.notify_all()
+            while self._pending or self._writing:
+                self._condition.wait()
+            self._flushes_waiting -= 1
+            error, self._error = self._error, None
+        if error:
+            raise error
+
+    def reset(self):
+        """
+        Remove all saved state, e.g. to start a new game
+        """
+
+        self.flush()
+        if self.store:
+            self.store.delete_slot(self.slot)
+            return
+        self._remove_files(self.journal)
+
+    def shutdown(self):
+        self.flush()
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self._stopping = False
+        if self.store:
+            self.store.close()
+
+    def stats(self) -> Dict[str, int]:
+        return {'submitted': self.submitted, 'coalesced': self.coalesced, 'skipped': self.skipped,
+                'written': self.written}
+
+    # Helper methods
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='save-writer', daemon=True)
+            self._thread.start()
+            atexit.register(self.shutdown)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._stopping:
+                    self._condition.wait()
+                if self._stopping and not self._pending:
+                    return
+                # Give a burst of saves some time to arrive, unless someone is waiting for them
+                deadline = time.monotonic() + self.coalesce_delay
+                while not self._flushes_waiting and not self._stopping:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                self._writing, self._pending = self._pending, {}
+
+            try:
+                self._write(self._writing)
+            except Exception as e:
+                print(f'Could not save {", ".join(self._writing)}: {e}')
+                self._error = e
+
+            with self._condition:
+                self.written += len(self._writing)
+                self._writing = {}
+                self._condition.notify_all()
+
+    def _remove_files(self, journal: Journal):
+        journal.clear()
+        game_file = self.get_filepath(GAME_KEY)
+        if os.path.isfile(game_file):
+            os.remove(game_file)
+        shutil.rmtree(os.path.join(self.directory, ZONE_KEY_PREFIX), ignore_errors=True)
+
+    def _import_legacy_saves(self):
+        """
+        Import the save files of snapshot and journal mode into the save slot, if the slot does not exist yet
+        """
+
+        with self._import_lock:
+            if self._imported:
+                return
+            if not self.store.has_slot(self.slot):
+                journal = Journal(os.path.join(self.directory, os.path.basename(constants.JOURNAL_FILE)))
+                # Zones can also only exist in the journal, when they were never compacted into a snapshot
+                filepaths = {self.get_filepath(GAME_KEY), *glob.glob(self.get_filepath(ZONE_KEY_PREFIX + '*')),
+                             *journal.get_journaled_files()}
+                states = {}
+                for filepath in filepaths:
+                    if (state := journal.read(filepath)) is not None:
+                        key = os.path.splitext(os.path.relpath(filepath, self.directory))[0].replace(os.sep, '/')
+                        states[key] = state
+                if states:
+                    print(f'Importing the saved game in {self.directory} into save slot {self.slot} '
+                          f'({len(states)} states)')
+                    self.store.write(self.slot, states)
+                    self._remove_files(journal)
+            self._imported = True
+
+    @profiled('SaveService.write')
+    def _write(self, states: Dict[str, Dict]):
+        if self.store:
+            # State that is saved before anything was read must not create the slot before the import
+            self._import_legacy_saves()
+            # One transaction for the whole batch, so a crash never leaves a save with only some of the zones
+            self.store.write(self.slot, states)
+            return
+        for key, data in states.items():
+            filepath = self.get_filepath(key)
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            if self.mode == 'journal':
+                self.journal.write(filepath, data)
+            else:
+                self.journal.write_snapshot(filepath, data)
+
+    def __str__(self):
+        return (f'{self.submitted} saves submitted, {self.coalesced} coalesced, {self.skipped} skipped, '
+                f'{self.written} snapshots written')
+
+
+saves = SaveService()
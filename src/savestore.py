@@ -0,0 +1,183 @@
+"""
+Save slots in a local SQLite database
+
+Every slot holds the state of the game (with the player) and the state of every visited zone. The database runs in
+WAL mode, so a save of any number of zones is one transaction with a single sync of the write-ahead log, and the
+prefetcher can read zones while the writer thread commits. Listing, copying and deleting slots are single statements
+in the database that never touch the file system.
+
+States are stored in the save format of the store, with the header of `savecodec`, so changing the format never makes
+existing slots unreadable.
+"""
+
+import os.path
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple, TypedDict
+
+import constants
+import savecodec
+
+GAME_KEY = 'game'
+ZONE_KEY_PREFIX = 'zones/'
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS slots (
+    name TEXT PRIMARY KEY,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS games (
+    slot TEXT PRIMARY KEY REFERENCES slots (name) ON DELETE CASCADE,
+    state BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS zones (
+    slot TEXT NOT NULL REFERENCES slots (name) ON DELETE CASCADE,
+    identifier TEXT NOT NULL,
+    state BLOB NOT NULL,
+    PRIMARY KEY (slot, identifier)
+);
+'''
+
+
+class SlotInfo(TypedDict):
+    name: str
+    created: float  # Seconds since the epoch
+    updated: float
+    nr_zones: int
+
+
+def get_zone_key(identifier: str) -> str:
+    return f'{ZONE_KEY_PREFIX}{identifier}'
+
+
+class SaveStore:
+    """
+    Save slots with the state of the game and of the zones, stored by key: GAME_KEY or the key of a zone
+
+    Every thread gets its own connection to the database.
+    """
+
+    path: str
+    save_format: str  # Format in which states are written, see `savecodec`
+    transactions: int  # Number of committed saves
+
+    def __init__(self, path: str = constants.SAVE_DATABASE, save_format: str = constants.SAVE_FORMAT):
+        savecodec.get_codec(save_format)  # Fail early on an unknown format
+        self.path = path
+        self.save_format = save_format
+        self.transactions = 0
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    def read(self, slot: str, key: str) -> Optional[Dict]:
+        """
+        Return the state with the given key in the slot, or None if it was never saved
+        """
+
+        table, identifier = self._split_key(key)
+        if table == 'games':
+            row = self._connection().execute('SELECT state FROM games WHERE slot = ?', (slot,)).fetchone()
+        else:
+            row = self._connection().execute('SELECT state FROM zones WHERE slot = ? AND identifier = ?',
+                                             (slot, identifier)).fetchone()
+        return None if row is None else savecodec.loads(row[0])
+
+    def write(self, slot: str, states: Dict[str, Dict]):
+        """
+        Write the given states by key into the slot, all in one transaction
+        """
+
+        games, zones = [], []
+        for key, state in states.items():
+            table, identifier = self._split_key(key)
+            blob = savecodec.dumps(state, self.save_format)
+            if table == 'games':
+                games.append((slot, blob))
+            else:
+                zones.append((slot, identifier, blob))
+        now = time.time()
+        connection = self._connection()
+        with connection:
+            connection.execute('INSERT INTO slots (name, created, updated) VALUES (?, ?, ?) '
+                               'ON CONFLICT (name) DO UPDATE SET updated = excluded.updated', (slot, now, now))
+            connection.executemany('INSERT OR REPLACE INTO games (slot, state) VALUES (?, ?)', games)
+            connection.executemany('INSERT OR REPLACE INTO zones (slot, identifier, state) VALUES (?, ?, ?)', zones)
+        self.transactions += 1
+
+    def list_slots(self) -> List[SlotInfo]:
+        rows = self._connection().execute(
+            'SELECT name, created, updated, (SELECT COUNT(*) FROM zones WHERE zones.slot = slots.name) '
+            'FROM slots ORDER BY updated DESC').fetchall()
+        return [{'name': name, 'created': created, 'updated': updated, 'nr_zones': nr_zones}
+                for name, created, updated, nr_zones in rows]
+
+    def has_slot(self, slot: str) -> bool:
+        return self._connection().execute('SELECT 1 FROM slots WHERE name = ?', (slot,)).fetchone() is not None
+
+    def copy_slot(self, source: str, target: str):
+        """
+        Replace the target slot by a copy of the source slot
+        """
+
+        if source == target:
+            # Deleting the target first would delete the source as well
+            raise ValueError(f'Cannot copy save slot {source} onto itself')
+        if not self.has_slot(source):
+            raise KeyError(f'There is no save slot {source}')
+        now = time.time()
+        connection = self._connection()
+        with connection:
+            connection.execute('DELETE FROM slots WHERE name = ?', (target,))
+            connection.execute('INSERT INTO slots (name, created, updated) VALUES (?, ?, ?)', (target, now, now))
+            connection.execute('INSERT INTO games (slot, state) SELECT ?, state FROM games WHERE slot = ?',
+                               (target, source))
+            connection.execute('INSERT INTO zones (slot, identifier, state) '
+                               'SELECT ?, identifier, state FROM zones WHERE slot = ?', (target, source))
+
+    def delete_slot(self, slot: str):
+        connection = self._connection()
+        with connection:
+            connection.execute('DELETE FROM slots WHERE name = ?', (slot,))
+
+    def close(self):
+        """
+        Close the connections of all threads
+        """
+
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections = []
+            self._local = threading.local()
+
+    # Helper methods
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            # Connections are only used by the thread that opened them, but closed by whoever closes the store
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode = WAL')
+            # In WAL mode, FULL syncs the log once per commit, so a committed save survives a power failure
+            connection.execute('PRAGMA synchronous = FULL')
+            connection.execute('PRAGMA foreign_keys = ON')
+            connection.executescript(_SCHEMA)
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    @staticmethod
+    def _split_key(key: str) -> Tuple[str, Optional[str]]:
+        if key == GAME_KEY:
+            return 'games', None
+        if key.startswith(ZONE_KEY_PREFIX):
+            return 'zones', key[len(ZONE_KEY_PREFIX):]
+        raise KeyError(f'Unknown save key {key}')
+
+    def __str__(self):
+        return f'Save store {self.path} with {self.transactions} transactions'
@@ -0,0 +1,144 @@
+"""
+One display for the whole process, and a stack of scenes that take turns drawing on it
+"""
+
+from abc import ABC, abstractmethod
+from typing import Iterable, List, Optional, Tuple
+
+import pygame
+
+import constants
+from profiler import PROFILER_KEYS, profiler
+from scheduler import FrameScheduler
+
+
+class Scene(ABC):
+    """
+    Something that takes over the screen and the input until it is finished: the overworld, a fight, a dialog
+    """
+
+    @property
+    def finished(self) -> bool:
+        return False
+
+    @abstractmethod
+    def handle_events(self, events: Iterable[pygame.event.Event]):
+        pass
+
+    @abstractmethod
+    def draw(self) -> List[pygame.Rect]:
+        """
+        Draw everything that changed since the previous frame, and return the screen areas that need to be updated
+        """
+
+    def invalidate(self):
+        """
+        Redraw the whole scene in the next frame, e.g. because a scene on top of it drew over it
+        """
+
+
+class SceneManager:
+    """
+    Owner of the display surface, and of the stack of scenes that are drawn on it
+
+    SDL and the display are initialized once, the first time the screen is needed. Scenes never create a display of
+    their own, so opening a fight or a dialog costs no more than building the scene itself. The scene on top of the
+    stack gets all input. When it is finished, it is popped and the scene below it redraws itself.
+    """
+
+    title: str
+    size: Tuple[int, int]
+    scheduler: FrameScheduler  # Shared by all scene loops
+
+    _screen: Optional[pygame.Surface]
+    _scenes: List[Scene]
+
+    def __init__(self, title: str = constants.TITLE,
+                 size: Tuple[int, int] = (constants.SCREEN_WIDTH, constants.SCREEN_HEIGHT)):
+        self.title = title
+        self.size = size
+        self.scheduler = FrameScheduler()
+        self._screen = None
+        self._scenes = []
+
+    @property
+    def screen(self) -> pygame.Surface:
+        if self._screen is None:
+            pygame.init()
+            pygame.display.set_caption(self.title)
+            self._screen = pygame.display.set_mode(self.size)
+        return self._screen
+
+    @property
+    def top(self) -> Optional[Scene]:
+        return self._scenes[-1] if self._scenes else None
+
+    def push(self, scene: Scene):
+        self._scenes.append(scene)
+
+    def pop(self) -> Scene:
+        """
+        Remove the scene on top of the stack, and let the scene below it redraw itself
+        """
+
+        scene = self._scenes.pop()
+        if self.top:
+            self.top.invalidate()
+        return scene
+
+    def run(self, scene: Scene):
+        """
+        Push the scene, and give it all input and draw it until it is finished
+
+        Runs from within the scene below (e.g. a fight started by a key press in the overworld) return when the scene
+        is finished, after which the scene below continues where it was. Every phase of the loop is timed by the
+        profiler.
+        """
+
+        name = type(scene).__name__
+        self.push(scene)
+        profiler.begin_frame()
+        try:
+            while not scene.finished:
+                with profiler.phase(f'{name}.draw'):
+                    dirty_rects = scene.draw()
+                dirty_rects = dirty_rects + profiler.draw_overlay(self.screen)
+                with profiler.phase('display.update'):
+                    pygame.display.update(dirty_rects)
+                profiler.end_frame()
+                # Only keep drawing at the frame rate while the screen is changing, otherwise sleep until there is input
+                events = self.scheduler.wait(animating=bool(dirty_rects))
+                profiler.begin_frame()
+                with profiler.phase(f'{name}.handle_events'):
+                    scene.handle_events(self._handle_profiler_keys(events))
+        finally:
+            profiler.end_frame()
+            self.pop()
+
+    def clear(self):
+        self._scenes.clear()
+
+    # Helper methods
+
+    def _handle_profiler_keys(self, events: List[pygame.event.Event]) -> List[pygame.event.Event]:
+        """
+        Let the profiler handle its hotkeys, and return the other events
+        """
+
+        remaining = []
+        for event in events:
+            if event.type == pygame.KEYDOWN and event.key in PROFILER_KEYS:
+                overlay = profiler.overlay
+                profiler.handle_key(event.key)
+                if overlay and not profiler.overlay:
+                    # The overlay was drawn over the scene
+                    self.top.invalidate()
+            else:
+                remaining.append(event)
+        return remaining
+
+    def __len__(self):
+        return len(self._scenes)
+
+
+scenes = SceneManager()
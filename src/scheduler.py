@@ -0,0 +1,74 @@
+"""
+Frame scheduling for the game loops
+"""
+
+import time
+from typing import Dict, List
+
+import pygame
+
+import constants
+
+
+class FrameScheduler:
+    """
+    Decide when the next frame of a game loop starts, and collect the events that happened in the meantime
+
+    When nothing is animating, the scheduler blocks until an event arrives (or the idle timeout expires), so an idle
+    game does not use any CPU. When something is animating, the frame rate is capped at `frame_rate`.
+    """
+
+    frames: int
+    idle_time: float  # Seconds spent waiting for events or for the next frame
+    busy_time: float  # Seconds spent between two waits, i.e. handling events and drawing
+
+    def __init__(self, frame_rate: int = constants.FRAME_RATE, idle_timeout: int = constants.IDLE_TIMEOUT):
+        """
+        :param frame_rate: Maximum number of frames per second while animating
+        :param idle_timeout: Maximum number of milliseconds to wait for an event while not animating
+        """
+
+        self.frame_rate = frame_rate
+        self.idle_timeout = idle_timeout
+        self._clock = pygame.time.Clock()
+        self.reset()
+
+    def reset(self):
+        self.frames = 0
+        self.idle_time = 0.0
+        self.busy_time = 0.0
+        self._last_wake = time.perf_counter()
+
+    def wait(self, animating: bool = False) -> List[pygame.event.Event]:
+        """
+        Wait until the next frame should be drawn, and return the events that arrived until then
+        """
+
+        start_wait = time.perf_counter()
+        self.busy_time += start_wait - self._last_wake
+        if animating:
+            self._clock.tick(self.frame_rate)
+            events = pygame.event.get()
+        else:
+            event = pygame.event.wait(self.idle_timeout)
+            events = [] if event.type == pygame.NOEVENT else [event, *pygame.event.get()]
+        self._last_wake = time.perf_counter()
+        self.idle_time += self._last_wake - start_wait
+        self.frames += 1
+        return events
+
+    @property
+    def fps(self) -> float:
+        elapsed = self.idle_time + self.busy_time
+        return self.frames / elapsed if elapsed else 0.0
+
+    @property
+    def idle_ratio(self) -> float:
+        elapsed = self.idle_time + self.busy_time
+        return self.idle_time / elapsed if elapsed else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {'frames': self.frames, 'fps': self.fps, 'idle_ratio': self.idle_ratio}
+
+    def __str__(self):
+        return f'{self.frames} frames, {self.fps:.1f} FPS, {self.idle_ratio:.0%} idle'
@@ -0,0 +1,205 @@
+"""
+Soak test: play many full game sessions with synthetic input, headless and in parallel
+
+Every worker process gets its own save directory, so sessions never share data/current. Each session walks
+randomly through the zones, attacks whatever it finds and answers every dialog, until it has taken the given number
+of steps or the player died. The latency of every step is recorded per code path of `Game.handle_events`.
+
+Usage:
+    python soak.py --sessions 64 --steps 500 --workers 8
+    python soak.py --repro <seed> --steps 500  # Replay a single (crashed) session in this process, with its output
+"""
+
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, TypedDict
+
+# The game modules read these when they are imported, so they are only imported inside the session functions
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+FIGHT_KEY_PRESSES = 50  # Number of times to hit a monster before fleeing from the fight
+DIALOG_ANSWER_INTERVAL = 10  # Milliseconds between presses of return while a fight or dialog is open
+
+
+class SessionResult(TypedDict):
+    seed: int
+    steps: int
+    moves: int
+    died: bool
+    duration: float
+    latencies: Dict[str, List[float]]  # Seconds per step, per code path
+    crash: Optional[str]  # Traceback if the session crashed
+
+
+def run_session(seed: int, steps: int) -> SessionResult:
+    """
+    Play one game session from a new game, in the save directory of this process
+    """
+
+    import pygame
+
+    import constants
+    from game import Game
+    from saveservice import saves
+
+    _reset_save_dir(constants.CURRENT_DIR, saves)
+    DIALOG_ANSWER = pygame.event.Event(pygame.KEYDOWN, key=pygame.K_RETURN)
+    random.seed(seed)
+    walk = random.Random(seed)
+    result: SessionResult = {'seed': seed, 'steps': 0, 'moves': 0, 'died': False, 'duration': 0.0,
+                             'latencies': {}, 'crash': None}
+    start = time.perf_counter()
+    game = None
+    try:
+        game = Game.load()
+        for _ in range(steps):
+            key = walk.choice([pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP, pygame.K_DOWN, pygame.K_h])
+            path = _get_code_path(game, key)
+            if path == 'fight':
+                # Fights and dialogs run their own loop, which takes its input from the event queue. The fight
+                # ignores the key presses after it is over, and the dialog that may follow it is answered by a timer.
+                for _ in range(FIGHT_KEY_PRESSES):
+                    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_h))
+                pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_x))
+                pygame.time.set_timer(DIALOG_ANSWER, DIALOG_ANSWER_INTERVAL)
+            zone_before = game.zone.identifier
+
+            step_start = time.perf_counter()
+            game.handle_events([pygame.event.Event(pygame.KEYDOWN, key=key)])
+            step_duration = time.perf_counter() - step_start
+            pygame.time.set_timer(DIALOG_ANSWER, 0)
+            pygame.event.clear()
+
+            if game.zone.identifier != zone_before:
+                path = 'zone_change'
+            result['latencies'].setdefault(path, []).append(step_duration)
+            draw_start = time.perf_counter()
+            game.draw()
+            result['latencies'].setdefault('draw', []).append(time.perf_counter() - draw_start)
+
+            result['steps'] += 1
+            result['moves'] += path in ('move', 'zone_change')
+            if game.player.is_dead():
+                result['died'] = True
+                break
+        flush_start = time.perf_counter()
+        game.close()
+        result['latencies']['close'] = [time.perf_counter() - flush_start]
+    except Exception:
+        result['crash'] = traceback.format_exc()
+    result['duration'] = time.perf_counter() - start
+    return result
+
+
+def _get_code_path(game, key: int) -> str:
+    import pygame
+
+    if key != pygame.K_h:
+        return 'move'
+    monster = game.zone.monster_on_tile(game.player.x, game.player.y)
+    if monster and not monster.is_dead():
+        return 'fight'
+    return 'swing'
+
+
+def _reset_save_dir(save_dir: str, saves):
+    # The save database stays open, so the save service removes the saved state instead of the whole directory
+    saves.reset()
+    os.makedirs(save_dir, exist_ok=True)
+
+
+def _run_quiet_session(seed: int, steps: int) -> SessionResult:
+    # The game prints a lot, which would only slow down the soak test
+    with contextlib.redirect_stdout(io.StringIO()):
+        return run_session(seed, steps)
+
+
+def _init_worker(base_dir: str):
+    os.environ['SACRED_STONES_SAVE_DIR'] = tempfile.mkdtemp(prefix='worker-', dir=base_dir)
+
+
+def soak(nr_sessions: int, steps: int, nr_workers: int = None, seed: int = 0) -> List[SessionResult]:
+    """
+    Run the sessions with seeds seed, seed + 1, ... on nr_workers processes
+    """
+
+    base_dir = tempfile.mkdtemp(prefix='sacred-stones-soak-')
+    try:
+        # Spawn fresh processes, so every worker imports the game with its own save directory
+        with ProcessPoolExecutor(max_workers=nr_workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker, initargs=(base_dir,)) as executor:
+            futures = [executor.submit(_run_quiet_session, seed + i, steps) for i in range(nr_sessions)]
+            return [future.result() for future in futures]
+    finally:
+        shutil.rmtree(base_dir, ignore_errors=True)
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """
+    Return the given percentile of the values, using the nearest rank
+
+    >>> percentile([4, 1, 3, 2], 50)
+    2
+    >>> percentile([4, 1, 3, 2], 99)
+    4
+    """
+
+    ordered = sorted(values)
+    rank = max(0, -(-len(ordered) * percent // 100) - 1)
+    return ordered[int(rank)]
+
+
+def report(results: List[SessionResult], wall_time: float):
+    total_steps = sum(result['steps'] for result in results)
+    total_moves = sum(result['moves'] for result in results)
+    print(f'{len(results)} sessions, {total_steps} steps in {wall_time:.1f} s: '
+          f'{len(results) / wall_time:.2f} sessions/s, {total_moves / wall_time:.1f} moves/s, '
+          f'{sum(result["died"] for result in results)} deaths')
+
+    latencies: Dict[str, List[float]] = {}
+    for result in results:
+        for path, durations in result['latencies'].items():
+            latencies.setdefault(path, []).extend(durations)
+    for path, durations in sorted(latencies.items()):
+        print(f'  {path:12} {len(durations):8} steps, p50 {1000 * percentile(durations, 50):8.2f} ms, '
+              f'p99 {1000 * percentile(durations, 99):8.2f} ms')
+
+    crashes = [result for result in results if result['crash']]
+    for result in crashes:
+        print(f'\nSession with seed {result["seed"]} crashed after {result["steps"]} steps, '
+              f'reproduce with: python soak.py --repro {result["seed"]} --steps {result["steps"] + 1}')
+        print(result['crash'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=os.cpu_count())
+    parser.add_argument('--steps', type=int, default=500, help='Maximum number of key presses per session')
+    parser.add_argument('--workers', type=int, default=None, help='Number of processes, default one per core')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the first session')
+    parser.add_argument('--repro', type=int, default=None, help='Replay the session with this seed in this process')
+    args = parser.parse_args()
+
+    if args.repro is not None:
+        os.environ['SACRED_STONES_SAVE_DIR'] = tempfile.mkdtemp(prefix='sacred-stones-repro-')
+        result = run_session(args.repro, args.steps)
+        report([result], result['duration'])
+        return
+
+    start = time.perf_counter()
+    results = soak(args.sessions, args.steps, args.workers, args.seed)
+    report(results, time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    main()
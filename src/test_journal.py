@@ -0,0 +1,154 @@
+"""
+Tests of the journal of saved state, and of its recovery from a crash during compaction
+
+Usage (in src):
+    python -m pytest test_journal.py
+    python -m unittest test_journal
+"""
+
+import contextlib
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import journal
+from journal import Journal, COMPACTED_SUFFIX, COMPACTING_SUFFIX
+
+OLD_GAME = {'active_zone': 'arkadia_01', 'player': {'x': 1, 'y': 1, 'gold': 0}}
+NEW_GAME = {'active_zone': 'arkadia_02', 'player': {'x': 5, 'y': 1, 'gold': 20}}
+OLD_ZONE = {'identifier': 'arkadia_01', 'monsters': [{'hit_points': 14}, {'hit_points': 12}]}
+NEW_ZONE = {'identifier': 'arkadia_01', 'monsters': [{'hit_points': 0}, {'hit_points': 12}]}
+
+
+class Crash(Exception):
+    """
+    Stands in for the process dying at some point during a compaction
+    """
+
+
+class JournalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='sacred-stones-test-')
+        self.journal_file = os.path.join(self.directory, 'journal.log')
+        self.game_file = os.path.join(self.directory, 'game.json')
+        self.zone_file = os.path.join(self.directory, 'zones', 'arkadia_01.json')
+        os.makedirs(os.path.dirname(self.zone_file))
+        # Snapshots of the old state, and the changes to the new state in the journal
+        j = Journal(self.journal_file)
+        j.write_snapshot(self.game_file, OLD_GAME)
+        j.write_snapshot(self.zone_file, OLD_ZONE)
+        j.write(self.game_file, NEW_GAME)
+        j.write(self.zone_file, NEW_ZONE)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_read_replays_journal(self):
+        self.assertEqual(journal.read_file(self.game_file), OLD_GAME)
+        self._assert_recovered()
+
+    def test_compact(self):
+        Journal(self.journal_file).compact()
+
+        self.assertFalse(os.path.exists(self.journal_file))
+        self.assertEqual(journal.read_file(self.game_file), NEW_GAME)
+        self.assertEqual(journal.read_file(self.zone_file), NEW_ZONE)
+        self._assert_recovered()
+
+    def test_crash_before_commit(self):
+        # The new snapshots are written, but the journal is not renamed yet
+        with self._crash_on_replace(lambda source, nr_installed: source == self.journal_file):
+            Journal(self.journal_file).compact()
+        self.assertTrue(os.path.isfile(self.game_file + COMPACTED_SUFFIX))
+        self.assertTrue(os.path.isfile(self.journal_file))
+
+        # The uncommitted snapshots are discarded, and the journal is replayed on the old ones
+        self._assert_recovered()
+        self.assertFalse(os.path.exists(self.game_file + COMPACTED_SUFFIX))
+        self.assertEqual(journal.read_file(self.game_file), OLD_GAME)
+
+    def test_crash_after_commit(self):
+        # The journal is renamed, but none of the new snapshots is in place yet
+        with mock.patch.object(Journal, '_finish_compaction', side_effect=Crash), self.assertRaises(Crash):
+            Journal(self.journal_file).compact()
+        self.assertTrue(os.path.isfile(self.journal_file + COMPACTING_SUFFIX))
+        self.assertFalse(os.path.exists(self.journal_file))
+
+        # The new snapshots are put in place, and the renamed journal is not replayed
+        self._assert_recovered()
+        self.assertFalse(os.path.exists(self.journal_file + COMPACTING_SUFFIX))
+        self.assertEqual(journal.read_file(self.game_file), NEW_GAME)
+        self.assertEqual(journal.read_file(self.zone_file), NEW_ZONE)
+
+    def test_crash_while_finishing(self):
+        # The journal is renamed, and only the first new snapshot is in place
+        with self._crash_on_replace(lambda source, nr_installed: nr_installed == 1):
+            Journal(self.journal_file).compact()
+        self.assertTrue(os.path.isfile(self.journal_file + COMPACTING_SUFFIX))
+        self.assertEqual(len([path for path in (self.game_file, self.zone_file)
+                              if os.path.isfile(path + COMPACTED_SUFFIX)]), 1)
+
+        self._assert_recovered()
+        self.assertFalse(os.path.exists(self.journal_file + COMPACTING_SUFFIX))
+        for path in (self.game_file, self.zone_file):
+            self.assertFalse(os.path.exists(path + COMPACTED_SUFFIX))
+
+    def test_compact_after_crash_before_commit(self):
+        with self._crash_on_replace(lambda source, nr_installed: source == self.journal_file):
+            Journal(self.journal_file).compact()
+
+        self._assert_compacts()
+
+    def test_compact_after_crash_after_commit(self):
+        with mock.patch.object(Journal, '_finish_compaction', side_effect=Crash), self.assertRaises(Crash):
+            Journal(self.journal_file).compact()
+
+        self._assert_compacts()
+
+    # Helper methods
+
+    @contextlib.contextmanager
+    def _crash_on_replace(self, should_crash):
+        """
+        Let os.replace crash when should_crash(source, nr_installed) is true, where nr_installed is the number of new
+        snapshots of the compaction that are in place
+        """
+
+        replace = os.replace
+        installed = []
+
+        def replace_or_crash(source, target):
+            if should_crash(source, len(installed)):
+                raise Crash()
+            replace(source, target)
+            if source.endswith(COMPACTED_SUFFIX):
+                installed.append(target)
+
+        with mock.patch('journal.os.replace', side_effect=replace_or_crash), self.assertRaises(Crash):
+            yield
+
+    def _assert_recovered(self):
+        # A new journal, like after restarting the game
+        j = Journal(self.journal_file)
+        self.assertEqual(j.read(self.game_file), NEW_GAME)
+        self.assertEqual(j.read(self.zone_file), NEW_ZONE)
+        # Changes after the recovery are journaled against the recovered state
+        later_game = {**NEW_GAME, 'active_zone': 'arkadia_03'}
+        j.write(self.game_file, later_game)
+        self.assertEqual(Journal(self.journal_file).read(self.game_file), later_game)
+
+    def _assert_compacts(self):
+        Journal(self.journal_file).compact()
+
+        # Only the new snapshots are left
+        self.assertEqual(sorted(os.listdir(self.directory)), ['game.json', 'zones'])
+        self.assertEqual(os.listdir(os.path.dirname(self.zone_file)), ['arkadia_01.json'])
+        self.assertEqual(journal.read_file(self.game_file), NEW_GAME)
+        self.assertEqual(journal.read_file(self.zone_file), NEW_ZONE)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+"""
+Tests of the bulk rules on the monster table of a zone, and of the monsters that are views on its rows
+
+Usage (in src):
+    python -m pytest test_monstertable.py
+    python -m unittest test_monstertable
+"""
+
+import os
+import tempfile
+import unittest
+
+# The game modules read these when they are imported, so they are set before importing them
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ['SACRED_STONES_SAVE_DIR'] = tempfile.mkdtemp(prefix='sacred-stones-test-')
+
+from monstertable import COLUMN_TYPES  # noqa: E402
+from saveservice import saves  # noqa: E402
+from scenes import scenes  # noqa: E402
+from zone import Zone  # noqa: E402
+
+ZONE_ID = 'arkadia_01'
+
+
+def goblin(x: int, y: int, hit_points: int):
+    return {'identifier': 'goblin', 'name': 'Grell', 'kind': 'Goblin', 'x': x, 'y': y, 'armor': 0,
+            'max_damage': 4, 'chance_to_hit': 75, 'max_hit_points': 14, 'hit_points': hit_points}
+
+
+class MonsterTableTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # Images are converted to the pixel format of the display, so the display has to exist before monsters do
+        scenes.screen
+
+    def setUp(self):
+        saves.reset()
+        monsters = [goblin(1, 1, 10), goblin(2, 2, 3), goblin(9, 9, 14), goblin(1, 2, 0)]
+        self.zone = Zone.from_json({'identifier': ZONE_ID, 'name': 'Test', 'monsters': monsters, 'objects': []})
+        self.table = self.zone.monster_table
+        # The stats of a monster come from its kind, so armor is given after loading
+        self.zone.monsters[1].armor = 2
+        self.zone.save()
+
+    def tearDown(self):
+        self.zone.close()
+
+    def test_dead_monsters_are_not_alive_within(self):
+        self.assertEqual(self.table.alive().tolist(), [True, True, True, False])
+        # The dead monster is within the radius, but not returned as a living one
+        self.assertEqual(self.table.within(1, 1, 1).tolist(), [True, True, False, True])
+        self.assertEqual(self.zone.monsters_alive_within(1, 1, 1), self.zone.monsters[:2])
+
+    def test_damage_monsters_within(self):
+        hit = self.zone.damage_monsters_within(1, 1, 1, damage=5)
+
+        self.assertEqual(hit, self.zone.monsters[:2])
+        # Armor absorbs part of the damage, and the dead monster is not hit again
+        self.assertEqual([monster.hit_points for monster in self.zone.monsters], [5, 0, 14, 0])
+        self.assertTrue(self.zone.monsters[1].is_dead())
+        self._assert_views_match_table()
+        self._assert_saved(dirty_rows=[0, 1])
+
+    def test_regenerate_monsters(self):
+        self.zone.monsters[0].hit_points = 12
+        self.zone.save()
+
+        healed = self.zone.regenerate_monsters(3)
+
+        # Up to the maximum, and the dead and healthy monsters do not heal
+        self.assertEqual(healed, 2)
+        self.assertEqual([monster.hit_points for monster in self.zone.monsters], [14, 6, 14, 0])
+        self._assert_views_match_table()
+        self._assert_saved(dirty_rows=[0, 1])
+
+    def test_damage_without_monsters_keeps_zone_clean(self):
+        hit = self.zone.damage_monsters_within(15, 15, 1, damage=5)
+
+        self.assertEqual(hit, [])
+        self.assertFalse(self.zone.dirty)
+
+    # Helper methods
+
+    def _assert_views_match_table(self):
+        for monster in self.zone.monsters:
+            for field in COLUMN_TYPES:
+                self.assertEqual(getattr(monster, field), self.table.columns[field][monster.row])
+        self.assertEqual([monster.as_json() for monster in self.zone.monsters], self.table.as_json())
+
+    def _assert_saved(self, dirty_rows):
+        self.assertTrue(self.zone.dirty)
+        self.assertEqual([row for row, monster in enumerate(self.zone.monsters) if monster.dirty], dirty_rows)
+        self.zone.save()
+        self.assertFalse(self.zone.dirty)
+        saved = saves.read(self.zone.get_save_key(ZONE_ID))
+        self.assertEqual(saved['monsters'], self.table.as_json())
+
+
+if __name__ == '__main__':
+    unittest.main()
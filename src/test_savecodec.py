@@ -0,0 +1,87 @@
+"""
+Tests of the formats of save files
+
+Usage (in src):
+    python -m pytest test_savecodec.py
+    python -m unittest test_savecodec
+"""
+
+import json
+import unittest
+
+import savecodec
+from savecodec import MAGIC, HEADER_VERSION
+
+# State with lists of records with the same fields (tables), with different fields, and mixed and empty containers
+STATE = {
+    'identifier': 'arkadia_01',
+    'monsters': [
+        {'name': 'Grell', 'x': 1, 'y': 2, 'hit_points': 14, 'identifier': 'goblin'},
+        {'name': 'Snaglin', 'x': 3, 'y': 4, 'hit_points': 0, 'identifier': 'goblin'},
+    ],
+    'objects': [
+        {'identifier': 'dagger', 'x': 5, 'y': 6},
+        {'identifier': 'sword', 'x': None, 'y': None, 'owner': 'player'},
+        {'y': 7, 'x': 8, 'identifier': 'dagger'},
+    ],
+    'empty_list': [],
+    'empty_dict': {},
+    'empty_records': [{}, {}],
+    'mixed': [{'a': 1}, 2, 'three', [4, 5], None, {'a': 6}],
+    'nested': [
+        {'position': [1, 2], 'tags': ['a', 'b'], 'inventory': [{'name': 'dagger'}, {'name': 'sword'}]},
+        {'position': [], 'tags': [], 'inventory': []},
+    ],
+    'values': [True, False, 1.5, -3, 'text', None],
+}
+
+
+class SaveCodecTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        for name in savecodec.CODECS:
+            with self.subTest(codec=name):
+                content = savecodec.dumps(STATE, name)
+                self.assertEqual(savecodec.loads(content), STATE)
+
+    def test_round_trip_of_top_level_containers(self):
+        for data in [[], {}, [{}], [{'a': 1}, {'b': 2}], [{'a': 1}, {'a': 2}], [[{'a': 1}], [{'a': 2}]]]:
+            for name in savecodec.CODECS:
+                with self.subTest(codec=name, data=data):
+                    self.assertEqual(savecodec.loads(savecodec.dumps(data, name)), data)
+
+    def test_records_with_same_fields_become_a_table(self):
+        codec = savecodec.get_codec('marshal')
+
+        tables = codec._to_tables(STATE)
+
+        self.assertEqual(tables['monsters'][0], ('name', 'x', 'y', 'hit_points', 'identifier'))
+        self.assertEqual(len(tables['monsters']), 3)
+        # Records with other fields, or with the same fields in another order, are not a table
+        self.assertIsInstance(tables['objects'], list)
+        self.assertIsInstance(tables['mixed'], list)
+        self.assertEqual(codec._from_tables(tables), STATE)
+
+    def test_header(self):
+        for name, codec in savecodec.CODECS.items():
+            with self.subTest(codec=name):
+                header, _, _ = savecodec.dumps(STATE, name).partition(b'\n')
+                self.assertEqual(header, b'%s %d %s %d' % (MAGIC, HEADER_VERSION, name.encode('ascii'), codec.version))
+                self.assertEqual(savecodec.parse_header(header), (codec, codec.version))
+
+    def test_files_without_header_are_json(self):
+        self.assertEqual(savecodec.loads(json.dumps(STATE).encode('utf-8')), STATE)
+
+    def test_invalid_headers(self):
+        for header in [b'SSSV', b'SSSV 1 json', b'SSSV one json 1', b'SSSV 1 json 1 extra']:
+            with self.subTest(header=header), self.assertRaises(ValueError):
+                savecodec.parse_header(header)
+
+    def test_unsupported_versions(self):
+        for header in [b'SSSV %d json 1' % (HEADER_VERSION + 1), b'SSSV 1 json 2', b'SSSV 1 yaml 1']:
+            with self.subTest(header=header), self.assertRaises(ValueError):
+                savecodec.parse_header(header)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+"""
+Tests of the save slots in SQLite
+
+Usage (in src):
+    python -m pytest test_savestore.py
+    python -m unittest test_savestore
+"""
+
+import os.path
+import shutil
+import tempfile
+import unittest
+
+from savestore import SaveStore, GAME_KEY, get_zone_key
+
+GAME = {'active_zone': 'arkadia_01', 'player': {'name': 'Melissa', 'hit_points': 10}}
+ZONE = {'identifier': 'arkadia_01', 'monsters': [{'name': 'Grell', 'hit_points': 5}], 'objects': []}
+
+
+class SaveStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='sacred-stones-test-')
+        self.store = SaveStore(os.path.join(self.directory, 'saves.sqlite3'))
+        self.store.write('a', {GAME_KEY: GAME, get_zone_key('arkadia_01'): ZONE})
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+    def test_copy_slot(self):
+        self.store.write('b', {GAME_KEY: {'active_zone': 'other', 'player': {}}})
+
+        self.store.copy_slot('a', 'b')
+
+        self.assertEqual(self.store.read('b', GAME_KEY), GAME)
+        self.assertEqual(self.store.read('b', get_zone_key('arkadia_01')), ZONE)
+        # The copy is independent of the source
+        self.store.write('b', {GAME_KEY: {'active_zone': 'changed', 'player': {}}})
+        self.assertEqual(self.store.read('a', GAME_KEY), GAME)
+
+    def test_copy_slot_onto_itself(self):
+        with self.assertRaises(ValueError):
+            self.store.copy_slot('a', 'a')
+
+        self.assertEqual(self.store.read('a', GAME_KEY), GAME)
+        self.assertEqual(self.store.read('a', get_zone_key('arkadia_01')), ZONE)
+
+    def test_copy_missing_slot(self):
+        with self.assertRaises(KeyError):
+            self.store.copy_slot('missing', 'b')
+        self.assertFalse(self.store.has_slot('b'))
+
+    def test_delete_slot(self):
+        self.store.write('b', {GAME_KEY: GAME})
+
+        self.store.delete_slot('a')
+
+        self.assertFalse(self.store.has_slot('a'))
+        self.assertIsNone(self.store.read('a', GAME_KEY))
+        self.assertIsNone(self.store.read('a', get_zone_key('arkadia_01')))
+        self.assertEqual(self.store.read('b', GAME_KEY), GAME)
+
+    def test_list_slots(self):
+        self.store.write('b', {GAME_KEY: GAME})
+
+        slots = self.store.list_slots()
+
+        # The slot that was saved last comes first
+        self.assertEqual([slot['name'] for slot in slots], ['b', 'a'])
+        self.assertEqual([slot['nr_zones'] for slot in slots], [0, 1])
+        self.assertTrue(all(slot['created'] <= slot['updated'] for slot in slots))
+
+
+if __name__ == '__main__':
+    unittest.main()
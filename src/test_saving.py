@@ -0,0 +1,92 @@
+"""
+Tests of saving only what changed, headless and in a save directory of their own
+
+Usage (in src):
+    python -m pytest test_saving.py
+    python -m unittest test_saving
+"""
+
+import os
+import tempfile
+import unittest
+
+# The game modules read these when they are imported, so they are set before importing them
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ['SACRED_STONES_SAVE_DIR'] = tempfile.mkdtemp(prefix='sacred-stones-test-')
+
+import pygame  # noqa: E402
+
+import constants  # noqa: E402
+from game import Game  # noqa: E402
+from saveservice import saves  # noqa: E402
+
+
+class DirtyTrackingTest(unittest.TestCase):
+
+    def setUp(self):
+        # Start a new game, and save everything that was never saved, so nothing is dirty anymore
+        saves.reset()
+        self.game = Game.load()
+        self.game.save()
+
+    def tearDown(self):
+        self.game.close()
+
+    def test_blocked_move_saves_nothing(self):
+        blocked_key, blocked_direction = self._find_blocked_move()
+        # Turning towards the blocked tile changes the direction of the player, which is saved
+        self.game.player.direction = blocked_direction
+        self.game.save()
+        submitted, skipped = saves.submitted, saves.skipped
+
+        self._press(blocked_key)
+
+        self.assertEqual(saves.submitted, submitted)
+        self.assertGreater(saves.skipped, skipped)
+
+    def test_monster_hit_points_save_zone(self):
+        zone = self.game.zone
+        monster = zone.monsters[0]
+        submitted = saves.submitted
+
+        monster.hit_points -= 1
+        self.assertTrue(zone.dirty)
+        self.game.save()
+
+        # Only the zone changed, not the game
+        self.assertEqual(saves.submitted, submitted + 1)
+        self.assertFalse(zone.dirty)
+        saved = saves.read(zone.get_save_key(zone.identifier))
+        self.assertEqual(saved['monsters'][0]['hit_points'], monster.hit_points)
+
+    def test_reload_restores_hit_points(self):
+        monster = self.game.zone.monsters[0]
+        monster.hit_points -= 1
+        hit_points = monster.hit_points
+        self.game.save()
+        self.game.close()
+
+        self.game = Game.load()
+
+        self.assertEqual(self.game.zone.monsters[0].hit_points, hit_points)
+        self.assertFalse(self.game.zone.dirty)
+
+    # Helper methods
+
+    def _find_blocked_move(self):
+        player, zone_map = self.game.player, self.game.zone.map
+        moves = {pygame.K_LEFT: (constants.LEFT, -1, 0), pygame.K_RIGHT: (constants.RIGHT, 1, 0),
+                 pygame.K_UP: (constants.UP, 0, -1), pygame.K_DOWN: (constants.DOWN, 0, 1)}
+        for key, (direction, dx, dy) in moves.items():
+            x, y = player.x + dx, player.y + dy
+            if 0 <= x < zone_map.width and 0 <= y < zone_map.height and not zone_map.tile_is_walkable(x, y):
+                return key, direction
+        self.fail(f'The player is not next to a tile that blocks the way in {zone_map.name}')
+
+    def _press(self, key: int):
+        self.game.handle_events([pygame.event.Event(pygame.KEYDOWN, key=key)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+"""
+Process-wide pool of fonts and cache of rendered text, shared by the HUD and all dialogs
+"""
+
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Union
+
+import pygame
+
+import constants
+from profiler import profiled
+from utils import get_text_list
+
+Color = Tuple[int, int, int]
+TextKey = Tuple[Union[str, Tuple[str, ...]], pygame.font.Font, int, Color, Optional[Color]]
+RenderedText = Tuple[pygame.Surface, int]  # Surface with all lines of the text, and the height the text takes
+
+LINE_SPACING = 3  # Pixels between two lines of text
+SHADOW_OFFSET = 1  # Pixels to the right and below the text at which its shadow is drawn
+
+_fonts: Dict[Tuple[Optional[str], int], pygame.font.Font] = {}
+
+
+def get_font(size: int, name: str = None) -> pygame.font.Font:
+    """
+    Return the font with the given size from the pool, so that every font is only loaded once
+
+    :param size: Height of the font in pixels
+    :param name: File name of the font, or None for the default font of pygame
+    """
+
+    key = (name, size)
+    try:
+        return _fonts[key]
+    except KeyError:
+        if not pygame.font.get_init():
+            pygame.font.init()
+        font = _fonts[key] = pygame.font.Font(name, size)
+        return font
+
+
+class TextCache:
+    """
+    Bounded LRU cache of rendered text
+
+    All lines of a text, including their shadow, are composed into one surface, so drawing a text that did not change
+    costs a single blit. Surfaces in the cache are shared between all clients, so clients must never draw onto them.
+    """
+
+    max_size: int
+    hits: int
+    misses: int
+
+    _rendered: 'OrderedDict[TextKey, RenderedText]'
+
+    def __init__(self, max_size: int = constants.TEXT_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._rendered = OrderedDict()
+
+    def render(self, text: Union[str, List[str]], font: pygame.font.Font, line_width: int, color: Color,
+               shadow_color: Color = None) -> RenderedText:
+        """
+        Return the surface with the given text, wrapped at the given number of characters, and its height
+
+        :param text: Text to render. Line breaks in a list of texts are kept.
+        :param font: Font to render the text with, preferably from the pool (see `get_font`)
+        :param line_width: Maximum number of characters per line
+        :param color: Color of the text
+        :param shadow_color: Color of the shadow of the text, or None to render the text without shadow
+        """
+
+        key = (text if isinstance(text, str) else tuple(text), font, line_width, color, shadow_color)
+        try:
+            rendered = self._rendered[key]
+        except KeyError:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._rendered.move_to_end(key)
+            return rendered
+
+        rendered = self._rendered[key] = self._compose(get_text_list(text, line_width), font, color, shadow_color)
+        while len(self._rendered) > self.max_size:
+            self._rendered.popitem(last=False)
+        return rendered
+
+    def clear(self):
+        self._rendered.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {'size': len(self._rendered), 'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0}
+
+    @staticmethod
+    def _compose(lines: List[str], font: pygame.font.Font, color: Color,
+                 shadow_color: Optional[Color]) -> RenderedText:
+        line_height = max(font.size(line)[1] for line in lines) + LINE_SPACING
+        width = max(font.size(line)[0] for line in lines) + SHADOW_OFFSET
+        surface = pygame.Surface((width, line_height * len(lines) + SHADOW_OFFSET), pygame.SRCALPHA)
+        for count, line in enumerate(lines):
+            top = line_height * count
+            if shadow_color:
+                surface.blit(font.render(line, True, shadow_color), (SHADOW_OFFSET, top + SHADOW_OFFSET))
+            surface.blit(font.render(line, True, color), (0, top))
+        return surface, line_height * len(lines)
+
+    def __len__(self):
+        return len(self._rendered)
+
+
+texts = TextCache()
+
+
+@profiled('text.display_text')
+def display_text(screen: pygame.Surface, text: Union[str, List[str]], font: pygame.font.Font,
+                 width_offset: int, height_offset: int, line_width: int, color: Color,
+                 shadow_color: Color = None) -> int:
+    """
+    Display the given text onto the given screen, and return the resulting height of the text
+    """
+
+    surface, height = render_text(text, font, line_width, color, shadow_color)
+    screen.blit(surface, (width_offset, height_offset + 10))
+    return height
+
+
+def render_text(text: Union[str, List[str]], font: pygame.font.Font, line_width: int, color: Color,
+                shadow_color: Color = None) -> RenderedText:
+    """
+    Render the text through the process-wide text cache
+    """
+
+    return texts.render(text, font, line_width, color, shadow_color)
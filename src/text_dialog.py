@@ -1,13 +1,19 @@
+from typing import List
+
 import pygame
 
 import constants
 import utils
+from scenes import Scene, scenes
+from text import get_font, render_text
 from utils import get_text_list
 
 
-class TextDialog:
+class TextDialog(Scene):
     """
-    Class that displays a text message to the _screen, with only an OK button
+    Class that displays a text message in the middle of the screen, with only an OK button
+
+    The dialog is drawn over the scene below it, which redraws itself when the dialog is closed.
     """
 
     BG_COLOR = constants.LIGHT_GREY
@@ -18,9 +24,10 @@ class TextDialog:
         dialog.main()
 
     def __init__(self, text: str, line_width: int = 50):
-        pygame.init()
-        self._font = pygame.font.Font(None, 35)
+        self.screen = scenes.screen
+        self._font = get_font(35)
 
+        self._line_width = line_width
         self._text_list = get_text_list(text, line_width)
 
         # Make the _screen 50 characters wide, regardless of the text, plus 40 pixels margin
@@ -35,23 +42,29 @@ class TextDialog:
             if text_height > self._line_height:
                 self._line_height = text_height
             self._screen_height += text_height
-        self.screen = pygame.display.set_mode((self._screen_width, self._screen_height))
+        self._rect = pygame.Rect(0, 0, self._screen_width, self._screen_height)
+        self._rect.center = self.screen.get_rect().center
 
         # The white window inside the grey window
-        window_left = 10
-        window_top = 10
+        window_left = self._rect.left + 10
+        window_top = self._rect.top + 10
         window_width = self._screen_width - 20
         window_height = self._screen_height - 60
         self._text_window_rect = pygame.Rect(window_left, window_top, window_width, window_height)
 
         button_width = 60
         button_height = 30
-        button_left = self._screen_width - button_width - 20
-        top = self._screen_height - button_height - 10
+        button_left = self._rect.right - button_width - 20
+        top = self._rect.bottom - button_height - 10
         self._okay_rect = pygame.Rect(button_left, top, button_width, button_height)
 
         self._mouse_pos = None
         self._keep_looping = True
+        self._drawn = False
+
+    @property
+    def finished(self) -> bool:
+        return not self._keep_looping
 
     def _set_text_list(self, text, line_width):
         self._text_list = []
@@ -69,8 +82,8 @@ class TextDialog:
             s = f'Textbox should not contain more than 12 lines, given {nr_lines}'
             raise ValueError(s)
 
-    def _handle_events(self):
-        for event in pygame.event.get():
+    def handle_events(self, events: List[pygame.event.Event]):
+        for event in events:
             if event.type == pygame.QUIT:
                 self._keep_looping = False
             elif event.type == pygame.KEYDOWN:
@@ -84,28 +97,34 @@ class TextDialog:
                     self._mouse_pos = pygame.mouse.get_pos()
                 elif mouse_pressed[2] == 1:
                     self._mouse_pos = pygame.mouse.get_pos()
+                if self._mouse_pos is not None and self._okay_rect.collidepoint(*self._mouse_pos):
+                    self._keep_looping = False
 
-    def _draw_lines(self):
-        for count, elem in enumerate(self._text_list):
-            surface = self._font.render(elem, True, (0, 0, 0))
-            left = 20  # Left margin
-            top = (self._line_height * count) + 20
-            self.screen.blit(surface, (left, top), area=None)
+    def draw(self) -> List[pygame.Rect]:
+        """
+        Draw the dialog if it was not drawn yet, and return the area it covers
+        """
 
-    def _draw(self):
+        if self._drawn:
+            return []
         self._draw_background()
         self._draw_lines()
         self._draw_button()
+        self._drawn = True
+        return [self._rect]
 
-        if self._mouse_pos is not None:
-            ok_is_clicked = self._okay_rect.collidepoint(self._mouse_pos[0], self._mouse_pos[1])
-            if ok_is_clicked == 1:
-                self._keep_looping = False
+    def invalidate(self):
+        self._drawn = False
 
-        pygame.display.flip()
+    def _draw_lines(self):
+        for count, elem in enumerate(self._text_list):
+            surface, _ = render_text(elem, self._font, self._line_width, constants.BLACK)
+            left = self._rect.left + 20  # Left margin
+            top = self._rect.top + (self._line_height * count) + 20
+            self.screen.blit(surface, (left, top), area=None)
 
     def _draw_button(self):
-        surface = self._font.render('OK', True, constants.BLACK)
+        surface, _ = render_text('OK', self._font, self._line_width, constants.BLACK)
         width = surface.get_rect().width
         height = surface.get_rect().height
         left = self._okay_rect.left + (self._okay_rect.width - width) // 2  # Place text in center
@@ -113,11 +132,9 @@ class TextDialog:
         self.screen.blit(surface, (left, top))
 
     def _draw_background(self):
-        self.screen.fill(self.BG_COLOR)
+        self.screen.fill(self.BG_COLOR, self._rect)
         pygame.draw.rect(self.screen, constants.WHITE, self._text_window_rect)
         pygame.draw.rect(self.screen, constants.LIGHT_BLUE, self._okay_rect)
 
     def main(self):
-        while self._keep_looping:
-            self._handle_events()
-            self._draw()
+        scenes.run(self)
@@ -4,16 +4,19 @@ Abstract base classes for anything that can be drawn as a tile on the map
 
 import os
 from abc import ABC
+from typing import Iterable, List
 
 import pygame
 
 import constants
+from assets import images, load_image
 from utils import Direction
 
 
 class Tile(pygame.sprite.Sprite, ABC):
     IMAGE_DIR: str = os.path.join(constants.DATA_DIR, 'images', 'tile')  # Can be set by concrete implementations
     IMAGE: str = ''  # Must be set by concrete implementations
+    IMAGE_HAS_ALPHA: bool = True  # Opaque tiles can set this to False, which makes them faster to draw
 
     x: int  # X-position on the map
     y: int  # Y-position on the map
@@ -25,36 +28,85 @@ class Tile(pygame.sprite.Sprite, ABC):
         super().__init__()
         self.x = x
         self.y = y
-        self.image = self._load_image(self.image_name)
+        self._shown_image_name = self.image_name
+        self.image = self.get_image(constants.TILESIZE)
         self.place_on_screen(constants.TILESIZE, x, y)
 
+    @classmethod
+    def preload(cls, tilesizes: Iterable[int]):
+        """
+        Load all images of this kind of tile at the given sizes into the image cache
+        """
+
+        for image_name in cls._get_image_names():
+            for tilesize in tilesizes:
+                load_image(cls.IMAGE_DIR, image_name, alpha=cls.IMAGE_HAS_ALPHA, size=(tilesize, tilesize))
+
     @property
     def image_name(self) -> str:
         return self.IMAGE
 
+    def get_image(self, tilesize: int) -> pygame.Surface:
+        """
+        Return the image to show at the given size, from the image cache
+        """
+
+        return self._load_image(self.image_name, tilesize)
+
+    def update(self, *args, **kwargs):
+        """
+        Reload the image when the image to show has changed, e.g. when a creature died
+        """
+
+        if self.image_name != self._shown_image_name:
+            self._shown_image_name = self.image_name
+            self.image = self.get_image(self.rect.width)
+
     def place_on_screen(self, tilesize: int, x: int, y: int):
-        self.image = pygame.transform.scale(self.image, (tilesize, tilesize))
+        if self.image.get_size() != (tilesize, tilesize):
+            self.image = self.get_image(tilesize)
         self.rect = self.image.get_rect()
         self.rect = self.rect.move(x * tilesize, y * tilesize)
 
-    def _load_image(self, image_name: str) -> pygame.Surface:
-        filepath = os.path.join(self.IMAGE_DIR, image_name)
-        try:
-            return pygame.image.load(filepath).convert_alpha()
-        except Exception as e:
-            s = f'Couldn\'t open {filepath}: {e}'
-            raise ValueError(s) from e
+    @classmethod
+    def _get_image_names(cls) -> List[str]:
+        return [cls.IMAGE]
+
+    def _load_image(self, image_name: str, tilesize: int = None, angle: int = 0) -> pygame.Surface:
+        size = (tilesize, tilesize) if tilesize else None
+        return load_image(self.IMAGE_DIR, image_name, alpha=self.IMAGE_HAS_ALPHA, size=size, angle=angle)
 
 
 class OrientedTile(Tile, ABC):
+    """
+    Tile that can be turned towards each direction
+
+    Every orientation of the image comes from the image cache, so turning is a lookup instead of a rotation.
+    """
+
+    SOURCE_DIRECTION: Direction = constants.DOWN  # This is how the image files are oriented
+
     direction: Direction
 
     def __init__(self, *, direction: int, **kwargs):
+        self.direction = direction  # This is how the tile should be oriented
         super().__init__(**kwargs)
-        self.direction = constants.DOWN  # This is how the initial image is oriented
-        self.orient_towards(direction)  # This is how the tile should be oriented
+
+    @classmethod
+    def preload(cls, tilesizes: Iterable[int]):
+        """
+        Load all images of this kind of tile in all orientations at the given sizes into the image cache
+        """
+
+        for image_name in cls._get_image_names():
+            images.load_orientations(cls.IMAGE_DIR, image_name, alpha=cls.IMAGE_HAS_ALPHA,
+                                     sizes=[(tilesize, tilesize) for tilesize in tilesizes],
+                                     source_direction=cls.SOURCE_DIRECTION)
+
+    def get_image(self, tilesize: int) -> pygame.Surface:
+        return self._load_image(self.image_name, tilesize, angle=self.direction - self.SOURCE_DIRECTION)
 
     def orient_towards(self, direction: Direction):
-        angle_to_turn = direction - self.direction
-        self.image = pygame.transform.rotate(self.image, angle_to_turn)
-        self.direction = direction
+        if direction != self.direction:
+            self.direction = direction
+            self.image = self.get_image(self.rect.width)
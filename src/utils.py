@@ -1,7 +1,5 @@
 from typing import Tuple, List, Union
 
-import pygame
-
 import constants
 
 Direction = int
@@ -9,13 +7,6 @@ Direction = int
 
 # Helper methods
 
-def init_pygame(title: str = constants.TITLE, width: int = constants.SCREEN_WIDTH,
-                height: int = constants.SCREEN_HEIGHT) -> pygame.Surface:
-    pygame.init()
-    pygame.display.set_caption(title)
-    return pygame.display.set_mode((width, height))
-
-
 def convert_direction_to_dx_dy(direction: Direction) -> Tuple[int, int]:
     """
     Convert the direction into a tuple of movement in x and y direction
@@ -74,28 +65,3 @@ def get_text_list(text: Union[str, List[str]], line_width: int) -> List[str]:
         s = f'Expected a str or list of str, given {type(text)}'
         raise ValueError(s)
     return result
-
-
-def display_text(screen: pygame.Surface, text: Union[str, list], font: pygame.font.Font,
-                 width_offset: int, height_offset: int, line_width: int, color: Tuple[int, int, int],
-                 shadow_color: Tuple[int, int, int] = None) -> int:
-    """
-    Display the given text onto the given screen, and return the resulting height of the text
-    """
-
-    text_list = get_text_list(text, line_width)
-    line_height = max(font.size(line)[1] for line in text_list) + 3
-    total_height = 0
-    for count, line in enumerate(text_list):
-        height = height_offset + (line_height * count)
-        if shadow_color:
-            shadow_surface = font.render(line, True, shadow_color)
-            shadow_left = width_offset + 1
-            shadow_top = height + 10 + 1
-            screen.blit(shadow_surface, (shadow_left, shadow_top))
-        surface = font.render(line, True, color)
-        left = width_offset
-        top = height + 10
-        screen.blit(surface, (left, top))
-        total_height += line_height
-    return total_height
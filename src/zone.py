@@ -1,14 +1,18 @@
-import json
-import os.path
-from typing import List, TypedDict, Optional
+from itertools import chain
+from typing import List, TypedDict, Optional, Tuple
 
-import pygame
-
-from constants import DATA_DIR
-from environment import Walkable, Obstacle
+import constants
+import zonecompiler
 from inventory.inventory import InventoryObject, InventoryDict
 from monster.monster import MonsterDict, Monster
+from monstertable import MonsterTable
+from occupancy import OccupancyGrid
+from pathfinding import Pathfinder
+from profiler import profiled
 from saveable import Saveable
+from saveservice import saves
+from savestore import get_zone_key
+from zonecompiler import CompiledZone, SPAWN_MONSTER, SPAWN_INVENTORY
 from zonemap import ZoneMap
 
 
@@ -24,35 +28,42 @@ class ZoneDict(TypedDict):
 
 
 class Zone(Saveable):
+    """
+    Monsters and objects on a zone map
+
+    The zone is dirty when any of its monsters or objects changed since it was last saved or loaded. The state of the
+    monsters is stored in a table, so rules that apply to many monsters at once run on whole columns.
+    """
+
     identifier: str
     name: str
-    walkables: List[Walkable]
-    obstacles: List[Obstacle]
-    monsters: List[Monster]
+    monsters: List[Monster]  # Views on the rows of monster_table, in the same order
+    monster_table: MonsterTable
     objects: List[InventoryObject]
+    occupancy: OccupancyGrid  # Monsters, objects on the map and the player, by tile
+    pathfinder: Pathfinder
 
-    _all_sprites: Optional[pygame.sprite.Group]
-
-    def __init__(self, identifier: str, monsters: List[Monster], objects: List[InventoryObject]):
-        self.map = ZoneMap.load(identifier)
+    def __init__(self, identifier: str, monsters: List[Monster], objects: List[InventoryObject],
+                 zone_map: ZoneMap = None):
+        self.map = zone_map or ZoneMap.load(identifier)
         self.identifier = identifier
         self.monsters = monsters
+        self.monster_table = MonsterTable(monsters)
         self.objects = objects
-
-        self._all_sprites = None
+        for child in chain(monsters, objects):
+            child.set_container(self)
+        on_map = [obj for obj in objects if obj.is_on_map()]
+        self.occupancy = OccupancyGrid(self.map.width, self.map.height, [*monsters, *on_map])
+        self.pathfinder = Pathfinder(self.map)
 
     # Saveable methods
 
     @classmethod
-    def get_filepath(cls, identifier: str):
-        zones_dir = os.path.join(DATA_DIR, 'current', 'zones')
-        if not os.path.isdir(zones_dir):
-            os.mkdir(zones_dir)
-        # TODO: Remove hardcoded `current` when implementing save slots
-        return os.path.join(zones_dir, f'{identifier}.json')
+    def get_save_key(cls, identifier: str) -> str:
+        return get_zone_key(identifier)
 
     @classmethod
-    def from_json(cls, data: ZoneDict) -> 'Zone':
+    def from_json(cls, data: ZoneDict, zone_map: ZoneMap = None) -> 'Zone':
         """
         Return a Zone object from the given zone state information
         """
@@ -60,22 +71,46 @@ class Zone(Saveable):
         identifier = data['identifier']
         monsters = [Monster.from_json(monster) for monster in data['monsters']]
         objects = [InventoryObject.from_json(obj) for obj in data['objects']]
-        return cls(identifier=identifier, monsters=monsters, objects=objects)
+        zone = cls(identifier=identifier, monsters=monsters, objects=objects, zone_map=zone_map)
+        zone.mark_clean()
+        return zone
 
     @classmethod
+    @profiled('Zone.load')
     def load(cls, identifier: str) -> 'Zone':
         """
-        Load the zone from /data/current/zones/<identifier>.json
+        Load the zone from the save slot of the game in progress, or from its map if it was not visited yet
 
         :param identifier: Zone identifier to load
         """
 
-        filepath = cls.get_filepath(identifier)
-        if not os.path.isfile(filepath):
+        return cls.from_source(*cls.read(identifier))
+
+    @classmethod
+    @profiled('Zone.read')
+    def read(cls, identifier: str) -> Tuple[CompiledZone, Optional[ZoneDict]]:
+        """
+        Read the compiled zone and its saved state (None if the zone has not been visited yet) from disk
+
+        This does not create any sprites, so it is safe to call from another thread than the display thread.
+        """
+
+        compiled_zone = zonecompiler.load(identifier)
+        return compiled_zone, saves.read(cls.get_save_key(identifier))
+
+    @classmethod
+    @profiled('Zone.from_source')
+    def from_source(cls, compiled_zone: CompiledZone, state: Optional[ZoneDict]) -> 'Zone':
+        """
+        Return a Zone object from data returned by `read`
+        """
+
+        zone_map = ZoneMap.from_compiled(compiled_zone)
+        if state is None:
             # The zone has not been visited yet
-            return cls._init_zone_from_map(identifier)
+            return cls._init_zone_from_map(compiled_zone, zone_map)
         else:
-            return cls._init_zone_from_state(filepath)
+            return cls.from_json(state, zone_map=zone_map)
 
     def as_json(self) -> ZoneDict:
         """
@@ -83,58 +118,126 @@ class Zone(Saveable):
         """
 
         return {'identifier': self.identifier, 'name': self.name,
-                'monsters': [monster.as_json() for monster in self.monsters],
+                'monsters': self.monster_table.as_json(),
                 'objects': [obj.as_json() for obj in self.objects]}
 
+    @profiled('Zone.save')
     def save(self):
         """
-        Save the zone state information to /data/current/zones/<identifier>.json
+        Save the zone state information in the save slot of the game in progress, if it changed
+
+        The state is written in the background, see `SaveService`.
         """
 
-        with open(self.get_filepath(self.identifier), 'w') as f:
-            json.dump(self.as_json(), f, indent=2)
+        key = self.get_save_key(self.identifier)
+        if not self.dirty:
+            saves.skip(key)
+            return
+        saves.submit(key, self.as_json())
+        self.mark_clean()
 
-    # Methods for clients
+    def mark_clean(self):
+        super().mark_clean()
+        for child in chain(self.monsters, self.objects):
+            child.mark_clean()
 
-    @property
-    def all_sprites(self) -> pygame.sprite.Group():
-        if not self._all_sprites:
-            self._all_sprites = pygame.sprite.Group(*self.map.all_sprites, *self.monsters, *self.objects)
-        return self._all_sprites
+    # Methods for clients
 
     @property
     def name(self):
         return self.map.name
 
+    def close(self):
+        """
+        Release the resources of the zone map, when the zone is no longer used
+        """
+
+        self.map.close()
+
+    def estimated_size(self) -> int:
+        """
+        Rough estimate of the memory used by the zone in bytes
+
+        Images are shared between sprites through the image cache, so only the sprites themselves are counted.
+        """
+
+        nr_sprites = len(self.monsters) + len(self.objects)
+        return self.map.nbytes + self.monster_table.nbytes + nr_sprites * constants.SPRITE_MEMORY_ESTIMATE
+
     def monster_on_tile(self, x: int, y: int) -> Optional[Monster]:
         """
         Return the _monster on the given tile, or None if there is no _monster on the tile
         """
 
-        return next((monster for monster in self.monsters if monster.x == x and monster.y == y), None)
+        return self.occupancy.first(x, y, Monster)
+
+    def tile_is_walkable_and_free(self, x: int, y: int) -> bool:
+        """
+        Return whether the tile can be walked on, and there is no living creature on it
+        """
+
+        return self.map.tile_is_walkable(x, y) and self.occupancy.is_free(x, y)
+
+    def move_monsters_towards(self, x: int, y: int, radius: int = constants.MONSTER_CHASE_RADIUS) -> bool:
+        """
+        Let the living monsters within the radius around the given tile take one step towards it
+
+        Monsters stop next to the tile, and do not step on a tile with another living creature.
+        Return whether any monster moved.
+        """
+
+        moved = False
+        nearby = self.occupancy.in_rect(x - radius, y - radius, 2 * radius + 1, 2 * radius + 1)
+        for monster in [entity for entity in nearby if isinstance(entity, Monster) and not entity.is_dead()]:
+            step = self.pathfinder.next_step(monster.x, monster.y, (x, y))
+            if step is None or step == (x, y) or not self.tile_is_walkable_and_free(*step):
+                continue
+            monster.x, monster.y = step
+            monster.place_on_screen(constants.TILESIZE, *step)
+            self.occupancy.update(monster)
+            moved = True
+        return moved
+
+    def monsters_alive_within(self, x: int, y: int, radius: int) -> List[Monster]:
+        """
+        Return the living monsters within the radius around the given tile
+        """
+
+        return [self.monsters[row] for row in self.monster_table.find_alive_within(x, y, radius)]
+
+    def damage_monsters_within(self, x: int, y: int, radius: int, damage: int) -> List[Monster]:
+        """
+        Damage the living monsters within the radius around the given tile, and return the monsters that were hit
+        """
+
+        rows = self.monster_table.damage_within(x, y, radius, damage)
+        self._mark_rows_dirty(rows)
+        return [self.monsters[row] for row in rows]
+
+    def regenerate_monsters(self, hit_points: int) -> int:
+        """
+        Give all living monsters the given number of hit points, up to their maximum, and return how many healed
+        """
+
+        rows = self.monster_table.regenerate(hit_points)
+        self._mark_rows_dirty(rows)
+        return len(rows)
 
     # Helper methods
 
-    @classmethod
-    def _init_zone_from_state(cls, filepath: str) -> 'Zone':
-        with open(filepath, 'r') as f:
-            data = json.load(f)
-            return cls.from_json(data)
+    def _mark_rows_dirty(self, rows):
+        # The columns are written directly, which bypasses the change tracking of the monsters
+        for row in rows:
+            self.monsters[row].mark_dirty()
 
     @classmethod
-    def _init_zone_from_map(cls, identifier: str) -> 'Zone':
+    def _init_zone_from_map(cls, compiled_zone: CompiledZone, zone_map: ZoneMap) -> 'Zone':
         monsters = []
         objects = []
-        world_map, map_legend = ZoneMap.read_map(identifier)
-        for y, row in enumerate(world_map):
-            for x, cell_char in enumerate(row):
-                try:
-                    cell_info = map_legend[cell_char]
-                except KeyError as e:
-                    raise KeyError(f'Map character {cell_char} is not defined in map_legend') from e
-                if monster_info := cell_info.get('monster'):
-                    monsters.append(Monster.from_json(monster_info, x=x, y=y))
-                if inventory_info := cell_info.get('inventory'):
-                    # TODO: Continue from here, make inventory on the map work
-                    objects.append(InventoryObject.from_json(inventory_info, x=x, y=y))
-        return cls(identifier=identifier, monsters=monsters, objects=objects)
+        for spawn in compiled_zone.spawns:
+            if spawn.kind == SPAWN_MONSTER:
+                monsters.append(Monster.from_json(spawn.data, x=spawn.x, y=spawn.y))
+            elif spawn.kind == SPAWN_INVENTORY:
+                # The map legend refers to the object by its identifier only
+                objects.append(InventoryObject.get_type(spawn.data)(x=spawn.x, y=spawn.y))
+        return cls(identifier=compiled_zone.identifier, monsters=monsters, objects=objects, zone_map=zone_map)
@@ -0,0 +1,367 @@
+"""
+Compile the zone source files into a compact binary artifact
+
+The source of a zone consists of map.txt, map_legend.json and info.json in /data/original/zones/<identifier>/. Parsing
+and validating these files character by character is slow, so the compiler turns them into zone.bin next to the
+sources, which can be read with a single memory-mapped read. The artifact is rebuilt when one of the source files
+changed (different modification time or size, and a different content hash).
+
+Binary layout (little-endian):
+
+- Header: magic, version, width, height, chunk size, number of strings, tile types, neighbors and spawns
+- Fingerprint of each source file: modification time (ns), size and SHA-1 hash
+- String table: each string as a uint16 length followed by UTF-8 bytes
+- Zone name: index in the string table
+- Tile type table: index in the string table of each tile type name (e.g. `walkable`)
+- Neighbor map: (direction, zone identifier) as indices in the string table
+- Spawn table: (x, y, kind, data) where data is the JSON-encoded cell info, as index in the string table
+- Tile grid: uint8 tile type ids in square chunks of chunk size * chunk size tiles. The chunks are stored row by row,
+  and so are the tiles within a chunk. Chunks on the right and bottom edge are padded to full size.
+
+Because the grid is stored in chunks, a very large zone can be memory-mapped and only the chunks around the player
+need to be read, see `CompiledZone.chunk`.
+
+Run this module to (re)compile all zones: `python zonecompiler.py`
+"""
+
+import hashlib
+import json
+import mmap
+import os.path
+import struct
+import tempfile
+from typing import Dict, List, Tuple, Any
+
+from constants import DATA_DIR, CHUNK_SIZE, ZONE_MMAP_THRESHOLD
+
+MAGIC = b'SSZN'
+VERSION = 2
+ARTIFACT_FILE = 'zone.bin'
+SOURCE_FILES = ('map.txt', 'map_legend.json', 'info.json')
+
+SPAWN_PLAYER = 0
+SPAWN_MONSTER = 1
+SPAWN_INVENTORY = 2
+_SPAWN_KEYS = {SPAWN_MONSTER: 'monster', SPAWN_INVENTORY: 'inventory'}
+
+_HEADER = struct.Struct('<4sHHHHHHHI')
+_FINGERPRINT = struct.Struct('<qq20s')
+_STRING_LENGTH = struct.Struct('<H')
+_INDEX = struct.Struct('<H')
+_NEIGHBOR = struct.Struct('<HH')
+_SPAWN = struct.Struct('<HHBH')
+
+Fingerprint = Tuple[int, int, bytes]  # (modification time in ns, size, SHA-1 hash)
+
+
+class Spawn:
+    """
+    Something that is placed on the map when the zone is visited for the first time
+    """
+
+    __slots__ = ('x', 'y', 'kind', 'data')
+
+    def __init__(self, x: int, y: int, kind: int, data: Any):
+        self.x = x
+        self.y = y
+        self.kind = kind  # One of SPAWN_PLAYER, SPAWN_MONSTER, SPAWN_INVENTORY
+        self.data = data  # The cell info of the spawn, as given in the map legend
+
+
+class CompiledZone:
+    """
+    All static information of a zone, as read from its compiled artifact
+
+    The tile grid is not copied, but read chunk by chunk from the artifact. Large artifacts are memory-mapped, and the
+    map has to be closed with `close` when the zone is no longer used, so the artifact can be rebuilt.
+    """
+
+    identifier: str
+    name: str
+    width: int
+    height: int
+    chunk_size: int
+    tile_types: List[str]  # Tile type name per tile type id
+    neighbor_zones: Dict[str, str]
+    spawns: List[Spawn]
+
+    def __init__(self, identifier: str, name: str, width: int, height: int, chunk_size: int, tile_types: List[str],
+                 neighbor_zones: Dict[str, str], spawns: List[Spawn], buffer, grid_offset: int):
+        self.identifier = identifier
+        self.name = name
+        self.width = width
+        self.height = height
+        self.chunk_size = chunk_size
+        self.tile_types = tile_types
+        self.neighbor_zones = neighbor_zones
+        self.spawns = spawns
+        self._buffer = buffer  # The artifact, as mmap or bytes
+        self._grid_offset = grid_offset
+
+    @property
+    def chunks_wide(self) -> int:
+        return -(-self.width // self.chunk_size)
+
+    @property
+    def chunks_high(self) -> int:
+        return -(-self.height // self.chunk_size)
+
+    def chunk(self, chunk_x: int, chunk_y: int) -> bytes:
+        """
+        Return the tile type ids of the given chunk, row by row
+        """
+
+        chunk_bytes = self.chunk_size * self.chunk_size
+        offset = self._grid_offset + (chunk_y * self.chunks_wide + chunk_x) * chunk_bytes
+        return self._buffer[offset:offset + chunk_bytes]
+
+    def tile_type(self, x: int, y: int) -> str:
+        chunk_y, tile_y = divmod(y, self.chunk_size)
+        chunk_x, tile_x = divmod(x, self.chunk_size)
+        offset = self._grid_offset + (chunk_y * self.chunks_wide + chunk_x) * self.chunk_size * self.chunk_size
+        return self.tile_types[self._buffer[offset + tile_y * self.chunk_size + tile_x]]
+
+    def close(self):
+        """
+        Release the memory-mapped artifact; no chunks can be read afterwards
+        """
+
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+
+# Reading the source files
+
+def get_zone_dir(identifier: str) -> str:
+    return os.path.join(DATA_DIR, 'original', 'zones', identifier)
+
+
+def read_map(identifier: str) -> Tuple[List[str], Dict[str, Dict]]:
+    """
+    Read the map.txt and map_legend.json files for the given zone
+    """
+
+    print(f'Reading map {identifier}')
+    map_legend_file = os.path.join(get_zone_dir(identifier), 'map_legend.json')
+    with open(map_legend_file, 'r') as f:
+        map_legend = json.load(f)
+    map_file = os.path.join(get_zone_dir(identifier), 'map.txt')
+    with open(map_file, 'r') as f:
+        world_map = [i.strip() for i in f.readlines()]
+    # Editors often end the file with an empty line, which is not a row of the map
+    while world_map and not world_map[-1]:
+        world_map.pop()
+    return world_map, map_legend
+
+
+def read_info(identifier: str) -> Dict:
+    info_file = os.path.join(get_zone_dir(identifier), 'info.json')
+    with open(info_file, 'r') as f:
+        return json.load(f)
+
+
+# Compiling
+
+def compile_zone(identifier: str) -> bytes:
+    """
+    Parse and validate the source files of the zone, and return the compiled artifact
+    """
+
+    world_map, map_legend = read_map(identifier)
+    info = read_info(identifier)
+    return compile_sources(identifier, world_map, map_legend, info, get_source_fingerprints(identifier))
+
+
+def compile_sources(identifier: str, world_map: List[str], map_legend: Dict[str, Dict], info: Dict,
+                    fingerprints: List[Fingerprint] = None, chunk_size: int = CHUNK_SIZE) -> bytes:
+    """
+    Validate the contents of the source files of a zone, and return the compiled artifact
+    """
+
+    height = len(world_map)
+    width = len(world_map[0]) if world_map else 0
+    strings: List[str] = []
+    string_indices: Dict[str, int] = {}
+
+    def _index(_string: str) -> int:
+        if _string not in string_indices:
+            string_indices[_string] = len(strings)
+            strings.append(_string)
+        return string_indices[_string]
+
+    tile_types: List[str] = []
+    chunks_wide = -(-width // chunk_size)
+    chunks_high = -(-height // chunk_size)
+    grid = bytearray(chunks_wide * chunks_high * chunk_size * chunk_size)
+    spawns: List[Tuple[int, int, int, int]] = []
+    for y, row in enumerate(world_map):
+        if len(row) != width:
+            raise ValueError(f'Row {y} of map {identifier} has {len(row)} tiles, expected {width}')
+        for x, cell_char in enumerate(row):
+            try:
+                cell_info = map_legend[cell_char]
+            except KeyError as e:
+                raise KeyError(f'Map character {cell_char} is not defined in map_legend') from e
+            tile = cell_info['tile']
+            if tile not in tile_types:
+                tile_types.append(tile)
+            chunk_index = (y // chunk_size) * chunks_wide + x // chunk_size
+            grid[(chunk_index * chunk_size + y % chunk_size) * chunk_size + x % chunk_size] = tile_types.index(tile)
+            if cell_info.get('player'):
+                spawns.append((x, y, SPAWN_PLAYER, _index(json.dumps(True))))
+            for kind, key in _SPAWN_KEYS.items():
+                if spawn_info := cell_info.get(key):
+                    spawns.append((x, y, kind, _index(json.dumps(spawn_info))))
+    if len(tile_types) > 256:
+        raise ValueError(f'Map {identifier} has {len(tile_types)} tile types, at most 256 are supported')
+
+    name_index = _index(info['name'])
+    tile_type_indices = [_index(tile) for tile in tile_types]
+    neighbors = [(_index(direction), _index(zone)) for direction, zone in info.get('neighbor_zones', {}).items()]
+
+    parts = [_HEADER.pack(MAGIC, VERSION, width, height, chunk_size, len(strings), len(tile_types), len(neighbors),
+                          len(spawns))]
+    fingerprints = fingerprints or [(0, 0, b'')] * len(SOURCE_FILES)
+    parts += [_FINGERPRINT.pack(*fingerprint) for fingerprint in fingerprints]
+    for string in strings:
+        encoded = string.encode('utf-8')
+        parts.append(_STRING_LENGTH.pack(len(encoded)) + encoded)
+    parts.append(_INDEX.pack(name_index))
+    parts += [_INDEX.pack(index) for index in tile_type_indices]
+    parts += [_NEIGHBOR.pack(*neighbor) for neighbor in neighbors]
+    parts += [_SPAWN.pack(*spawn) for spawn in spawns]
+    parts.append(bytes(grid))
+    return b''.join(parts)
+
+
+def get_artifact_path(identifier: str) -> str:
+    return os.path.join(get_zone_dir(identifier), ARTIFACT_FILE)
+
+
+def get_source_fingerprints(identifier: str, with_hash: bool = True) -> List[Fingerprint]:
+    fingerprints = []
+    for filename in SOURCE_FILES:
+        filepath = os.path.join(get_zone_dir(identifier), filename)
+        stat = os.stat(filepath)
+        digest = b''
+        if with_hash:
+            with open(filepath, 'rb') as f:
+                digest = hashlib.sha1(f.read()).digest()
+        fingerprints.append((stat.st_mtime_ns, stat.st_size, digest))
+    return fingerprints
+
+
+def build(identifier: str) -> str:
+    """
+    Compile the zone and write the artifact next to its sources, return the path of the artifact
+    """
+
+    artifact_path = get_artifact_path(identifier)
+    # Zones can be built from several threads at once, so each build writes to its own temporary file
+    fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=get_zone_dir(identifier))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(compile_zone(identifier))
+        os.replace(tmp_path, artifact_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return artifact_path
+
+
+def artifact_is_up_to_date(identifier: str) -> bool:
+    """
+    Return whether the artifact exists and was compiled from the current source files
+
+    Only when the modification time or size of a source file changed, its content hash is compared.
+    """
+
+    artifact_path = get_artifact_path(identifier)
+    try:
+        with open(artifact_path, 'rb') as f:
+            header = f.read(_HEADER.size + len(SOURCE_FILES) * _FINGERPRINT.size)
+    except FileNotFoundError:
+        return False
+    if len(header) < _HEADER.size or _HEADER.unpack_from(header)[:2] != (MAGIC, VERSION):
+        return False
+    stored = [_FINGERPRINT.unpack_from(header, _HEADER.size + i * _FINGERPRINT.size) for i in range(len(SOURCE_FILES))]
+    current = get_source_fingerprints(identifier, with_hash=False)
+    if all(s[:2] == c[:2] for s, c in zip(stored, current)):
+        return True
+    current = get_source_fingerprints(identifier)
+    if any(s[2] != c[2] for s, c in zip(stored, current)):
+        return False
+    # The files were touched, but their contents did not change: store the new modification times
+    with open(artifact_path, 'r+b') as f:
+        f.seek(_HEADER.size)
+        f.write(b''.join(_FINGERPRINT.pack(*fingerprint) for fingerprint in current))
+    return True
+
+
+# Loading
+
+def load(identifier: str) -> CompiledZone:
+    """
+    Return the compiled zone, (re)building the artifact first if it is missing or out of date
+    """
+
+    if not artifact_is_up_to_date(identifier):
+        build(identifier)
+    with open(get_artifact_path(identifier), 'rb') as f:
+        if os.fstat(f.fileno()).st_size < ZONE_MMAP_THRESHOLD:
+            # Reading a small artifact at once is as fast as mapping it, and leaves no map open
+            return _parse(identifier, f.read())
+        # The map stays valid after the file is closed, and chunks of the grid are read from it when needed
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return _parse(identifier, buffer)
+
+
+def from_bytes(identifier: str, artifact: bytes) -> CompiledZone:
+    """
+    Return the compiled zone from an artifact in memory, e.g. the result of `compile_sources`
+    """
+
+    return _parse(identifier, artifact)
+
+
+def _parse(identifier: str, buffer) -> CompiledZone:
+    (magic, version, width, height, chunk_size, nr_strings, nr_tile_types, nr_neighbors,
+     nr_spawns) = _HEADER.unpack_from(buffer)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f'Zone {identifier} is not a compiled zone of version {VERSION}')
+    offset = _HEADER.size + len(SOURCE_FILES) * _FINGERPRINT.size
+
+    strings = []
+    for _ in range(nr_strings):
+        length, = _STRING_LENGTH.unpack_from(buffer, offset)
+        offset += _STRING_LENGTH.size
+        strings.append(buffer[offset:offset + length].decode('utf-8'))
+        offset += length
+
+    name_index, = _INDEX.unpack_from(buffer, offset)
+    offset += _INDEX.size
+    tile_types = []
+    for _ in range(nr_tile_types):
+        index, = _INDEX.unpack_from(buffer, offset)
+        tile_types.append(strings[index])
+        offset += _INDEX.size
+    neighbor_zones = {}
+    for _ in range(nr_neighbors):
+        direction_index, zone_index = _NEIGHBOR.unpack_from(buffer, offset)
+        neighbor_zones[strings[direction_index]] = strings[zone_index]
+        offset += _NEIGHBOR.size
+    spawns = []
+    for _ in range(nr_spawns):
+        x, y, kind, data_index = _SPAWN.unpack_from(buffer, offset)
+        spawns.append(Spawn(x, y, kind, json.loads(strings[data_index])))
+        offset += _SPAWN.size
+    return CompiledZone(identifier=identifier, name=strings[name_index], width=width, height=height,
+                        chunk_size=chunk_size, tile_types=tile_types, neighbor_zones=neighbor_zones, spawns=spawns,
+                        buffer=buffer, grid_offset=offset)
+
+
+if __name__ == '__main__':
+    zones_dir = os.path.join(DATA_DIR, 'original', 'zones')
+    for entry in sorted(os.scandir(zones_dir), key=lambda e: e.name):
+        if entry.is_dir():
+            print(f'Compiled {build(entry.name)}')
@@ -0,0 +1,113 @@
+"""
+Keep recently visited zones in memory, so moving between zones does not reload them from disk
+"""
+
+from collections import OrderedDict
+from typing import Dict
+
+import constants
+from prefetch import ZonePrefetcher
+from profiler import profiled
+from zone import Zone
+
+
+class ZoneManager:
+    """
+    Own the live Zone objects of the game, keeping the most recently used zones resident
+
+    Zones that are not resident are taken from the prefetcher, which reads the neighbors of the active zone in the
+    background. When there are more than `max_zones` zones resident, or their estimated memory use exceeds
+    `max_bytes`, the least recently used zone is evicted, after saving it if it is dirty (see `Saveable`).
+    """
+
+    max_zones: int
+    max_bytes: int
+    hits: int  # Number of times a resident zone was returned
+    loads: int  # Number of times a zone had to be taken from the prefetcher or disk
+    evictions: int
+
+    _zones: 'OrderedDict[str, Zone]'
+
+    def __init__(self, max_zones: int = constants.MAX_RESIDENT_ZONES, max_bytes: int = constants.ZONE_MEMORY_BUDGET,
+                 prefetcher: ZonePrefetcher = None):
+        self.max_zones = max_zones
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+        self._zones = OrderedDict()
+        self._prefetcher = prefetcher or ZonePrefetcher()
+
+    @profiled('ZoneManager.get')
+    def get(self, identifier: str) -> Zone:
+        """
+        Return the given zone, and start prefetching its neighbors that are not resident
+        """
+
+        if zone := self._zones.get(identifier):
+            self.hits += 1
+            self._zones.move_to_end(identifier)
+        else:
+            self.loads += 1
+            zone = self._prefetcher.take(identifier)
+            self._zones[identifier] = zone
+            self._evict()
+        for neighbor in zone.map.neighbor_zones.values():
+            if neighbor not in self._zones:
+                self._prefetcher.prefetch(neighbor)
+        return zone
+
+    @profiled('ZoneManager.save_dirty')
+    def save_dirty(self):
+        """
+        Save all resident zones that changed since they were last saved; saving the other zones is skipped
+        """
+
+        for zone in self._zones.values():
+            zone.save()
+
+    def clear(self):
+        """
+        Forget all resident and prefetched zones without saving them, e.g. because the saved game was removed
+        """
+
+        for zone in self._zones.values():
+            zone.close()
+        self._zones.clear()
+        self._prefetcher.clear()
+
+    def shutdown(self):
+        self.save_dirty()
+        self._prefetcher.shutdown()
+        for zone in self._zones.values():
+            zone.close()
+
+    @property
+    def estimated_size(self) -> int:
+        return sum(zone.estimated_size() for zone in self._zones.values())
+
+    def stats(self) -> Dict[str, float]:
+        return {'resident': len(self._zones), 'estimated_bytes': self.estimated_size, 'hits': self.hits,
+                'loads': self.loads, 'evictions': self.evictions, **{
+                    f'prefetch_{key}': value for key, value in self._prefetcher.stats().items()
+                }}
+
+    # Helper methods
+
+    def _evict(self):
+        # The most recently used zone is never evicted, regardless of its size
+        while len(self._zones) > 1 and (len(self._zones) > self.max_zones or self.estimated_size > self.max_bytes):
+            _, zone = self._zones.popitem(last=False)
+            zone.save()
+            zone.close()
+            self.evictions += 1
+
+    def __contains__(self, identifier: str) -> bool:
+        return identifier in self._zones
+
+    def __len__(self):
+        return len(self._zones)
+
+    def __str__(self):
+        return (f'{len(self._zones)} zones resident, {self.hits} hits and {self.loads} loads, '
+                f'{self.evictions} evictions; prefetcher: {self._prefetcher}')
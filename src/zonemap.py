@@ -1,12 +1,10 @@
-import json
-import os.path
-from typing import List, Dict, TypedDict, Tuple, Set, Literal, Optional
-
-import pygame
+from typing import List, Dict, TypedDict, Tuple, Literal, Iterator, Type
 
 import constants
-from constants import DATA_DIR
+import zonecompiler
 from environment import Obstacle, Walkable
+from tile import Tile
+from zonecompiler import CompiledZone
 
 OBSTACLE = 'obstacle'
 WALKABLE = 'walkable'
@@ -34,53 +32,81 @@ ZoneMapRepr = List[str]  # Textual representation of the map
 MapLegend = Dict[str, CellDefinition]  # Mapping from each character in the map to its info
 
 
+class TileType:
+    """
+    Properties shared by all tiles of one type
+    """
+
+    name: str
+    walkable: bool
+    tile_class: Type[Tile]  # Sprite class, which defines how the tile is drawn
+
+    def __init__(self, name: str, walkable: bool, tile_class: Type[Tile]):
+        self.name = name
+        self.walkable = walkable
+        self.tile_class = tile_class
+
+
+TILE_TYPES: Dict[str, TileType] = {
+    OBSTACLE: TileType(OBSTACLE, walkable=False, tile_class=Obstacle),
+    WALKABLE: TileType(WALKABLE, walkable=True, tile_class=Walkable),
+}
+
+
 class ZoneMap:
     """
     Represents the environment of a zone
+
+    The map is a compact grid of one byte per tile, holding the id of its tile type. The ids are indices in the list
+    of tile types of the zone, which refer to the shared TILE_TYPES. No sprites are created for the tiles; the renderer
+    draws them straight from the grid.
+
+    The grid is divided in square chunks, which are read from the compiled zone when they are needed. While playing,
+    `stream` keeps only the chunks around the camera loaded, so that the memory used by a zone is bounded by the
+    size of the screen, not by the size of the map. A zone of one screen is a map of a single chunk.
     """
 
     # Mapping from direction (north/east/south/west) to zone identifier
     neighbor_zones: Dict[Literal[NORTH, EAST, SOUTH, WEST], str]
+    width: int  # Number of tiles
+    height: int  # Number of tiles
+    chunk_size: int  # Number of tiles along each side of a chunk
+    tile_types: List[TileType]  # Tile type per tile type id
 
-    _obstacles: List[Obstacle]
-    _walkables: List[Walkable]
-    _obstacle_coordinates: Set[Tuple[int, int]]
-    _walkable_coordinates: Set[Tuple[int, int]]
-
-    _all_sprites: Optional[pygame.sprite.Group]
+    _source: CompiledZone  # Where the chunks are read from
+    _chunks: Dict[Tuple[int, int], bytes]  # Tile type ids per loaded chunk, row by row
+    _walkable: List[bool]  # Walkability per tile type id
 
-    def __init__(self, name: str, obstacles: List[Obstacle], walkables: List[Walkable], neighbor_zones: Dict[str, str]):
+    def __init__(self, name: str, width: int, height: int, tile_types: List[TileType],
+                 neighbor_zones: Dict[str, str], source: CompiledZone):
         self.neighbor_zones = neighbor_zones
         self.name = name
-        self._obstacles = obstacles
-        self._walkables = walkables
+        self.width = width
+        self.height = height
+        self.chunk_size = source.chunk_size
+        self.tile_types = tile_types
+        self._source = source
+        self._chunks = {}
+        self._walkable = [tile_type.walkable for tile_type in tile_types]
 
-        self._obstacle_coordinates = {(tile.x, tile.y) for tile in obstacles}
-        self._walkable_coordinates = {(tile.x, tile.y) for tile in walkables}
-        self._validate_obstacles_and_walkables()
-
-        self._all_sprites = None
+    @classmethod
+    def load(cls, identifier: str) -> 'ZoneMap':
+        return cls.from_compiled(zonecompiler.load(identifier))
 
     @classmethod
-    def load(cls, identifier: str):
-        obstacles = []
-        walkables = []
-        world_map, map_legend = cls.read_map(identifier)
-        for y, row in enumerate(world_map):
-            for x, cell_char in enumerate(row):
-                try:
-                    cell_info = map_legend[cell_char]
-                except KeyError as e:
-                    raise KeyError(f'Map character {cell_char} is not defined in map_legend') from e
-                tile = cell_info['tile']
-                if tile == OBSTACLE:
-                    obstacles.append(Obstacle(x=x, y=y))
-                elif tile == WALKABLE:
-                    walkables.append(Walkable(x=x, y=y))
-                else:
-                    raise ValueError(f'Tile {tile} is neither obstacle nor walkable')
-        zone_info = cls.read_info(identifier)
-        return cls(obstacles=obstacles, walkables=walkables, **zone_info)
+    def from_compiled(cls, compiled_zone: CompiledZone) -> 'ZoneMap':
+        """
+        Return the zone map of the given compiled zone
+        """
+
+        tile_types = []
+        for tile in compiled_zone.tile_types:
+            try:
+                tile_types.append(TILE_TYPES[tile])
+            except KeyError as e:
+                raise ValueError(f'Tile {tile} is neither obstacle nor walkable') from e
+        return cls(name=compiled_zone.name, width=compiled_zone.width, height=compiled_zone.height,
+                   tile_types=tile_types, neighbor_zones=compiled_zone.neighbor_zones, source=compiled_zone)
 
     @staticmethod
     def read_map(identifier: str) -> Tuple[ZoneMapRepr, MapLegend]:
@@ -88,39 +114,85 @@ class ZoneMap:
         Read the map.txt and map_legend.json files for the current zone
         """
 
-        # TODO: Prevent reading the files twice
-
-        print(f'Reading map {identifier}')
-        map_legend_file = os.path.join(DATA_DIR, 'original', 'zones', identifier, 'map_legend.json')
-        with open(map_legend_file, 'r') as f:
-            map_legend = json.load(f)
-        map_file = os.path.join(DATA_DIR, 'original', 'zones', identifier, 'map.txt')
-        with open(map_file, 'r') as f:
-            world_map = [i.strip() for i in f.readlines()]
-        return world_map, map_legend
+        return zonecompiler.read_map(identifier)
 
     @staticmethod
     def read_info(identifier: str) -> Dict[str, str]:
-        map_legend_file = os.path.join(DATA_DIR, 'original', 'zones', identifier, 'info.json')
-        with open(map_legend_file, 'r') as f:
-            return json.load(f)
+        return zonecompiler.read_info(identifier)
+
+    def close(self):
+        """
+        Release the compiled zone that the chunks are read from, when the zone map is no longer used
+        """
+
+        self._source.close()
 
     @property
-    def all_sprites(self) -> pygame.sprite.Group():
-        if not self._all_sprites:
-            self._all_sprites = pygame.sprite.Group(*self._obstacles, *self._walkables)
-        return self._all_sprites
+    def nbytes(self) -> int:
+        """
+        Number of bytes of the loaded chunks
+        """
+
+        return len(self._chunks) * self.chunk_size * self.chunk_size
+
+    @property
+    def loaded_chunks(self) -> List[Tuple[int, int]]:
+        return list(self._chunks)
+
+    def stream(self, x: int, y: int, width: int, height: int, margin: int = constants.STREAM_MARGIN):
+        """
+        Load the chunks that overlap the given area of tiles plus the margin around it, and unload all others
+        """
+
+        size = self.chunk_size
+        first_x, last_x = max(x - margin, 0) // size, min(x + width + margin, self.width) - 1
+        first_y, last_y = max(y - margin, 0) // size, min(y + height + margin, self.height) - 1
+        wanted = {(chunk_x, chunk_y)
+                  for chunk_y in range(first_y, last_y // size + 1)
+                  for chunk_x in range(first_x, last_x // size + 1)}
+        for chunk in set(self._chunks) - wanted:
+            del self._chunks[chunk]
+        for chunk in wanted - set(self._chunks):
+            self._chunks[chunk] = self._source.chunk(*chunk)
+
+    def chunk(self, chunk_x: int, chunk_y: int) -> bytes:
+        """
+        Return the tile type ids of the given chunk, row by row, loading the chunk if it was not streamed in
+        """
+
+        try:
+            return self._chunks[chunk_x, chunk_y]
+        except KeyError:
+            chunk = self._chunks[chunk_x, chunk_y] = self._source.chunk(chunk_x, chunk_y)
+            return chunk
+
+    def tile_type(self, x: int, y: int) -> TileType:
+        return self.tile_types[self._tile_type_id(x, y)]
+
+    def iter_tiles(self, x: int = 0, y: int = 0, width: int = None,
+                   height: int = None) -> Iterator[Tuple[int, int, TileType]]:
+        """
+        Iterate over (x, y, tile type) of all tiles in the given area, by default the whole map
+        """
+
+        width = self.width - x if width is None else width
+        height = self.height - y if height is None else height
+        for tile_y in range(max(y, 0), min(y + height, self.height)):
+            for tile_x in range(max(x, 0), min(x + width, self.width)):
+                yield tile_x, tile_y, self.tile_type(tile_x, tile_y)
 
     def tile_is_obstacle(self, x: int, y: int) -> bool:
-        return (x, y) in self._obstacle_coordinates
+        return self._contains(x, y) and not self._walkable[self._tile_type_id(x, y)]
 
     def tile_is_walkable(self, x: int, y: int) -> bool:
-        return (x, y) in self._walkable_coordinates
+        return self._contains(x, y) and self._walkable[self._tile_type_id(x, y)]
 
     # Helper methods
 
-    def _validate_obstacles_and_walkables(self):
-        assert len(self._obstacle_coordinates) == len(self._obstacles), 'Each obstacle should have unique coordinates'
-        assert len(self._walkable_coordinates) == len(self._walkables), 'Each walkable should have unique coordinates'
-        assert len(self._obstacle_coordinates.intersection(self._walkable_coordinates)) == 0, \
-            'A tile cannot be obstacle and walkable at the same time'
+    def _contains(self, x: int, y: int) -> bool:
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def _tile_type_id(self, x: int, y: int) -> int:
+        chunk_x, tile_x = divmod(x, self.chunk_size)
+        chunk_y, tile_y = divmod(y, self.chunk_size)
+        return self.chunk(chunk_x, chunk_y)[tile_y * self.chunk_size + tile_x]